@@ -30,6 +30,7 @@ from four_letter_blocks.main_window import Ui_MainWindow
 from four_letter_blocks.puzzle import Puzzle, RotationsDisplay
 from four_letter_blocks.puzzle_pair import PuzzlePair
 from four_letter_blocks.puzzle_set import PuzzleSet
+from four_letter_blocks.transposition_table import TranspositionTable
 
 from four_letter_blocks import four_letter_blocks_rc
 
@@ -738,6 +739,7 @@ class FourLetterBlocksWindow(QMainWindow):
 
     def export_set_file(self, file_name: str):
         packer = BlockPacker(15, 19, tries=10_000_000, min_tries=1_000)
+        packer.transposition_table = TranspositionTable()
         puzzles = list(self.crossword_set.values())
         puzzles.sort(key=lambda p: (p.grid.width, p.title))
         start_hue = self.ui.background_hue.value()
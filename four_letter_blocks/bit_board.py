@@ -0,0 +1,243 @@
+""" Bitboard representation of a packer's grid.
+
+Each grid cell gets one bit, numbered in row-major order, and the bits are
+packed into 64-bit words. Every legal placement of every shape rotation gets a
+word array of its own, so testing a placement against the occupied cells is a
+single AND.
+"""
+import typing
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cache, lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from four_letter_blocks.block import shape_rotations
+
+WORD_SIZE = 64
+
+# Grid sizes to keep tables for. A packer only uses one or two sizes at once.
+TABLE_CACHE_SIZE = 16
+
+CELL_INDEX_TABLES = ('shape_starts', 'rows', 'heights', 'cells',
+                     'slot_positions', 'cell_starts', 'cell_placements')
+TABLE_NAMES = CELL_INDEX_TABLES + ('cols', 'words', 'shape_indexes')
+
+# {(width, height): {table_name: array}} memory-mapped by attach_tables()
+attached_tables: dict[typing.Tuple[int, int], dict[str, np.ndarray]] = {}
+
+
+@dataclass(frozen=True)
+class ShapePlacements:
+    """ All the placements of one shape rotation that fit inside a grid.
+
+    Placements are listed in row-major order of their top-left corners, the
+    same order that np.nonzero() returns them from a slot bitmap.
+    """
+    rows: np.ndarray  # top row of each placement
+    cols: np.ndarray  # left column of each placement
+    cells: np.ndarray  # [placement, 4] flat cell indexes, row * width + col
+    words: np.ndarray  # [placement, word_count] occupied bits
+    index: np.ndarray  # [row, col] -> placement number, or -1 if it won't fit
+
+    def __len__(self):
+        return self.rows.size
+
+
+def count_words(width: int, height: int) -> int:
+    return max(1, -(-width * height // WORD_SIZE))
+
+
+def pack_bits(occupied: np.ndarray) -> np.ndarray:
+    """ Pack a boolean grid into an array of 64-bit words.
+
+    :param occupied: a boolean array with the grid's shape
+    :return: a uint64 array with bit i set if cell i (in row-major order) is
+        occupied.
+    """
+    height, width = occupied.shape
+    word_count = count_words(width, height)
+    bits = np.zeros(word_count * WORD_SIZE, dtype=bool)
+    bits[:occupied.size] = occupied.ravel()
+    return np.packbits(bits, bitorder='little').view('<u8')
+
+
+def unpack_bits(words: np.ndarray, width: int, height: int) -> np.ndarray:
+    """ Unpack an array of 64-bit words into a boolean grid. """
+    bits = np.unpackbits(words.astype('<u8').view(np.uint8),
+                         bitorder='little')
+    return bits[:width * height].astype(bool).reshape(height, width)
+
+
+@cache
+def shape_cell_offsets() -> dict[str, typing.Tuple[typing.Tuple[int, int], ...]]:
+    """ Occupied (row, col) offsets for each shape rotation.
+
+    Names and order match build_masks(): a letter and a rotation number,
+    except for O.
+    """
+    rotation_counts: typing.Counter[str] = typing.Counter(
+        name for name, _ in shape_rotations().values())
+    offsets = {}
+    for coordinates, (name, rotation) in shape_rotations().items():
+        if rotation_counts[name] > 1:
+            name = f'{name}{rotation}'
+        offsets[name] = tuple(sorted((y, x) for x, y in coordinates))
+    return offsets
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def build_placements(width: int, height: int) -> dict[str, ShapePlacements]:
+    """ List every placement of each shape rotation inside a grid.
+
+    :return: {shape_name: placements}, with the same shape names as
+        build_masks(). The arrays are views of build_tables().
+    """
+    tables = build_tables(width, height)
+    shape_starts = tables['shape_starts']
+    all_placements = {}
+    for shape_id, shape in enumerate(shape_cell_offsets()):
+        start, end = shape_starts[shape_id:shape_id+2]
+        all_placements[shape] = ShapePlacements(
+            rows=tables['rows'][start:end],
+            cols=tables['cols'][start:end],
+            cells=tables['cells'][start:end],
+            words=tables['words'][start:end],
+            index=tables['shape_indexes'][shape_id])
+    return all_placements
+
+
+@dataclass(frozen=True)
+class CellIndex:
+    """ Placements of all shape rotations, numbered together, and the
+    placements that cover each cell.
+
+    The placements of each shape are in a contiguous range, in the same order
+    as build_placements().
+    """
+    shapes: typing.Tuple[str, ...]
+    shape_starts: np.ndarray  # [shape+1] -> first placement of each shape
+    rows: np.ndarray  # [placement] -> top row
+    heights: np.ndarray  # [placement] -> height of the shape
+    cells: np.ndarray  # [placement, 4] flat cell indexes
+    slot_positions: np.ndarray  # [placement] -> flat index of (shape, row, col)
+    cell_starts: np.ndarray  # [cell+1] -> start of each cell's placements
+    cell_placements: np.ndarray  # placements covering each cell, in order
+
+    @property
+    def placement_count(self):
+        return self.rows.size
+
+    def find_covering(self, cells: typing.Iterable[int]) -> np.ndarray:
+        """ List the placements that cover any of the cells.
+
+        A placement that covers more than one of the cells is listed once for
+        each cell it covers.
+        """
+        starts = self.cell_starts
+        return np.concatenate([
+            self.cell_placements[starts[cell]:starts[cell+1]]
+            for cell in cells])
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def build_cell_index(width: int, height: int) -> CellIndex:
+    tables = build_tables(width, height)
+    return CellIndex(shapes=tuple(shape_cell_offsets()),
+                     **{name: tables[name] for name in CELL_INDEX_TABLES})
+
+
+def find_index_dtype(max_value: int) -> np.dtype:
+    """ Choose the smallest integer type for indexes up to max_value. """
+    for dtype in (np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def build_tables(width: int, height: int) -> dict[str, np.ndarray]:
+    """ Build the placement tables for a grid, or use attached ones.
+
+    All shape rotations are numbered together, with each shape's placements
+    in a contiguous range. Cell indexes and the cells' lists of placements
+    are stored as int16, unless the grid is too big for that.
+    :return: {table_name: array}, with the names in TABLE_NAMES.
+    """
+    tables = attached_tables.get((width, height))
+    if tables is not None:
+        return tables
+    word_count = count_words(width, height)
+    grid_size = width * height
+    shape_tables = defaultdict(list)
+    for shape_id, offsets in enumerate(shape_cell_offsets().values()):
+        offset_array = np.array(offsets)
+        shape_height = offset_array[:, 0].max() + 1
+        shape_width = offset_array[:, 1].max() + 1
+        rows, cols = np.mgrid[0:max(0, height-shape_height+1),
+                              0:max(0, width-shape_width+1)]
+        rows = rows.ravel()
+        cols = cols.ravel()
+        cell_rows = rows[:, None] + offset_array[:, 0]
+        cell_cols = cols[:, None] + offset_array[:, 1]
+        index = np.full((height, width), -1, dtype=int)
+        index[rows, cols] = np.arange(rows.size)
+        shape_tables['rows'].append(rows)
+        shape_tables['cols'].append(cols)
+        shape_tables['heights'].append(np.full(rows.size, shape_height))
+        shape_tables['cells'].append(cell_rows * width + cell_cols)
+        shape_tables['slot_positions'].append(
+            shape_id * grid_size + rows * width + cols)
+        shape_tables['shape_indexes'].append(index)
+    tables = {name: np.concatenate(arrays)
+              for name, arrays in shape_tables.items()
+              if name != 'shape_indexes'}
+    tables['shape_indexes'] = np.stack(shape_tables['shape_indexes'])
+    sizes = [rows.size for rows in shape_tables['rows']]
+    tables['shape_starts'] = np.concatenate(([0], np.cumsum(sizes)))
+    cells = tables['cells']
+    placement_count = cells.shape[0]
+    bits = np.zeros((placement_count, word_count * WORD_SIZE), dtype=bool)
+    np.put_along_axis(bits, cells, True, axis=1)
+    tables['words'] = np.packbits(bits, axis=1, bitorder='little').view('<u8')
+    tables['cells'] = cells.astype(find_index_dtype(grid_size))
+    covering_cells = cells.ravel()
+    tables['cell_placements'] = (
+        np.argsort(covering_cells, kind='stable') // 4).astype(
+        find_index_dtype(placement_count))
+    cell_counts = np.bincount(covering_cells, minlength=grid_size)
+    tables['cell_starts'] = np.concatenate(([0], np.cumsum(cell_counts)))
+    for array in tables.values():
+        array.setflags(write=False)
+    return tables
+
+
+def save_tables(width: int, height: int, folder: Path) -> Path:
+    """ Write a grid's placement tables, so other processes can attach them.
+
+    :param folder: where to create a sub folder for this grid size
+    :return: the sub folder, with one .npy file for each table
+    """
+    table_folder = folder / f'{width}x{height}'
+    table_folder.mkdir(parents=True, exist_ok=True)
+    for name, array in build_tables(width, height).items():
+        np.save(table_folder / f'{name}.npy', array)
+    return table_folder
+
+
+def attach_tables(folder: Path):
+    """ Memory-map placement tables written by save_tables().
+
+    The operating system shares the mapped pages between all the processes
+    that attach the same files, instead of each one building its own copy.
+    :param folder: the folder that was passed to save_tables()
+    """
+    for table_folder in folder.iterdir():
+        width, height = map(int, table_folder.name.split('x'))
+        attached_tables[(width, height)] = {
+            name: np.load(table_folder / f'{name}.npy', mmap_mode='r')
+            for name in TABLE_NAMES}
+    build_tables.cache_clear()
+    build_placements.cache_clear()
+    build_cell_index.cache_clear()
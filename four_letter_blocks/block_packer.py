@@ -1,14 +1,40 @@
+import copy
 import math
+import random
 import typing
 from collections import defaultdict, Counter
-from functools import cache
-from random import shuffle
+from functools import cache, lru_cache
+from time import perf_counter
 
 import numpy as np
-from scipy.ndimage import label  # type: ignore
 
+from four_letter_blocks.bit_board import (build_placements, pack_bits,
+                                          shape_cell_offsets, TABLE_CACHE_SIZE)
 from four_letter_blocks.block import shape_rotations, normalize_coordinates, Block
+from four_letter_blocks.branching import BranchingStrategy
+from four_letter_blocks.packer_stats import PackerStats
+from four_letter_blocks.region_parity import find_even_slots
+from four_letter_blocks.restarts import iter_budgets
+from four_letter_blocks.slot_tracker import SlotTracker
 from four_letter_blocks.square import Square
+from four_letter_blocks.symmetry import find_symmetries, SymmetryPruner
+from four_letter_blocks.transposition_table import TranspositionTable
+
+
+def create_rng(seed: int | None = None) -> random.Random:
+    """ Create a random stream.
+
+    :param seed: seed for a reproducible stream, or None to take a seed from
+        the random module, so random.seed() still makes runs repeatable.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    return random.Random(seed)
+
+
+def spawn_rng(rng: random.Random) -> random.Random:
+    """ Create an independent child stream, for a worker. """
+    return random.Random(rng.getrandbits(64))
 
 
 class BlockPacker:
@@ -62,10 +88,47 @@ class BlockPacker:
         # True if self.state should be set, even with a partial filling
         self.are_partials_saved = False
 
+        # True if branches that mirror a branch with no solution should be
+        # skipped, when the open spaces and shape counts are symmetric.
+        self.are_symmetries_pruned = False
+
+        # Tries for the first search of a restart schedule, or 0 to search
+        # once. Each restart shuffles the slots again, see fill_with_restarts().
+        self.restart_unit = 0
+        self.restart_schedule = 'luby'  # see restarts.SCHEDULES
+
         self.extra_gaps = -1
         self.fewest_unused: int | None = None
         self.slot_coverage = self.state
 
+        # Set during fill() to update slots as blocks are placed and removed.
+        self.slot_tracker: SlotTracker | None = None
+
+        # Order to try shapes and slots in fill(), see branching.py.
+        self.branching = BranchingStrategy()
+
+        # Optional cache of search states with no solution, can be shared
+        # between calls to fill().
+        self.transposition_table: TranspositionTable | None = None
+
+        # Random stream for shuffling slots, created when first needed. Set
+        # it to a seeded stream to repeat a fill.
+        self._rng: random.Random | None = None
+
+        # Counters for the search, collected across calls to fill().
+        self.stats = PackerStats()
+        self.depth = 0  # branches taken to reach the current search node
+
+    @property
+    def rng(self) -> random.Random:
+        if self._rng is None:
+            self._rng = create_rng()
+        return self._rng
+
+    @rng.setter
+    def rng(self, rng: random.Random):
+        self._rng = rng
+
     @property
     def positions(self):
         result = defaultdict(list)
@@ -128,6 +191,9 @@ class BlockPacker:
         """
         if self.state is None:
             raise RuntimeError('Cannot find slots with invalid state.')
+        stats = self.stats
+        start_time = perf_counter()
+        stats.slot_search_count += 1
 
         # Track spaces that are already filled, or how many slots cover them.
         non_gaps = self.state.astype(bool)
@@ -138,56 +204,79 @@ class BlockPacker:
                 gap_count = self.width * self.height - non_gaps.sum()
                 needed_gaps = sum(shape_counts.values()) * 4
                 self.extra_gaps = max(0, gap_count - needed_gaps)
-        slot_coverage = non_gaps.astype(np.uint8) * 255
-        all_masks = build_masks(self.width, self.height)
+        tracker = self.slot_tracker
+        if tracker is not None:
+            slots = tracker.find_slots()
+        else:
+            slots = self.scan_slots(non_gaps)
+        if self.force_fours:
+            label_start = perf_counter()
+            slots = find_even_slots(np.logical_not(non_gaps), slots)
+            stats.label_time += perf_counter() - label_start
+        if tracker is not None and not self.force_fours:
+            self.slot_coverage = tracker.slot_coverage
+            uncovered_count = tracker.uncovered_count
+        else:
+            self.slot_coverage = self.calculate_coverage(slots, non_gaps)
+            # noinspection PyTypeChecker
+            uncovered: np.ndarray = self.slot_coverage == 0
+            uncovered_count = uncovered.sum()
+        if not (self.are_partials_saved or
+                uncovered_count <= self.extra_gaps):
+            # Some unfilled spaces weren't covered by any usable slots, return
+            # empty.
+            slots = {}
+        stats.slot_search_time += perf_counter() - start_time
+        return slots
+
+    def scan_slots(self, non_gaps: np.ndarray) -> dict[str, np.ndarray]:
+        """ Check every placement against the current state.
+
+        :param non_gaps: boolean array of filled spaces
+        :return: {shape: bitmap} of slots that are open and don't cross the
+            split row
+        """
+        occupied = pack_bits(non_gaps)
+        all_placements = build_placements(self.width, self.height)
         shape_heights = get_shape_heights()
         slots = {}
-        padded = np.pad(non_gaps, (0, 3), constant_values=1)
-        for shape, masks in all_masks.items():
-            collisions = np.logical_and(masks, padded)
-            colliding_positions = np.any(collisions, axis=(2, 3))
+        for shape, placements in all_placements.items():
+            collisions = np.bitwise_and(placements.words, occupied)
+            open_placements = np.logical_not(np.any(collisions, axis=1))
 
             # Check for rows that cross the split row.
             shape_height = shape_heights[shape]
-            crossing_positions = np.zeros_like(colliding_positions)
-            crossing_positions[
-                self.split_row-shape_height+1:self.split_row, :] = True
+            crossing = ((self.split_row-shape_height+1 <= placements.rows) &
+                        (placements.rows < self.split_row))
+            open_placements &= np.logical_not(crossing)
 
-            open_slots = np.logical_not(np.logical_or(colliding_positions,
-                                                      crossing_positions))
-
-            if not self.force_fours:
-                usable_slots = open_slots
-            else:
-                gaps = np.logical_not(np.logical_or(masks, padded))
-                structure = np.zeros((3, 3, 3, 3), bool)
-                structure[1, 1, :, :] = [[0, 1, 0],
-                                         [1, 1, 1],
-                                         [0, 1, 0]]
-                gap_groups: np.ndarray
-                gap_groups, group_count = label(gaps, structure=structure)
-                bin_counts = np.bincount(gap_groups.flatten())
-                uneven_groups, = np.nonzero(bin_counts % 4)
-                if uneven_groups.size and uneven_groups[0] == 0:
-                    uneven_groups = uneven_groups[1:]
-                is_uneven = np.isin(gap_groups, uneven_groups)
-                has_even = np.logical_not(np.any(is_uneven, axis=(2, 3)))
-
-                usable_slots = np.logical_and(open_slots, has_even)
-            usable_masks = masks[usable_slots]
-            shape_coverage = usable_masks[:, :self.height, :self.width].sum(
-                axis=0, dtype=np.uint8)
-            slot_coverage += shape_coverage
+            usable_slots = np.zeros((self.height, self.width), dtype=bool)
+            usable_slots[placements.rows[open_placements],
+                         placements.cols[open_placements]] = True
             slots[shape] = usable_slots
-        self.slot_coverage = slot_coverage
-        # noinspection PyTypeChecker
-        uncovered: np.ndarray = self.slot_coverage == 0
-        uncovered_count = uncovered.sum()
-        if self.are_partials_saved or uncovered_count <= self.extra_gaps:
-            return slots
+        return slots
 
-        # Some unfilled spaces weren't covered by any usable slots, return empty.
-        return {}
+    def calculate_coverage(self,
+                           slots: dict[str, np.ndarray],
+                           non_gaps: np.ndarray) -> np.ndarray:
+        """ Count how many slots cover each space.
+
+        :param slots: {shape: bitmap}
+        :param non_gaps: boolean array of filled spaces
+        :return: coverage of each space, or 255 if it's already filled
+        """
+        slot_coverage = non_gaps.astype(np.uint8) * 255
+        coverage_counts = np.zeros(self.width * self.height, dtype=np.uint8)
+        all_placements = build_placements(self.width, self.height)
+        for shape, shape_slots in slots.items():
+            placements = all_placements[shape]
+            slot_rows, slot_cols = np.nonzero(shape_slots)
+            cells = placements.cells[placements.index[slot_rows, slot_cols]]
+            coverage_counts += np.bincount(
+                cells.ravel(),
+                minlength=coverage_counts.size).astype(np.uint8)
+        slot_coverage += coverage_counts.reshape(slot_coverage.shape)
+        return slot_coverage
 
     def display(self, state: np.ndarray | None = None) -> str:
         if state is None:
@@ -269,9 +358,10 @@ class BlockPacker:
         different positions, looking for the fewest rows. Set the current state
         to a filled in copy, not changing the original.
 
-        Slots with least coverage are always filled first. If
-        self.are_slots_shuffled is True, then coverage ties are broken randomly,
-        otherwise ties are filled from top to bottom.
+        self.branching chooses the order to try shapes and slots. By default,
+        shapes with the fewest slots for each block are tried first. If
+        self.are_slots_shuffled is True, then each shape's slots are tried in
+        random order, otherwise from top to bottom.
 
         If self.are_partials_saved is True, then we don't cycle through options,
         just make the first choice for each slot and return with self.state set.
@@ -283,18 +373,44 @@ class BlockPacker:
         :return: True, if all requested shapes have been placed, or if no gaps
             are left, otherwise False.
         """
-        are_slots_shuffled = self.are_slots_shuffled
+        if (self.restart_unit > 0 and
+                self.slot_tracker is None and
+                not self.are_partials_saved):
+            return self.fill_with_restarts(shape_counts)
+        if self.slot_tracker is None and self.state is not None:
+            # Top level of the search, so start tracking slots.
+            self.slot_tracker = SlotTracker(self.state != 0, self.split_row)
+            try:
+                return self.fill(shape_counts)
+            finally:
+                self.slot_tracker = None
+        slot_tracker = self.slot_tracker
         are_partials_saved = self.are_partials_saved
         if self.tries == 0:
             self.state = None
             return False
-        if self.tries > 0:
-            self.tries -= 1
-        best_state = None
         assert self.state is not None
+        assert slot_tracker is not None
         start_state = self.state
         if shape_counts is None:
             shape_counts = self.calculate_max_shape_counts()
+        table = self.transposition_table
+        state_key = None
+        if table is not None and not are_partials_saved:
+            state_key = table.find_key(start_state != 0,
+                                       shape_counts,
+                                       self.width,
+                                       self.extra_gaps,
+                                       self.split_row,
+                                       self.force_fours)
+            if table.is_dead(state_key):
+                self.state = None
+                return False
+        if self.tries > 0:
+            self.tries -= 1
+        stats = self.stats
+        stats.node_count += 1
+        best_state = None
         if not sum(shape_counts.values()):
             # Nothing to add!
             best_state = start_state
@@ -302,91 +418,64 @@ class BlockPacker:
         fewest_rows = start_state.shape[0]+1
 
         slots = self.find_slots(shape_counts)
-        is_rotation_allowed = all(len(shape) == 1 for shape in shape_counts)
-        raw_slot_counts = {shape: shape_slots.sum()
-                           for shape, shape_slots in slots.items()}
-        if not is_rotation_allowed:
-            slot_counts = raw_slot_counts
-        else:
-            slot_counts = Counter()
-            for shape, slot_count in raw_slot_counts.items():
-                slot_counts[shape[0]] += slot_count
-
-        shape_scores: typing.Counter[str] = Counter()
-        for shape, slot_count in slot_counts.items():
-            target_count = shape_counts[shape]
-            if target_count == 0:
-                continue
-            if slot_count == 0 and are_partials_saved:
-                # Don't try shape with no slots, but don't give up, either.
-                continue
-            # noinspection PyTypeChecker
-            shape_scores[shape] = -slot_count / target_count
-        for shape, _score in shape_scores.most_common():
-            if not is_rotation_allowed:
-                slot_shapes = [shape]
-            else:
-                slot_shapes = [slot_shape
-                               for slot_shape in slots.keys()
-                               if slot_shape.startswith(shape)]
-            old_count = shape_counts[shape]
-            shape_counts[shape] = old_count - 1
-            for rotated_shape in slot_shapes:
-                slot_rows, slot_cols = np.nonzero(slots[rotated_shape])
-                if len(slot_rows) == 0:
-                    continue
-                slot_indexes = list(range(len(slot_rows)))
-                if are_slots_shuffled:
-                    shuffle(slot_indexes)
-                for slot_index in slot_indexes:
-                    # noinspection PyTypeChecker
-                    target_row: int = slot_rows[slot_index]
-                    # noinspection PyTypeChecker
-                    target_col: int = slot_cols[slot_index]
-
-                    self.state = start_state
-                    for new_state in self.place_block(rotated_shape,
-                                                      target_row,
-                                                      target_col,
-                                                      next_block):
-                        self.state = new_state
-                        unused_count = np.count_nonzero(self.state == self.UNUSED)
-                        if (self.fewest_unused is None or
-                                unused_count < self.fewest_unused):
-                            self.fewest_unused = unused_count
-                        is_filled = unused_count == 0
-                        remaining_pieces_count = sum(shape_counts.values())
-                        is_finished = is_filled or remaining_pieces_count == 0
-                        if self.is_tracing:
-                            print(f'{unused_count} unused '
-                                  f'with {self.tries} tries left, '
-                                  f'finished? {is_finished}')
-                            print(self.display())
-                        if not is_finished and self.tries != 0:
-                            is_filled = self.fill(shape_counts)
-                            if not is_filled:
-                                continue
-                        used_rows = self.count_filled_rows()
-                        if used_rows < fewest_rows:
-                            best_state = self.state
-                            fewest_rows = used_rows
-                        if 0 <= self.tries <= self.stop_tries and best_state is not None:
-                            break
-                        if are_partials_saved:
-                            break
-                    if 0 <= self.tries <= self.stop_tries and best_state is not None:
-                        break
-                    if are_partials_saved:
-                        break
+        pruner = None
+        if self.are_symmetries_pruned and not are_partials_saved:
+            symmetries = find_symmetries(start_state == self.UNUSED,
+                                         shape_counts,
+                                         self.split_row)
+            if symmetries:
+                pruner = SymmetryPruner([(symmetry.cell_map,)
+                                         for symmetry in symmetries])
+        for branch in self.branching.iter_branches(self, slots, shape_counts):
+            shape_counts[branch.shape] -= 1
+            self.state = start_state
+            for new_state, cells in self.place_block_with_cells(
+                    branch.rotated_shape,
+                    branch.row,
+                    branch.col,
+                    next_block):
+                self.state = new_state
+                unused_count = np.count_nonzero(self.state == self.UNUSED)
+                if (self.fewest_unused is None or
+                        unused_count < self.fewest_unused):
+                    self.fewest_unused = unused_count
+                is_filled = unused_count == 0
+                remaining_pieces_count = sum(shape_counts.values())
+                is_finished = is_filled or remaining_pieces_count == 0
+                if self.is_tracing:
+                    print(f'{unused_count} unused '
+                          f'with {self.tries} tries left, '
+                          f'finished? {is_finished}')
+                    print(self.display())
+                if not is_finished and self.tries != 0:
+                    if pruner is not None and pruner.is_image(cells):
+                        stats.pruned_count += 1
+                        continue
+                    slot_tracker.place(cells)
+                    self.depth += 1
+                    stats.max_depth = max(stats.max_depth, self.depth)
+                    is_filled = self.fill(shape_counts)
+                    self.depth -= 1
+                    slot_tracker.undo()
+                    if not is_filled:
+                        stats.backtrack_count += 1
+                        if pruner is not None and self.tries != 0:
+                            pruner.add_refuted(cells)
+                        continue
+                used_rows = self.count_filled_rows()
+                if used_rows < fewest_rows:
+                    best_state = self.state
+                    fewest_rows = used_rows
                 if 0 <= self.tries <= self.stop_tries and best_state is not None:
                     break
                 if are_partials_saved:
                     break
             if 0 <= self.tries <= self.stop_tries and best_state is not None:
+                # Stop with the block still counted as placed.
                 break
             if are_partials_saved:
                 break
-            shape_counts[shape] = old_count
+            shape_counts[branch.shape] += 1
         # if ((not is_rotation_allowed or best_state is None) and
         #         not are_partials_saved):
         #     return False
@@ -403,8 +492,188 @@ class BlockPacker:
             return True
         if not are_partials_saved:
             self.state = None
+        if table is not None and state_key is not None and self.tries != 0:
+            # Searched every option without running out of tries.
+            table.add_dead(state_key)
         return False
 
+    def fill_with_restarts(
+            self,
+            shape_counts: typing.Counter[str] | None = None) -> bool:
+        """ Fill with a series of shuffled searches, like fill().
+
+        Each search gets the next budget from the restart schedule, and
+        self.tries limits the total. The first complete fill wins. If none
+        of the searches complete, keep the partial fill with the fewest
+        unused spaces. Within each search, min_tries is respected like
+        fill().
+        :param shape_counts: number of blocks of each shape, like fill(), but
+            not changed.
+        :return: True if any search filled, even partially, like fill().
+        """
+        assert self.state is not None
+        if shape_counts is None:
+            shape_counts = self.calculate_max_shape_counts()
+        start_state = self.state
+        requested_count = sum(shape_counts.values())
+        start_blocks = np.unique(start_state[start_state > self.GAP]).size
+        total_tries = self.tries
+        stop_tries = self.stop_tries
+        min_tries = self.tries - stop_tries if stop_tries else -1
+        restart_unit = self.restart_unit
+        are_slots_shuffled = self.are_slots_shuffled
+        best_state = None
+        best_unused = None
+        self.restart_unit = 0
+        self.are_slots_shuffled = True
+        try:
+            for budget in iter_budgets(self.restart_schedule, restart_unit):
+                if total_tries == 0:
+                    break
+                if total_tries > 0:
+                    budget = min(budget, total_tries)
+                self.state = start_state
+                self.tries = budget
+                self.stop_tries = 0
+                if 0 <= min_tries < budget:
+                    self.stop_tries = budget - min_tries
+                self.stats.restart_count += 1
+                is_filled = self.fill(Counter(shape_counts))
+                if total_tries > 0:
+                    total_tries -= budget - self.tries
+                state = self.state
+                if not is_filled and self.tries != 0:
+                    # Searched every option, so restarting won't help.
+                    break
+                if not is_filled or state is None:
+                    continue
+                unused_count = np.count_nonzero(state == self.UNUSED)
+                new_blocks = (np.unique(state[state > self.GAP]).size -
+                              start_blocks)
+                if unused_count == 0 or new_blocks >= requested_count:
+                    best_state = state
+                    break
+                if best_unused is None or unused_count < best_unused:
+                    best_state = state
+                    best_unused = unused_count
+        finally:
+            self.restart_unit = restart_unit
+            self.are_slots_shuffled = are_slots_shuffled
+        self.tries = total_tries
+        self.stop_tries = stop_tries
+        self.state = best_state
+        return best_state is not None
+
+    def iter_solutions(
+            self,
+            shape_counts: typing.Counter[str] | None = None) -> typing.Iterator[
+                np.ndarray]:
+        """ Generate each distinct packing, as the search finds it.
+
+        Unlike fill(), this doesn't stop at the first packing or compare
+        packings. Each branch covers the open space with the least slot
+        coverage, either with a block or, if there are spaces to spare, by
+        leaving it empty, so no packing is generated twice. The search waits
+        between packings, so a caller can stop after as many as it needs.
+
+        Uses self.tries, self.force_fours, and self.are_slots_shuffled like
+        fill(). self.state is restored when the generator finishes or is
+        closed.
+        :param shape_counts: number of blocks of each shape, like fill(), but
+            not changed.
+        :return: an iterator of packed states, each a new array
+        """
+        assert self.state is not None
+        if shape_counts is None:
+            shape_counts = self.calculate_max_shape_counts()
+        start_state = self.state
+        self.state = start_state.copy()
+        old_tracker = self.slot_tracker
+        self.slot_tracker = SlotTracker(start_state != 0, self.split_row)
+        try:
+            yield from self.search_solutions(Counter(shape_counts), [])
+        finally:
+            self.slot_tracker = old_tracker
+            self.state = start_state
+
+    def search_solutions(
+            self,
+            shape_counts: typing.Counter[str],
+            empty_cells: typing.List[int]) -> typing.Iterator[np.ndarray]:
+        """ Search below the current state, for iter_solutions().
+
+        :param shape_counts: remaining blocks of each shape, restored before
+            returning
+        :param empty_cells: spaces chosen to stay empty, marked as gaps in
+            self.state until a packing is generated
+        """
+        state = self.state
+        slot_tracker = self.slot_tracker
+        assert state is not None
+        assert slot_tracker is not None
+        if self.tries == 0:
+            return
+        if self.tries > 0:
+            self.tries -= 1
+        stats = self.stats
+        stats.node_count += 1
+        stats.max_depth = max(stats.max_depth, self.depth)
+        if (not sum(shape_counts.values()) or
+                not np.count_nonzero(state == self.UNUSED)):
+            solution = state.copy()
+            solution.flat[empty_cells] = self.UNUSED
+            yield solution
+            return
+        slots = self.find_slots(shape_counts)
+        coverage = self.slot_coverage.ravel()
+        open_cells = np.flatnonzero((0 < coverage) & (coverage < 255))
+        if not slots or open_cells.size == 0:
+            stats.backtrack_count += 1
+            return
+        cell = int(open_cells[np.argmin(coverage[open_cells])])
+
+        index = slot_tracker.index
+        grid_size = self.width * self.height
+        is_rotation_allowed = all(len(shape) == 1 for shape in shape_counts)
+        cell_placements = index.cell_placements[
+            index.cell_starts[cell]:index.cell_starts[cell+1]]
+        shape_ids = np.searchsorted(index.shape_starts,
+                                    cell_placements,
+                                    side='right') - 1
+        options = []
+        for placement, shape_id in zip(cell_placements.tolist(),
+                                       shape_ids.tolist()):
+            shape = index.shapes[shape_id]
+            key = shape[0] if is_rotation_allowed else shape
+            position = index.slot_positions[placement] - shape_id * grid_size
+            if shape_counts[key] and slots[shape].flat[position]:
+                options.append((key, index.cells[placement]))
+        if self.are_slots_shuffled:
+            self.rng.shuffle(options)
+
+        next_block = self.find_next_block()
+        self.depth += 1
+        for key, cells in options:
+            state.flat[cells] = next_block
+            shape_counts[key] -= 1
+            slot_tracker.place(cells)
+            yield from self.search_solutions(shape_counts, empty_cells)
+            slot_tracker.undo()
+            shape_counts[key] += 1
+            state.flat[cells] = self.UNUSED
+        if self.extra_gaps > 0:
+            # Leave the cell empty, and use up one of the spare spaces.
+            state.flat[cell] = self.GAP
+            empty_cells.append(cell)
+            self.extra_gaps -= 1
+            slot_tracker.place(np.array([cell]))
+            yield from self.search_solutions(shape_counts, empty_cells)
+            slot_tracker.undo()
+            self.extra_gaps += 1
+            empty_cells.pop()
+            state.flat[cell] = self.UNUSED
+        self.depth -= 1
+
     def find_next_block(self) -> int:
         used_blocks = np.unique(self.state)  # type: ignore
         block: int
@@ -435,31 +704,53 @@ class BlockPacker:
         :param block_num: block value to place in the state
         :return: an iterator of states for each successful placement
         """
+        for new_state, _cells in self.place_block_with_cells(shape_name,
+                                                             target_row,
+                                                             target_col,
+                                                             block_num):
+            yield new_state
+
+    def place_block_with_cells(
+            self,
+            shape_name: str,
+            target_row: int,
+            target_col: int,
+            block_num: int) -> typing.Iterator[typing.Tuple[np.ndarray,
+                                                            np.ndarray]]:
+        """ Try to place the block, like place_block().
+
+        :return: an iterator of (state, cells) for each successful placement,
+            where cells holds the flat indexes of the block's spaces.
+        """
         assert self.state is not None
         start_state = self.state
-        blocks = shape_coordinates()
         if len(shape_name) == 1:
-            allowed_blocks = blocks[shape_name]
+            allowed_shapes = [shape
+                              for shape in shape_cell_offsets()
+                              if shape.startswith(shape_name)]
         else:
             assert len(shape_name) == 2
-            rotation = int(shape_name[1])
-            allowed_blocks = blocks[shape_name[0]][rotation:rotation + 1]
-        for block in allowed_blocks:
-            new_state = start_state.copy()
-            start_col = target_col
-            end_col = target_col + block.shape[1]
-            end_row = target_row + block.shape[0]
-            if target_row < self.split_row < end_row:
+            allowed_shapes = [shape_name]
+        occupied = pack_bits(start_state != 0)
+        all_placements = build_placements(self.width, self.height)
+        for shape in allowed_shapes:
+            placements = all_placements[shape]
+            if not (0 <= target_row < self.height and
+                    0 <= target_col < self.width):
                 continue
-            target = new_state[target_row:end_row, start_col:end_col]
-            if target.shape != block.shape:
+            placement = placements.index[target_row, target_col]
+            if placement < 0:
                 # hanging over the edge
                 continue
-            collisions = np.logical_and(block, target)
-            if collisions.any():
+            end_row = target_row + get_shape_heights()[shape]
+            if target_row < self.split_row < end_row:
+                continue
+            if np.bitwise_and(placements.words[placement], occupied).any():
                 continue
-            target += block_num * block
-            yield new_state
+            new_state = start_state.copy()
+            cells = placements.cells[placement]
+            new_state.flat[cells] = block_num
+            yield new_state, cells
 
     def remove_block(self, row: int, col: int) -> str:
         """ Remove a block from the current state.
@@ -494,6 +785,25 @@ class BlockPacker:
         self.are_partials_saved = False
         self.fill(shape_counts)
 
+    def clone_empty(self, width: int, height: int) -> 'BlockPacker':
+        """ Create an empty packer of the same class and search settings.
+
+        Settings like tries, split_row, force_fours, branching, rng, and the
+        transposition table carry over, but the new packer has its own state
+        and stats.
+        """
+        packer = copy.copy(self)
+        packer.width = width
+        packer.height = height
+        packer.state = np.zeros((height, width), np.uint8)
+        packer.slot_coverage = packer.state
+        packer.slot_tracker = None
+        packer.extra_gaps = -1
+        packer.fewest_unused = None
+        packer.stats = PackerStats()
+        packer.depth = 0
+        return packer
+
     def flip(self) -> 'BlockPacker':
         assert self.state is not None
         flipped_state = np.copy(np.fliplr(self.state))
@@ -513,10 +823,12 @@ def shape_coordinates() -> typing.Dict[str, typing.List[np.ndarray]]:
     return dict(coordinate_lists)
 
 
-@cache
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
 def build_masks(width: int, height: int) -> dict[str, np.ndarray]:
     """ Build the masks for each shape in each position.
 
+    These dense masks are big, so packers use build_placements() instead.
+
     :return: {shape_name: mask_array}, where mask_array is a four-dimensional
         array of occupied spaces with index (start_row, start_col, row, col). In
         other words, if the shape starts at (start_row, start_col), is
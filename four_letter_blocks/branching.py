@@ -0,0 +1,223 @@
+""" Choose the order that BlockPacker.fill() tries its branches.
+
+A branch places one block: a shape from the remaining counts, in one open
+slot. Each strategy orders all the branches at a search node, and may leave
+out branches that can't lead to a full packing. Set BlockPacker.branching
+before calling fill(). When packer.are_slots_shuffled is True, each strategy
+breaks its ties randomly.
+"""
+import typing
+from collections import Counter
+
+import numpy as np
+
+from four_letter_blocks.bit_board import build_placements, shape_cell_offsets
+
+if typing.TYPE_CHECKING:
+    from four_letter_blocks.block_packer import BlockPacker
+
+
+class Branch(typing.NamedTuple):
+    shape: str  # key in shape_counts, with or without a rotation number
+    rotated_shape: str  # shape with rotation, key in the slots
+    row: int  # top-left corner of the shape, like build_placements()
+    col: int
+
+
+class BranchingStrategy:
+    """ Try shapes with the fewest slots for each block that's needed.
+
+    Each shape's slots are tried from top to bottom, or shuffled.
+    """
+    name = 'shape-scores'
+
+    def iter_branches(self,
+                      packer: 'BlockPacker',
+                      slots: dict[str, np.ndarray],
+                      shape_counts: typing.Counter[str]) -> typing.Iterator[
+                          Branch]:
+        """ Generate branches in the order to try them.
+
+        :param packer: the packer at the current search node, after it
+            called find_slots()
+        :param slots: {shape: bitmap} from packer.find_slots()
+        :param shape_counts: number of blocks left for each shape
+        """
+        for shape in self.order_shapes(packer, slots, shape_counts):
+            for rotated_shape in find_rotations(shape, slots, shape_counts):
+                slot_rows, slot_cols = np.nonzero(slots[rotated_shape])
+                if len(slot_rows) == 0:
+                    continue
+                slot_indexes = list(range(len(slot_rows)))
+                if packer.are_slots_shuffled:
+                    packer.rng.shuffle(slot_indexes)
+                for slot_index in slot_indexes:
+                    yield Branch(shape,
+                                 rotated_shape,
+                                 int(slot_rows[slot_index]),
+                                 int(slot_cols[slot_index]))
+
+    @staticmethod
+    def order_shapes(packer: 'BlockPacker',
+                     slots: dict[str, np.ndarray],
+                     shape_counts: typing.Counter[str]) -> typing.List[str]:
+        """ Sort shapes by their number of slots for each block needed. """
+        is_rotation_allowed = all(len(shape) == 1 for shape in shape_counts)
+        raw_slot_counts = {shape: shape_slots.sum()
+                           for shape, shape_slots in slots.items()}
+        if not is_rotation_allowed:
+            slot_counts = raw_slot_counts
+        else:
+            slot_counts = Counter()
+            for shape, slot_count in raw_slot_counts.items():
+                slot_counts[shape[0]] += slot_count
+
+        shape_scores: typing.Counter[str] = Counter()
+        for shape, slot_count in slot_counts.items():
+            target_count = shape_counts[shape]
+            if target_count == 0:
+                continue
+            if slot_count == 0 and packer.are_partials_saved:
+                # Don't try shape with no slots, but don't give up, either.
+                continue
+            # noinspection PyTypeChecker
+            shape_scores[shape] = -slot_count / target_count
+        return [shape for shape, _score in shape_scores.most_common()]
+
+    def list_branches(self,
+                      packer: 'BlockPacker',
+                      slots: dict[str, np.ndarray],
+                      shape_counts: typing.Counter[str]) -> typing.List[Branch]:
+        """ List branches in the default order, without shuffling. """
+        return [Branch(shape, rotated_shape, int(row), int(col))
+                for shape in self.order_shapes(packer, slots, shape_counts)
+                for rotated_shape in find_rotations(shape, slots, shape_counts)
+                for row, col in zip(*np.nonzero(slots[rotated_shape]))]
+
+    @staticmethod
+    def sort_branches(packer: 'BlockPacker',
+                      branches: typing.List[Branch],
+                      keys: typing.Sequence) -> typing.List[Branch]:
+        """ Sort branches by their keys, breaking ties randomly if the
+        packer's slots are shuffled, otherwise keeping the default order.
+        """
+        order = list(range(len(branches)))
+        if packer.are_slots_shuffled:
+            packer.rng.shuffle(order)
+        order.sort(key=keys.__getitem__)
+        return [branches[i] for i in order]
+
+
+class MostConstrainedCellBranching(BranchingStrategy):
+    """ Cover the open space with the fewest slots first.
+
+    If there are no spare spaces, that space has to be covered, so the
+    other branches are left out. Otherwise, or when saving a partial fill,
+    they're tried afterward.
+    """
+    name = 'most-constrained-cell'
+
+    def iter_branches(self,
+                      packer: 'BlockPacker',
+                      slots: dict[str, np.ndarray],
+                      shape_counts: typing.Counter[str]) -> typing.Iterator[
+                          Branch]:
+        branches = self.list_branches(packer, slots, shape_counts)
+        coverage = packer.slot_coverage.ravel()
+        open_cells = np.flatnonzero((0 < coverage) & (coverage < 255))
+        if open_cells.size == 0:
+            return iter(branches)
+        open_coverage = coverage[open_cells]
+        target_cells = open_cells[open_coverage == open_coverage.min()]
+        if packer.are_slots_shuffled:
+            target_cell = packer.rng.choice(target_cells.tolist())
+        else:
+            target_cell = target_cells[0]
+        is_covering = [target_cell in find_cells(packer, branch)
+                       for branch in branches]
+        if packer.extra_gaps <= 0 and not packer.are_partials_saved:
+            covering_branches = [branch
+                                 for branch, is_branch_covering in zip(
+                                     branches,
+                                     is_covering)
+                                 if is_branch_covering]
+            return iter(self.sort_branches(packer,
+                                           covering_branches,
+                                           [0] * len(covering_branches)))
+        keys = [not is_branch_covering for is_branch_covering in is_covering]
+        return iter(self.sort_branches(packer, branches, keys))
+
+
+class LeastConstrainingBranching(BranchingStrategy):
+    """ Try each shape's slots that block the fewest other slots first.
+
+    A slot blocks every other slot that covers any of its spaces, so its
+    score is the total coverage of its spaces.
+    """
+    name = 'least-constraining-placement'
+
+    def iter_branches(self,
+                      packer: 'BlockPacker',
+                      slots: dict[str, np.ndarray],
+                      shape_counts: typing.Counter[str]) -> typing.Iterator[
+                          Branch]:
+        branches = self.list_branches(packer, slots, shape_counts)
+        coverage = packer.slot_coverage.ravel()
+        shape_ranks = {shape: rank
+                       for rank, shape in enumerate(
+                           self.order_shapes(packer, slots, shape_counts))}
+        keys = [(shape_ranks[branch.shape],
+                 int(coverage[find_cells(packer, branch)].sum()))
+                for branch in branches]
+        return iter(self.sort_branches(packer, branches, keys))
+
+
+class FewestRowsBranching(BranchingStrategy):
+    """ Try the slots that end highest in the grid first.
+
+    fill() looks for the packing with the fewest rows, so this finds short
+    packings early.
+    """
+    name = 'fewest-rows'
+
+    def iter_branches(self,
+                      packer: 'BlockPacker',
+                      slots: dict[str, np.ndarray],
+                      shape_counts: typing.Counter[str]) -> typing.Iterator[
+                          Branch]:
+        branches = self.list_branches(packer, slots, shape_counts)
+        shape_ranks = {shape: rank
+                       for rank, shape in enumerate(
+                           self.order_shapes(packer, slots, shape_counts))}
+        offsets = shape_cell_offsets()
+        keys = [(branch.row + offsets[branch.rotated_shape][-1][0],
+                 shape_ranks[branch.shape])
+                for branch in branches]
+        return iter(self.sort_branches(packer, branches, keys))
+
+
+BRANCHING_STRATEGIES: dict[str, typing.Type[BranchingStrategy]] = {
+    strategy_class.name: strategy_class
+    for strategy_class in (BranchingStrategy,
+                           MostConstrainedCellBranching,
+                           LeastConstrainingBranching,
+                           FewestRowsBranching)}
+
+
+def find_rotations(shape: str,
+                   slots: dict[str, np.ndarray],
+                   shape_counts: typing.Counter[str]) -> typing.List[str]:
+    """ List the rotated shapes in the slots that a shape count allows. """
+    is_rotation_allowed = all(len(counted) == 1 for counted in shape_counts)
+    if not is_rotation_allowed:
+        return [shape]
+    return [slot_shape
+            for slot_shape in slots.keys()
+            if slot_shape.startswith(shape)]
+
+
+def find_cells(packer: 'BlockPacker', branch: Branch) -> np.ndarray:
+    """ Find the flat indexes of the spaces that a branch covers. """
+    placements = build_placements(packer.width,
+                                  packer.height)[branch.rotated_shape]
+    return placements.cells[placements.index[branch.row, branch.col]]
@@ -1,10 +1,94 @@
 import typing
 from collections import Counter, defaultdict
+from functools import lru_cache
 
 import numpy as np
 
+from four_letter_blocks.bit_board import build_placements, TABLE_CACHE_SIZE
 from four_letter_blocks.block import flipped_shapes
-from four_letter_blocks.block_packer import BlockPacker, build_masks
+from four_letter_blocks.block_packer import BlockPacker, create_rng
+from four_letter_blocks.packer_stats import PackerStats
+from four_letter_blocks.symmetry import find_symmetries, SymmetryPruner
+from four_letter_blocks.transposition_table import StateKey, TranspositionTable
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def build_cell_placements(width: int,
+                          height: int) -> dict[str, typing.Tuple[np.ndarray, ...]]:
+    """ Index the placements that cover each cell.
+
+    :return: {shape_name: placements}, where placements[cell] is an array of
+        the flat start indexes (start_row*width + start_col) for every
+        placement of that shape that covers the flat cell index, in
+        ascending order.
+    """
+    cell_placements = {}
+    for shape, placements in build_placements(width, height).items():
+        starts = placements.rows * width + placements.cols
+        covering_cells = placements.cells.ravel()
+        order = np.argsort(covering_cells, kind='stable')
+        cell_counts = np.bincount(covering_cells, minlength=width*height)
+        shape_starts = starts[order // 4]
+        shape_starts.setflags(write=False)
+        cell_placements[shape] = tuple(np.split(shape_starts,
+                                                np.cumsum(cell_counts)[:-1]))
+    return cell_placements
+
+
+def iter_slot_pairs(
+        coords1: np.ndarray,
+        shape2_slots: np.ndarray,
+        cell_placements2: typing.Sequence[np.ndarray],
+        sorted_cells2: np.ndarray) -> typing.Iterator[
+            typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int]]]:
+    """ Generate candidate pairs of slots for the same block on both sides.
+
+    :param coords1: [slot, 2] array of (row, col) to try on the first side
+    :param shape2_slots: boolean array of the open slots on the second side
+    :param cell_placements2: from build_cell_placements() for the second shape
+    :param sorted_cells2: flat cell indexes on the second side, in the order
+        to cover them
+    :return: ((row1, col1), (row2, col2)) for each slot on the second side
+        that covers each cell in turn, paired with each slot in coords1.
+        Each slot on the second side only appears with the first cell it
+        covers.
+    """
+    width = shape2_slots.shape[1]
+    flat_slots2 = shape2_slots.ravel()
+    is_tried2 = np.zeros_like(flat_slots2)
+    pairs1 = [(int(row1), int(col1)) for row1, col1 in coords1]
+    for cell2 in sorted_cells2:
+        starts2 = cell_placements2[cell2]
+        starts2 = starts2[flat_slots2[starts2] & ~is_tried2[starts2]]
+        is_tried2[starts2] = True
+        for start2 in starts2.tolist():
+            slot2 = divmod(start2, width)
+            for slot1 in pairs1:
+                yield slot1, slot2
+
+
+class Placement(typing.NamedTuple):
+    shape: str  # shape name with rotation, like build_placements()
+    row: int  # top-left corner of the shape, like build_placements()
+    col: int
+
+
+def find_only_placement(slots: dict[str, np.ndarray],
+                        all_placements: dict[str, typing.Tuple[np.ndarray, ...]],
+                        cell: int) -> Placement:
+    """ Find the first open slot that covers a cell.
+
+    :param slots: {shape: bitmap} from BlockPacker.find_slots()
+    :param all_placements: from build_cell_placements()
+    :param cell: flat index of a cell with coverage 1
+    """
+    width = next(iter(slots.values())).shape[1]
+    for shape, shape_slots in slots.items():
+        starts = all_placements[shape][cell]
+        starts = starts[shape_slots.ravel()[starts]]
+        if starts.size:
+            return Placement(shape, *divmod(int(starts[0]), width))
+    raise ValueError(f'No slot covers cell {cell}.')
 
 
 class DoubleBlockPacker:
@@ -40,12 +124,36 @@ class DoubleBlockPacker:
         self.tries = tries
         self.is_full = False
         self.are_slots_shuffled = False
+
+        # Place blocks that only have one choice before branching.
+        self.are_forced_moves_propagated = True
+
+        # Skip branches that mirror a branch with no solution.
+        self.are_symmetries_pruned = False
         self.needed_block_count = front_unused // 4
 
+        # Random stream for shuffling slots. Set it to repeat a fill.
+        self.rng = create_rng()
+
+        # Optional cache of search states with no solution.
+        self.transposition_table: TranspositionTable | None = None
+
+        self.stats = PackerStats()
+        self.depth = 0  # branches taken to reach the current search node
+
     @property
     def state(self):
         return np.concatenate((self.front_packer.state, self.back_packer.state))
 
+    @property
+    def stats(self) -> PackerStats:
+        """ Counters for the search, shared with the front and back packers. """
+        return self.front_packer.stats
+
+    @stats.setter
+    def stats(self, stats: PackerStats):
+        self.front_packer.stats = self.back_packer.stats = stats
+
     def fill(self, shape_counts: dict[str, np.ndarray] | None = None) -> bool:
         """ Fill both front and back with the same block shapes and rotations.
 
@@ -58,25 +166,59 @@ class DoubleBlockPacker:
         if self.tries == 0:
             # print('0 tries left.')
             return False
+        table = self.transposition_table
+        state_key = None
+        if table is not None:
+            state_key = table.find_key(self.state != 0,
+                                       front_shape_counts,
+                                       self.width)
+            if table.is_dead(state_key):
+                return False
         if self.tries > 0:
             self.tries -= 1
+        stats = self.stats
+        stats.node_count += 1
         width = self.front_packer.width
         height = self.front_packer.height
         flipped_shape_names = flipped_shapes()
-        front_slots = self.front_packer.find_slots()
-        back_slots = self.back_packer.find_slots()
-        front_coverage = self.front_packer.slot_coverage
-        back_coverage = self.back_packer.slot_coverage
-        front_min = front_coverage.min()
-        back_min = back_coverage.min()
-        if front_min == 0 or back_min == 0:
-            # At least one gap with no coverage.
-            # print('Gap without coverage.')
-            return False
-        if front_min == 255:
-            # All gaps are filled.
-            # print('Filled!')
-            return True
+        entry_front_state = self.front_packer.state
+        entry_back_state = self.back_packer.state
+        while True:
+            front_slots = self.front_packer.find_slots()
+            back_slots = self.back_packer.find_slots()
+            front_coverage = self.front_packer.slot_coverage
+            back_coverage = self.back_packer.slot_coverage
+            front_min = front_coverage.min()
+            back_min = back_coverage.min()
+            if front_min == 0 or back_min == 0:
+                # At least one gap with no coverage.
+                # print('Gap without coverage.')
+                self.front_packer.state = entry_front_state
+                self.back_packer.state = entry_back_state
+                self.add_dead(state_key)
+                return False
+            if front_min == 255:
+                # All gaps are filled.
+                # print('Filled!')
+                return True
+            if not self.are_forced_moves_propagated or min(front_min,
+                                                           back_min) > 1:
+                break
+            is_dead, forced_pair = self.find_forced_pair(front_slots,
+                                                         back_slots,
+                                                         front_coverage,
+                                                         back_coverage,
+                                                         front_shape_counts)
+            if is_dead:
+                # print('Contradiction in forced moves.')
+                self.front_packer.state = entry_front_state
+                self.back_packer.state = entry_back_state
+                self.add_dead(state_key)
+                return False
+            if forced_pair is None:
+                break
+            self.place_pair(*forced_pair)
+            stats.forced_move_count += 1
         is_front_first = front_min <= back_min
         if is_front_first:
             min1 = front_min
@@ -94,12 +236,13 @@ class DoubleBlockPacker:
             slots2 = front_slots
             coverage1 = back_coverage
             coverage2 = front_coverage
-        mins1 = np.argwhere(coverage1 == min1)
+        mins1 = np.flatnonzero(coverage1 == min1)
 
         slot_counts = {shape1: slots1[shape1].sum()
                        for shape1 in flipped_shape_names}
 
-        all_masks = build_masks(packer1.width, packer1.height)
+        shape_placements = build_placements(packer1.width, packer1.height)
+        all_placements = build_cell_placements(packer1.width, packer1.height)
         shape_scores: typing.Counter[str] = Counter()
         for shape, slot_count in slot_counts.items():
             if is_front_first:
@@ -118,78 +261,179 @@ class DoubleBlockPacker:
         assert start_state2 is not None
         next_block = packer1.find_next_block()
         if self.are_slots_shuffled:
-            rng = np.random.default_rng()
+            rng = np.random.default_rng(self.rng.getrandbits(64))
         else:
             rng = None
+        pruner = None
+        if self.are_symmetries_pruned:
+            pruner = self.create_pruner(front_shape_counts)
         for shape1, _score in shape_scores.most_common():
             shape2 = flipped_shape_names[shape1]
-            masks1 = all_masks[shape1]
-            masks2 = all_masks[shape2]
+            placements1 = shape_placements[shape1]
+            placements2 = shape_placements[shape2]
             shape1_slots = slots1[shape1]
             shape2_slots = slots2[shape2]
             all_coords1 = self.find_slot_coords(shape1_slots,
-                                                masks1,
+                                                all_placements[shape1],
                                                 mins1)
             if all_coords1.size == 0:
                 continue
             if rng is not None:
                 rng.shuffle(all_coords1)
-            slots2_masked = masks2[shape2_slots].any(axis=0)[:height, :width]
+            slots2_masked = np.zeros((height, width), dtype=bool)
+            slots2_masked.flat[
+                placements2.cells[placements2.index[shape2_slots]]] = True
             slots2_coverage = slots2_masked * coverage2
             uncovered2 = slots2_coverage == 0
-            uncovered_count = np.argwhere(uncovered2).shape[0]
+            uncovered_count = np.count_nonzero(uncovered2)
             if uncovered_count == width * height:
                 continue
             slots2_coverage[uncovered2] = 255
-            # sort covered coordinates
-            sorted_coverage2 = np.transpose(np.unravel_index(
-                np.argsort(slots2_coverage, axis=None),
-                slots2_coverage.shape))
-            sorted_coverage2 = sorted_coverage2[:-uncovered_count]
-
-            tried_slots2 = set()
-            for row2, col2 in sorted_coverage2:
-                covering_masks2 = masks2[:, :, row2, col2]
-                covering_slots2 = np.logical_and(covering_masks2, shape2_slots)
-                covering_coords2 = np.argwhere(covering_slots2)
-                for slot_row2, slot_col2 in covering_coords2:
-                    slot_index2 = (slot_row2, slot_col2)
-                    if slot_index2 in tried_slots2:
+            # sort covered cells
+            sorted_cells2 = np.argsort(slots2_coverage, axis=None)
+            sorted_cells2 = sorted_cells2[:-uncovered_count or None]
+
+            for (slot_row1, slot_col1), (slot_row2, slot_col2) in iter_slot_pairs(
+                    all_coords1,
+                    shape2_slots,
+                    all_placements[shape2],
+                    sorted_cells2):
+                cells1 = placements1.cells[placements1.index[slot_row1,
+                                                             slot_col1]]
+                cells2 = placements2.cells[placements2.index[slot_row2,
+                                                             slot_col2]]
+                if pruner is not None:
+                    cell_groups = (cells1, cells2)
+                    if not is_front_first:
+                        cell_groups = cell_groups[::-1]
+                    if pruner.is_image(*cell_groups):
+                        stats.pruned_count += 1
                         continue
-                    tried_slots2.add(slot_index2)
-                    for slot_row1, slot_col1 in all_coords1:
-                        mask1 = masks1[
-                                     slot_row1,
-                                     slot_col1,
-                                     :height,
-                                     :width]
-                        packer1.state = start_state1 + next_block * mask1
-                        mask2 = masks2[
-                                    slot_row2,
-                                    slot_col2,
-                                    :height,
-                                    :width]
-                        packer2.state = start_state2 + next_block * mask2
-                        # needed_blocks = self.needed_block_count - next_block + 1
-                        # print(f'=== {self.tries} tries, '
-                        #       f'{is_front_first=}, '
-                        #       f'{needed_blocks} unfilled blocks, '
-                        #       f'{min1} min coverage, '
-                        #       f'index1 ({slot_row1}, {slot_col1}), '
-                        #       f'index2 ({slot_row2}, {slot_col2})')
-                        # print(self.display())
-                        self.is_full = self.fill(front_shape_counts)
-                        if self.is_full:
-                            # print('Full!')
-                            return True
-                        if self.tries == 0:
-                            # print('0 tries left.')
-                            return False
-                        packer1.state = start_state1
-                        packer2.state = start_state2
+                packer1.state = start_state1.copy()
+                packer1.state.flat[cells1] = next_block
+                packer2.state = start_state2.copy()
+                packer2.state.flat[cells2] = next_block
+                # needed_blocks = self.needed_block_count - next_block + 1
+                # print(f'=== {self.tries} tries, '
+                #       f'{is_front_first=}, '
+                #       f'{needed_blocks} unfilled blocks, '
+                #       f'{min1} min coverage, '
+                #       f'index1 ({slot_row1}, {slot_col1}), '
+                #       f'index2 ({slot_row2}, {slot_col2})')
+                # print(self.display())
+                self.depth += 1
+                stats.max_depth = max(stats.max_depth, self.depth)
+                self.is_full = self.fill(front_shape_counts)
+                self.depth -= 1
+                if self.is_full:
+                    # print('Full!')
+                    return True
+                stats.backtrack_count += 1
+                if self.tries == 0:
+                    # print('0 tries left.')
+                    return False
+                if pruner is not None:
+                    pruner.add_refuted(*cell_groups)
+                packer1.state = start_state1
+                packer2.state = start_state2
         # print('Tried all minimum slots.')
+        self.front_packer.state = entry_front_state
+        self.back_packer.state = entry_back_state
+        self.add_dead(state_key)
         return False
 
+    def create_pruner(self, front_shape_counts) -> SymmetryPruner | None:
+        """ Find the symmetries of the current state, if there are any.
+
+        Front and back each need a symmetry that maps their open spaces onto
+        themselves, and the pair has to map flipped shapes onto flipped
+        shapes, so matching blocks still match.
+        """
+        front_state = self.front_packer.state
+        back_state = self.back_packer.state
+        assert front_state is not None
+        assert back_state is not None
+        front_symmetries = find_symmetries(front_state == BlockPacker.UNUSED,
+                                           front_shape_counts)
+        if not front_symmetries:
+            return None
+        back_symmetries = find_symmetries(back_state == BlockPacker.UNUSED, {})
+        flipped_shape_names = flipped_shapes()
+        cell_maps = [
+            (front_symmetry.cell_map, back_symmetry.cell_map)
+            for front_symmetry in front_symmetries
+            for back_symmetry in back_symmetries
+            if all(flipped_shape_names[front_symmetry.shape_map[shape]] ==
+                   back_symmetry.shape_map[flipped_shape]
+                   for shape, flipped_shape in flipped_shape_names.items())]
+        if not cell_maps:
+            return None
+        return SymmetryPruner(cell_maps)
+
+    def find_forced_pair(
+            self,
+            front_slots: dict[str, np.ndarray],
+            back_slots: dict[str, np.ndarray],
+            front_coverage: np.ndarray,
+            back_coverage: np.ndarray,
+            front_shape_counts) -> typing.Tuple[
+                bool,
+                typing.Tuple[Placement, Placement] | None]:
+        """ Look for a cell that only one pair of placements can fill.
+
+        A cell with coverage 1 has only one slot that can fill it, and the
+        matching block on the other side has to use the flipped shape. If
+        there's only one slot for that, both placements are forced.
+        :return: (is_dead, forced_pair) where is_dead is True if some cell
+            with coverage 1 can't be matched on the other side, and
+            forced_pair is (front_placement, back_placement), or None if
+            nothing is forced.
+        """
+        flipped_shape_names = flipped_shapes()
+        all_placements = build_cell_placements(self.width, self.height)
+        forced_pair = None
+        for is_front, slots1, slots2, coverage1 in (
+                (True, front_slots, back_slots, front_coverage),
+                (False, back_slots, front_slots, back_coverage)):
+            for cell in np.flatnonzero(coverage1 == 1).tolist():
+                placement1 = find_only_placement(slots1, all_placements, cell)
+                shape2 = flipped_shape_names[placement1.shape]
+                front_shape = placement1.shape if is_front else shape2
+                if front_shape_counts[front_shape] == 0:
+                    return True, None
+                starts2 = np.flatnonzero(slots2[shape2])
+                if starts2.size == 0:
+                    return True, None
+                if starts2.size == 1 and forced_pair is None:
+                    placement2 = Placement(shape2,
+                                           *divmod(int(starts2[0]), self.width))
+                    if is_front:
+                        forced_pair = (placement1, placement2)
+                    else:
+                        forced_pair = (placement2, placement1)
+        return False, forced_pair
+
+    def place_pair(self, front_placement: Placement, back_placement: Placement):
+        """ Add the same block to both sides. """
+        next_block = self.front_packer.find_next_block()
+        for packer, placement in ((self.front_packer, front_placement),
+                                  (self.back_packer, back_placement)):
+            placements = build_placements(self.width,
+                                          self.height)[placement.shape]
+            cells = placements.cells[placements.index[placement.row,
+                                                      placement.col]]
+            assert packer.state is not None
+            state = packer.state.copy()
+            state.flat[cells] = next_block
+            packer.state = state
+
+    def add_dead(self, state_key: StateKey | None):
+        """ Record a state with no solution, unless we ran out of tries. """
+        if (self.transposition_table is not None and
+                state_key is not None and
+                self.tries != 0):
+            self.transposition_table.add_dead(state_key)
+
     def remove_block(self, row: int, col: int) -> str:
         """ Remove a block from the current state.
 
@@ -205,15 +449,25 @@ class DoubleBlockPacker:
         return shape
 
     @staticmethod
-    def find_slot_coords(shape_slots, masks, min_coverages):
-        all_coords = np.ndarray((0, 2), dtype=int)
-        for row, col in min_coverages:
-            covering_masks = masks[:, :, row, col]
-            covering_slots = np.logical_and(covering_masks, shape_slots)
-
-            front_coords = np.argwhere(covering_slots)
-            all_coords = np.concatenate((all_coords, front_coords))
-        return np.unique(all_coords, axis=0)
+    def find_slot_coords(shape_slots: np.ndarray,
+                         cell_placements: typing.Sequence[np.ndarray],
+                         min_coverages: np.ndarray) -> np.ndarray:
+        """ Find the slots that cover any of the minimum coverage cells.
+
+        :param shape_slots: boolean array of the shape's open slots
+        :param cell_placements: from build_cell_placements() for the shape
+        :param min_coverages: flat indexes of the cells to cover
+        :return: [slot, 2] array of (row, col), sorted like np.unique()
+        """
+        width = shape_slots.shape[1]
+        flat_slots = shape_slots.ravel()
+        starts = [placements[flat_slots[placements]]
+                  for placements in (cell_placements[cell]
+                                     for cell in min_coverages)]
+        if not starts:
+            return np.ndarray((0, 2), dtype=int)
+        unique_starts = np.unique(np.concatenate(starts))
+        return np.stack(np.divmod(unique_starts, width), axis=1)
 
     def sort_blocks(self):
         self.front_packer.sort_blocks()
@@ -1,39 +1,94 @@
 # Based on https://github.com/Garve/Evolutionary-Algorithm
 # Added my own features in https://github.com/donkirkby/donimoes
+import random
 import typing
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor
 from datetime import datetime
-from random import shuffle
 
-from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.block_packer import BlockPacker, create_rng, spawn_rng
 
 
 class Individual(ABC):
+    """ One member of a population.
+
+    Methods that make random choices take an rng, a random.Random stream,
+    or None to start a new stream from the random module.
+    """
+    __slots__ = ('value',)  # Pools can hold thousands of individuals.
+
     def __init__(self,
                  value: dict | None = None,
-                 init_params: dict | None = None):
+                 init_params: dict | None = None,
+                 rng: random.Random | None = None):
         if value is not None:
             self.value = value
         else:
-            self.value = self._random_init(init_params)
+            self.value = self._random_init(init_params, rng)
 
     @abstractmethod
-    def pair(self, other, pair_params):
+    def pair(self, other, pair_params, rng: random.Random | None = None):
         pass
 
     @abstractmethod
-    def mutate(self, mutate_params):
+    def mutate(self, mutate_params, rng: random.Random | None = None):
         pass
 
     @abstractmethod
-    def _random_init(self, init_params):
+    def _random_init(self, init_params, rng: random.Random | None = None):
         pass
 
+    def get_payload(self):
+        """ Copy the parts of self.value that another process needs.
+
+        Override this and from_payload() to send less than the whole value.
+        """
+        return self.value
+
+    @classmethod
+    def from_payload(cls, payload, init_params):
+        """ Create an individual from the result of get_payload(). """
+        return cls(payload)
+
+
+def breed_batch(individual_class,
+                parent_payloads,
+                init_params,
+                pair_params,
+                mutate_params,
+                fitness,
+                seed: int | None = None) -> list:
+    """ Pair, mutate, and score a batch of offspring, maybe in a worker.
+
+    :param parent_payloads: [(mother_payload, father_payload)]
+    :param seed: seed for this batch's random stream, see create_rng().
+    :return: the offspring payloads, see Individual.get_payload().
+    """
+    rng = create_rng(seed)
+    offspring_payloads = []
+    for mother_payload, father_payload in parent_payloads:
+        mother = individual_class.from_payload(mother_payload, init_params)
+        father = individual_class.from_payload(father_payload, init_params)
+        offspring = mother.pair(father, pair_params, rng)
+        offspring.mutate(mutate_params, rng)
+        fitness(offspring)
+        offspring_payloads.append(offspring.get_payload())
+    return offspring_payloads
+
 
 class Population:
-    def __init__(self, size, fitness, individual_class, init_params):
+    def __init__(self,
+                 size,
+                 fitness,
+                 individual_class,
+                 init_params,
+                 rng: random.Random | None = None):
+        if rng is None:
+            rng = create_rng()
+        self.rng = rng
         self.fitness = fitness
-        self.individuals = [individual_class(init_params=init_params) for _ in range(size)]
+        self.individuals = [individual_class(init_params=init_params, rng=rng)
+                            for _ in range(size)]
         self.sort()
         self.replace_count = 0
         self.unimproved_count = 0  # Number of times replace() didn't improve.
@@ -42,6 +97,15 @@ class Population:
     def best_fitness(self):
         return self.fitness(self.individuals[-1])
 
+    @property
+    def top_individual(self):
+        return self.individuals[-1]
+
+    @property
+    def mid_individual(self):
+        """ The individual at the top fifth of the pool. """
+        return self.individuals[-len(self.individuals) // 5]
+
     @property
     def is_stale(self):
         return (10 < self.replace_count and
@@ -63,10 +127,29 @@ class Population:
         else:
             self.unimproved_count += 1
 
+    def resize(self, size: int, individual_class, init_params):
+        """ Drop the worst individuals, or add new random ones. """
+        if size < len(self.individuals):
+            self.individuals = self.individuals[-size:]
+        elif len(self.individuals) < size:
+            self.individuals.extend(
+                individual_class(init_params=init_params, rng=self.rng)
+                for _ in range(size - len(self.individuals)))
+            self.sort()
+
+    def measure_diversity(self, key) -> float:
+        """ Fraction of individuals that are distinct.
+
+        :param key: function that returns a hashable value for an individual,
+            equal for individuals that are the same.
+        """
+        return len({key(individual)
+                    for individual in self.individuals}) / len(self.individuals)
+
     def get_parents(self, n_offsprings):
         mothers = self.individuals[-2 * n_offsprings::2]
         fathers = self.individuals[-2 * n_offsprings + 1::2]
-        shuffle(fathers)
+        self.rng.shuffle(fathers)
 
         return mothers, fathers
 
@@ -80,14 +163,35 @@ class Evolution:
                  pair_params,
                  mutate_params,
                  init_params,
-                 pool_count: int = 1):
+                 pool_count: int = 1,
+                 executor: Executor | None = None,
+                 rng: random.Random | None = None,
+                 batch_fitness=None):
+        """ Initialize.
+
+        :param executor: runs batches of offspring in a thread or process
+            pool, or None to breed them one at a time.
+        :param rng: random stream that all the pools and batches get their
+            streams from, or None to start one from the random module. The
+            same seed and settings give the same results, whether the
+            executor uses threads or processes.
+        :param batch_fitness: scores the offspring in each batch sent to the
+            executor, or None to use fitness. A process pool pickles it with
+            every batch, so it should be small.
+        """
+        if rng is None:
+            rng = create_rng()
+        self.rng = rng
         self.pair_params = pair_params
         self.mutate_params = mutate_params
         self.pool_size = pool_size
         self.fitness = fitness
+        self.batch_fitness = fitness if batch_fitness is None else batch_fitness
         self.individual_class = individual_class
         self.init_params = init_params
         self.pool_count = pool_count
+        self.executor = executor
+        self.batch_size = 10  # offspring in each job sent to the executor
         self.pools: typing.List[Population] = []
         self.add_pools()
         self.n_offsprings = n_offsprings
@@ -102,50 +206,22 @@ class Evolution:
             self.pools.append(Population(self.pool_size,
                                          self.fitness,
                                          self.individual_class,
-                                         self.init_params))
+                                         self.init_params,
+                                         spawn_rng(self.rng)))
 
     def step(self):
+        if self.executor is None:
+            all_offsprings = [self.breed(pool) for pool in self.pools]
+        else:
+            all_offsprings = self.breed_in_batches()
         is_stale = False
-        block_packer = BlockPacker()
-        for pool in self.pools:
-            mothers, fathers = pool.get_parents(self.n_offsprings)
-            offsprings = []
-
-            for mother, father in zip(mothers, fathers):
-                offspring = mother.pair(father, self.pair_params)
-                mother_fitness = pool.fitness(mother)
-                father_fitness = pool.fitness(father)
-                should_display = (mother_fitness.empty_spaces >= -4 or
-                                  father_fitness.empty_spaces >= -4) and False
-                if should_display:
-                    mother_pos = offspring.value['pos1']
-                    print(f'mother {mother_fitness} {mother_pos}:')
-                    block_packer.state = mother.value['state']
-                    block_packer.sort_blocks()
-                    print(block_packer.display())
-                    father_pos = offspring.value['pos2']
-                    print(f'father {father_fitness} {father_pos}:')
-                    block_packer.state = father.value['state']
-                    block_packer.sort_blocks()
-                    print(block_packer.display())
-                    offspring_fitness = pool.fitness(offspring)
-                    print(f'offspring {offspring_fitness}:')
-                    block_packer.state = offspring.value['state']
-                    block_packer.sort_blocks()
-                    print(block_packer.display())
-                offspring.mutate(self.mutate_params)
-                if should_display:
-                    mutated_fitness = pool.fitness(offspring)
-                    print(f'mutated {mutated_fitness}:')
-                    block_packer.state = offspring.value['state']
-                    block_packer.sort_blocks()
-                    print(block_packer.display())
-                    print()
-                offsprings.append(offspring)
-
+        for pool, offsprings in zip(self.pools, all_offsprings):
             pool.replace(offsprings)
             is_stale = is_stale or pool.is_stale
+        self.replace_stale_pools(is_stale)
 
+    def replace_stale_pools(self, is_stale: bool):
+        """ Drop stale pools, and start new ones in their place. """
         if 1 < self.pool_count and is_stale:
             self.pools.sort(key=lambda p: (p.best_fitness, -p.unimproved_count),
                             reverse=True)
@@ -153,6 +229,93 @@ class Evolution:
                 self.pools.pop()
             self.add_pools()
 
+    def resize_pools(self, pool_size: int):
+        """ Change the size of all the pools, and how many offspring they get.
+        """
+        self.pool_size = pool_size
+        self.n_offsprings = pool_size // 5
+        for pool in self.pools:
+            pool.resize(pool_size, self.individual_class, self.init_params)
+
+    def restart(self):
+        """ Replace all the pools with new random ones. """
+        self.close()
+        self.pools.clear()
+        self.add_pools()
+
+    def breed(self, pool: Population) -> list:
+        """ Breed offspring for one pool, one at a time. """
+        block_packer = BlockPacker()
+        mothers, fathers = pool.get_parents(self.n_offsprings)
+        offsprings = []
+
+        for mother, father in zip(mothers, fathers):
+            offspring = mother.pair(father, self.pair_params, pool.rng)
+            mother_fitness = pool.fitness(mother)
+            father_fitness = pool.fitness(father)
+            should_display = (mother_fitness.empty_spaces >= -4 or
+                              father_fitness.empty_spaces >= -4) and False
+            if should_display:
+                mother_pos = offspring.value['pos1']
+                print(f'mother {mother_fitness} {mother_pos}:')
+                block_packer.state = mother.value['state']
+                block_packer.sort_blocks()
+                print(block_packer.display())
+                father_pos = offspring.value['pos2']
+                print(f'father {father_fitness} {father_pos}:')
+                block_packer.state = father.value['state']
+                block_packer.sort_blocks()
+                print(block_packer.display())
+                offspring_fitness = pool.fitness(offspring)
+                print(f'offspring {offspring_fitness}:')
+                block_packer.state = offspring.value['state']
+                block_packer.sort_blocks()
+                print(block_packer.display())
+            offspring.mutate(self.mutate_params, pool.rng)
+            if should_display:
+                mutated_fitness = pool.fitness(offspring)
+                print(f'mutated {mutated_fitness}:')
+                block_packer.state = offspring.value['state']
+                block_packer.sort_blocks()
+                print(block_packer.display())
+                print()
+            offsprings.append(offspring)
+        return offsprings
+
+    def breed_in_batches(self) -> list:
+        """ Breed offspring for all the pools with self.executor.
+
+        :return: a list of offspring for each pool
+        """
+        assert self.executor is not None
+        all_futures = []
+        for pool in self.pools:
+            mothers, fathers = pool.get_parents(self.n_offsprings)
+            parent_payloads = [(mother.get_payload(), father.get_payload())
+                               for mother, father in zip(mothers, fathers)]
+            futures = []
+            for start in range(0, len(parent_payloads), self.batch_size):
+                # Each batch gets its own stream, so the results don't
+                # depend on which worker runs it.
+                seed = pool.rng.getrandbits(64)
+                futures.append(self.executor.submit(
+                    breed_batch,
+                    self.individual_class,
+                    parent_payloads[start:start+self.batch_size],
+                    self.init_params,
+                    self.pair_params,
+                    self.mutate_params,
+                    self.batch_fitness,
+                    seed))
+            all_futures.append(futures)
+        return [[self.individual_class.from_payload(payload, self.init_params)
+                 for future in futures
+                 for payload in future.result()]
+                for futures in all_futures]
+
+    def close(self):
+        """ Release any resources, like worker processes. """
+
     @staticmethod
     def is_finished():
         """ Called after each epoch of evolution. Return true to stop. """
@@ -0,0 +1,136 @@
+""" Adapt an evolution to how it's going, and decide when to give up.
+
+After each epoch, the controller can grow the pools when they lose
+diversity, shrink them when they're diverse enough, restart with new random
+pools when they're all stuck, and stop when the time budget runs out. It also
+estimates how long it will take to reach a solution, from how fast the best
+fitness has been improving.
+"""
+import time
+import typing
+
+from four_letter_blocks.evo import Evolution
+
+
+class EvolutionController:
+    def __init__(self,
+                 time_budget: float | None = None,
+                 is_cpu_time: bool = False,
+                 patience: int | None = None,
+                 min_pool_size: int | None = None,
+                 max_pool_size: int | None = None,
+                 min_diversity: float = 0.2,
+                 max_diversity: float = 0.8):
+        """ Initialize.
+
+        The defaults never restart, resize, or stop.
+        :param time_budget: seconds to run before stopping, or None to run
+            until the caller runs out of epochs
+        :param is_cpu_time: True if time_budget counts this process's CPU
+            time, False for wall-clock time
+        :param patience: epochs without improvement before restarting, once
+            all the pools are stale, or None to never restart
+        :param min_pool_size: smallest pool size when shrinking, or None to
+            never resize
+        :param max_pool_size: largest pool size when growing, or None to
+            never resize
+        :param min_diversity: grow pools when their fraction of distinct
+            individuals drops below this
+        :param max_diversity: shrink pools when their fraction of distinct
+            individuals rises above this
+        """
+        self.time_budget = time_budget
+        self.clock: typing.Callable[[], float] = (
+            time.process_time if is_cpu_time else time.monotonic)
+        self.patience = patience
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.min_diversity = min_diversity
+        self.max_diversity = max_diversity
+        self.start_time = self.clock()
+        self.best_fitness = None
+        self.unimproved_count = 0
+        self.restart_count = 0
+        self.start_distance: float | None = None
+        self.best_distance: float | None = None
+
+        # Seconds until a solution at the current rate, or None if unknown.
+        self.estimated_time: float | None = None
+
+    def start(self):
+        """ Reset the clock and history for a new search. """
+        self.start_time = self.clock()
+        self.best_fitness = None
+        self.unimproved_count = 0
+        self.restart_count = 0
+        self.start_distance = self.best_distance = None
+        self.estimated_time = None
+
+    @property
+    def elapsed_time(self) -> float:
+        return self.clock() - self.start_time
+
+    @property
+    def is_resizing(self) -> bool:
+        return self.min_pool_size is not None and self.max_pool_size is not None
+
+    @property
+    def is_finished(self) -> bool:
+        """ True when the time budget has run out. """
+        return (self.time_budget is not None and
+                self.elapsed_time >= self.time_budget)
+
+    def update(self,
+               evolution: Evolution,
+               distance: float,
+               diversity: float | None = None):
+        """ Adjust the evolution after an epoch.
+
+        :param evolution: the evolution to restart or resize
+        :param distance: how far the best individual is from a solution,
+            zero when solved
+        :param diversity: fraction of distinct individuals in the pools, or
+            None to leave the pool size alone
+        """
+        self.update_estimate(distance)
+        best_fitness = max(pool.best_fitness for pool in evolution.pools)
+        if self.best_fitness is None or self.best_fitness < best_fitness:
+            self.best_fitness = best_fitness
+            self.unimproved_count = 0
+        else:
+            self.unimproved_count += 1
+        if (self.patience is not None and
+                self.patience <= self.unimproved_count and
+                all(pool.is_stale for pool in evolution.pools)):
+            evolution.restart()
+            self.restart_count += 1
+            self.best_fitness = None
+            self.unimproved_count = 0
+            return
+        if diversity is None or not self.is_resizing:
+            return
+        assert self.min_pool_size is not None
+        assert self.max_pool_size is not None
+        pool_size = evolution.pool_size
+        if diversity < self.min_diversity:
+            pool_size = min(self.max_pool_size, pool_size * 5 // 4)
+        elif self.max_diversity < diversity:
+            pool_size = max(self.min_pool_size, pool_size * 4 // 5)
+        if pool_size != evolution.pool_size:
+            evolution.resize_pools(pool_size)
+
+    def update_estimate(self, distance: float):
+        """ Extrapolate the best distance's progress since the start. """
+        if self.start_distance is None:
+            self.start_distance = distance
+        if self.best_distance is None or distance < self.best_distance:
+            self.best_distance = distance
+        progress = self.start_distance - self.best_distance
+        elapsed_time = self.elapsed_time
+        if self.best_distance <= 0:
+            self.estimated_time = 0
+        elif progress <= 0 or elapsed_time <= 0:
+            self.estimated_time = None
+        else:
+            rate = progress / elapsed_time
+            self.estimated_time = self.best_distance / rate
@@ -1,76 +1,104 @@
-import re
+import random
 import typing
-from collections import Counter
-from copy import deepcopy
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
 from dataclasses import dataclass
 from datetime import datetime
 from functools import cache
-from itertools import count
-from random import randrange, choices, choice
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Lock
 
 import numpy as np
 
+from four_letter_blocks.bit_board import save_tables
 from four_letter_blocks.evo import Individual, Evolution
-from four_letter_blocks.block_packer import BlockPacker
-from four_letter_blocks.puzzle import Puzzle
-
-
-class BlockMover:
-    def __init__(self,
-                 source: np.ndarray,
-                 target: np.ndarray,
+from four_letter_blocks.evo_controller import EvolutionController
+from four_letter_blocks.island_evolution import IslandEvolution
+from four_letter_blocks.block_packer import BlockPacker, create_rng
+from four_letter_blocks.double_block_packer import DoubleBlockPacker
+from four_letter_blocks.packer_stats import PackerStats
+from four_letter_blocks.word_spans import (build_rotation_lookup,
+                                           build_word_spans,
+                                           count_complete_words, count_shapes,
+                                           find_blocks, find_complete_words,
+                                           find_hot_spots, rotation_names,
+                                           update_complete_words)
+
+
+def cross_states(state1: np.ndarray,
+                 state2: np.ndarray,
                  can_rotate: bool,
-                 shape_counts: typing.Counter[str | None] | None = None):
-        self.source = source
-        self.target = target
-        self.can_rotate = can_rotate
-        self.packer = BlockPacker(start_state=self.source)
-        self.blocks = {
-            block_number: block
-            for block_number, block in self.packer.create_blocks_with_block_num()}
-        if shape_counts is not None:
-            self.shape_counts = shape_counts
-        else:
-            self.shape_counts = Counter()
-            for block in self.blocks.values():
-                shape = block.shape
-                if shape != 'O' and shape is not None and not can_rotate:
-                    shape += str(block.shape_rotation)
-                self.shape_counts[shape] += 1
-
-    def move(self, row: int, col: int):
-        grid_size = self.source.shape[0]
-        if not 0 <= row < grid_size:
-            return
-        if not 0 <= col < grid_size:
-            return
-        # noinspection PyTypeChecker
-        block_num: int = self.source[row, col]
-        if block_num == 1:
-            self.target[row, col] = 1
-            return
-        try:
-            block = self.blocks.pop(block_num)
-        except KeyError:
-            return
-        shape = block.shape
-        assert shape is not None
-        if shape != 'O' and not self.can_rotate:
-            shape += str(block.shape_rotation)
-        if self.shape_counts[shape] == 0:
-            return
-        for square in block.squares:
-            if self.target[square.y, square.x] != 0:
-                return
-        # noinspection PyUnresolvedReferences
-        if (self.target == block_num).any():
-            used_nums = set(np.unique(self.target))
-            for block_num in count(2):
-                if block_num not in used_nums:
-                    break
-        for square in block.squares:
-            self.target[square.y, square.x] = block_num
-        self.shape_counts[shape] -= 1
+                 shape_counts: typing.Counter[str],
+                 position1: typing.Tuple[int, int],
+                 position2: typing.Tuple[int, int]
+                 ) -> typing.Tuple[np.ndarray, typing.Counter[str]]:
+    """ Take blocks from two parents, nearest to a position in each first.
+
+    The parents take turns visiting positions in ranked_offsets() order from
+    their starting positions. The first visit to a block takes it, unless it
+    overlaps blocks already taken, or its shape has run out. Instead of
+    visiting every position, find each block's first visit, and loop over the
+    blocks in that order. Both parents must have the same gaps, like all the
+    packings in a population.
+
+    :param state1: the first parent's state
+    :param state2: the second parent's state
+    :param can_rotate: True if shape_counts ignore rotations
+    :param shape_counts: the first parent's remaining blocks to place
+    :param position1: (row, col) to start taking from the first parent
+    :param position2: (row, col) to start taking from the second parent
+    :return: (new_state, shape_counts) where shape_counts are the remaining
+        blocks to place on the new state
+    """
+    height, width = state1.shape
+    offsets = ranked_offsets(max(height, width))
+    # Unknown shapes map to -1, so they get the empty name at the end.
+    names = np.array([name if name == 'O' or not can_rotate else name[0]
+                      for name in rotation_names()] + [''])
+    rotation_lookup = build_rotation_lookup()
+    new_state = np.zeros((height, width), dtype=np.uint8)
+    new_state[state1 == BlockPacker.GAP] = BlockPacker.GAP
+    blocks: typing.List[tuple] = []
+    counts: typing.Counter[str] = Counter()
+    for parent, (state, (row0, col0)) in enumerate(((state1, position1),
+                                                    (state2, position2))):
+        positions = offsets + [row0, col0]
+        is_inside = ((0 <= positions) &
+                     (positions < [height, width])).all(axis=1)
+        ranks = np.empty(height * width, dtype=int)
+        inside_positions = positions[is_inside]
+        ranks[inside_positions[:, 0]*width + inside_positions[:, 1]], = \
+            np.nonzero(is_inside)
+        block_cells = find_blocks(state)
+        shapes = names[rotation_lookup[block_cells.masks]]
+        if parent == 0:
+            counts.update(shapes.tolist())
+            del counts['']
+            counts.update(shape_counts)
+        # The two parents take turns, so interleave their ranks.
+        turns = ranks[block_cells.cells].min(axis=1)*2 + parent
+        blocks.extend(zip(turns.tolist(),
+                          block_cells.block_nums.tolist(),
+                          block_cells.cells.tolist(),
+                          shapes.tolist()))
+    blocks.sort(key=lambda block: block[0])
+    flat_state = new_state.ravel().tolist()
+    used_nums: typing.Set[int] = set()
+    next_num = 2
+    for _turn, block_num, cells, shape in blocks:
+        if not counts[shape] or any(flat_state[cell] for cell in cells):
+            continue
+        if block_num in used_nums:
+            while next_num in used_nums:
+                next_num += 1
+            block_num = next_num
+        used_nums.add(block_num)
+        for cell in cells:
+            flat_state[cell] = block_num
+        counts[shape] -= 1
+    new_state = np.array(flat_state, dtype=np.uint8).reshape(height, width)
+    return new_state, counts
 
 
 class Packing(Individual):
@@ -78,14 +106,34 @@ class Packing(Individual):
 
     init_params control the packing, see _random_init() for details.
     self.value records the state and controls the packing, see the return value
-    of _random_init() for details.
+    of _random_init() for details. The state is read-only, so offspring can
+    share it with their parents, and mutate() only copies it when it changes.
     """
+    __slots__ = ()
+
+    def __init__(self,
+                 value: dict | None = None,
+                 init_params: dict | None = None,
+                 rng: random.Random | None = None):
+        super().__init__(value, init_params, rng)
+        state = self.value.get('state')
+        if isinstance(state, np.ndarray):
+            state.setflags(write=False)
+
     def __repr__(self):
         return f'Packing({self.value!r})'
 
-    def pair(self, other, pair_params):
-        scenario = choices(('mother', 'father', 'mix'),
-                           weights=(5, 5, 1*0))[0]
+    def pair(self, other, pair_params, rng: random.Random | None = None):
+        if rng is None:
+            rng = create_rng()
+        # cross_states() only takes single-sided blocks, so it can't mix the
+        # eight-cell blocks of a double packing.
+        if issubclass(self.value['packer_class'], DoubleBlockPacker):
+            mix_weight = 0
+        else:
+            mix_weight = 1
+        scenario = rng.choices(('mother', 'father', 'mix'),
+                               weights=(5, 5, mix_weight))[0]
         if scenario == 'mother':
             return Packing(self.value)
         if scenario == 'father':
@@ -93,33 +141,29 @@ class Packing(Individual):
         state1 = self.value['state']
         state2 = other.value['state']
         grid_size = state1.shape[0]
-        new_state = np.zeros((grid_size, grid_size), dtype=np.uint8)
-        counts1 = self.value['shape_counts']
         can_rotate = self.value['can_rotate']
-        mover1 = BlockMover(state1, new_state, can_rotate)
-        mover1.shape_counts += counts1
-        mover2 = BlockMover(state2, new_state, can_rotate, mover1.shape_counts)
-        row1 = randrange(grid_size)
-        col1 = randrange(grid_size)
-        row2 = randrange(grid_size)
-        col2 = randrange(grid_size)
-
-        positions1 = ranked_offsets(grid_size) + [row1, col1]
-        positions2 = ranked_offsets(grid_size) + [row2, col2]
-        for (i1, j1), (i2, j2) in zip(positions1, positions2):
-            mover1.move(i1, j1)
-            mover2.move(i2, j2)
+        row1 = rng.randrange(grid_size)
+        col1 = rng.randrange(grid_size)
+        row2 = rng.randrange(grid_size)
+        col2 = rng.randrange(grid_size)
+        new_state, shape_counts = cross_states(state1,
+                                               state2,
+                                               can_rotate,
+                                               self.value['shape_counts'],
+                                               (row1, col1),
+                                               (row2, col2))
         packer_class = self.value['packer_class']
         tries = self.value['tries']
         packer = packer_class(start_state=new_state, tries=tries)
         packer.force_fours = self.value['force_fours']
+        packer.rng = rng
         packer.are_slots_shuffled = True
         packer.are_partials_saved = True
-        packer.fill(mover1.shape_counts)
+        packer.fill(shape_counts)
 
         assert packer.state is not None
         return Packing(dict(state=packer.state,
-                            shape_counts=mover1.shape_counts,
+                            shape_counts=shape_counts,
                             can_rotate=can_rotate,
                             pos1=(row1, col1),
                             pos2=(row2, col2),
@@ -127,10 +171,14 @@ class Packing(Individual):
                             force_fours=packer.force_fours,
                             tries=tries))
 
-    def mutate(self, mutate_params) -> None:
+    def mutate(self,
+               mutate_params,
+               rng: random.Random | None = None) -> None:
         self.value: dict
+        if rng is None:
+            rng = create_rng()
 
-        state: np.ndarray | tuple = deepcopy(self.value['state'])
+        state: np.ndarray = self.value['state'].copy()
         shape_counts = Counter(self.value['shape_counts'])
         can_rotate: bool = self.value['can_rotate']
         packer_class = self.value['packer_class']
@@ -138,41 +186,36 @@ class Packing(Individual):
         block_packer: BlockPacker = packer_class(start_state=state,
                                                  tries=tries)
         block_packer.force_fours = self.value['force_fours']
+        block_packer.rng = rng
         block_packer.are_partials_saved = True
         block_packer.are_slots_shuffled = True
         start_state = block_packer.state
+        assert start_state is not None
         grid_size = max(block_packer.width, block_packer.height)
+        # A double packer stacks the back grid under the front grid, and
+        # words can't run from one into the other.
+        split_row = (block_packer.height
+                     if start_state.shape[0] > block_packer.height
+                     else 0)
+        spans = build_word_spans(start_state != BlockPacker.GAP, split_row)
+        is_complete = self.value.get('complete_words')
+        if is_complete is None or len(is_complete) != len(spans):
+            is_complete = find_complete_words(start_state, spans)
         gaps = np.argwhere(start_state == 0)
         if gaps.size > 0:
-            row0, col0 = choice(gaps)
+            row0, col0 = rng.choice(gaps)
         else:
-            display = block_packer.display()
-            puzzle = Puzzle.parse_sections('',
-                                           display,
-                                           '',
-                                           display)
-            targets = []
-            for warning in puzzle.check_word_length():
-                match = re.match(r'complete.*from \((\d+), (\d+)\) '
-                                 r'to \((\d+), (\d+)\)',
-                                 warning)
-                if match:
-                    start_col = int(match.group(1))
-                    start_row = int(match.group(2))
-                    end_col = int(match.group(3))
-                    end_row = int(match.group(4))
-                    for col in range(start_col, end_col+1):
-                        for row in range(start_row, end_row+1):
-                            targets.append((col-1, row-1))
-            if targets:
-                col0, row0 = choice(targets)
+            hot_spots = find_hot_spots(spans, is_complete)
+            if hot_spots.size > 0:
+                row0, col0 = divmod(int(rng.choice(hot_spots)),
+                                    block_packer.width)
             else:
-                row0 = randrange(block_packer.height)
-                col0 = randrange(block_packer.width)
+                row0 = rng.randrange(block_packer.height)
+                col0 = rng.randrange(block_packer.width)
         block_count = (start_state > 1).sum() // 4  # type: ignore
         min_removed = 0  # min(3, block_count)
         max_removed = min(10, block_count)
-        remove_count = randrange(min_removed, max_removed+1)
+        remove_count = rng.randrange(min_removed, max_removed+1)
 
         positions = ranked_offsets(grid_size) + [row0, col0]
         for row, col in positions[1:]:
@@ -193,15 +236,51 @@ class Packing(Individual):
 
         block_packer.fill(shape_counts)
 
-        assert block_packer.state is not None
-        self.value = dict(state=block_packer.state,
+        # DoubleBlockPacker builds a new state array each time, so only read
+        # it once.
+        new_state = block_packer.state
+        assert new_state is not None
+        changed_cells, = np.nonzero((new_state != self.value['state']).ravel())
+        is_complete = update_complete_words(new_state,
+                                            spans,
+                                            is_complete,
+                                            changed_cells)
+        new_state.setflags(write=False)
+        self.value = dict(state=new_state,
                           shape_counts=shape_counts,
                           can_rotate=can_rotate,
                           packer_class=packer_class,
                           force_fours=block_packer.force_fours,
-                          tries=tries)
-
-    def _random_init(self, init_params: dict):
+                          tries=tries,
+                          complete_words=is_complete)
+
+    def get_payload(self):
+        """ Send the state, counts, and fitness, but not the settings. """
+        return (self.value['state'],
+                self.value['shape_counts'],
+                self.value.get('fitness'))
+
+    @classmethod
+    def from_payload(cls, payload, init_params: dict):
+        """ Rebuild the settings from init_params, like _random_init(). """
+        state, shape_counts, fitness = payload
+        value = dict(state=state,
+                     shape_counts=shape_counts,
+                     can_rotate=all(len(shape) == 1
+                                    for shape in init_params['shape_counts']),
+                     force_fours=init_params.get('force_fours', False),
+                     packer_class=init_params.get('packer_class', BlockPacker),
+                     tries=init_params['tries'])
+        if fitness is not None:
+            value['fitness'] = fitness
+            # Scored in another process or calculator, see
+            # PackingFitnessCalculator.calculate().
+            value['is_scored_elsewhere'] = True
+        return cls(value)
+
+    def _random_init(self,
+                     init_params: dict,
+                     rng: random.Random | None = None):
         start_state = init_params['start_state']
         shape_counts = Counter(init_params['shape_counts'])
         can_rotate = all(len(shape) == 1 for shape in shape_counts)
@@ -210,12 +289,18 @@ class Packing(Individual):
         block_packer = packer_class(start_state=start_state,
                                     tries=tries)
         block_packer.force_fours = init_params.get('force_fours', False)
+        if rng is not None:
+            block_packer.rng = rng
         block_packer.are_slots_shuffled = True
         block_packer.are_partials_saved = True
         block_packer.fill(shape_counts)
 
-        assert block_packer.state is not None
-        return dict(state=block_packer.state,
+        state = block_packer.state
+        assert state is not None
+        if state is start_state:
+            # Nothing placed, so don't freeze the caller's array.
+            state = state.copy()
+        return dict(state=state,
                     shape_counts=shape_counts,
                     can_rotate=can_rotate,
                     force_fours=block_packer.force_fours,
@@ -230,16 +315,63 @@ class FitnessScore:
     missed_targets: int = 0  # negative
     warning_count: int = 0  # negative
 
+    def count_problems(self) -> int:
+        """ Count the problems left to fix, zero for a solution. """
+        return -(self.empty_spaces + self.missed_targets + self.warning_count)
+
+
+def find_canonical_state(state: np.ndarray) -> np.ndarray:
+    """ Renumber blocks in the order they're found, like sort_blocks().
+
+    Gaps and unused spaces keep their values, so packings that only differ in
+    block numbers get the same canonical state.
+    """
+    values, first_indexes, inverse = np.unique(state,
+                                               return_index=True,
+                                               return_inverse=True)
+    block_values, = np.nonzero(values > BlockPacker.GAP)
+    block_order = block_values[np.argsort(first_indexes[block_values])]
+    new_values = values.copy()
+    new_values[block_order] = np.arange(BlockPacker.GAP + 1,
+                                        BlockPacker.GAP + 1 + block_order.size)
+    return new_values[inverse.ravel()].reshape(state.shape)
+
 
 class PackingFitnessCalculator:
-    def __init__(self) -> None:
+    def __init__(self, cache_size: int = 10_000) -> None:
+        """ Initialize.
+
+        :param cache_size: number of fitness scores to remember for packings
+            that differ only in block numbers, or 0 for no cache.
+        """
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple, FitnessScore] = OrderedDict()
+
+        # Thread pools can score packings at the same time.
+        self.cache_lock = Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Also counts cache hits and misses, if set.
+        self.stats: PackerStats | None = None
         self.details: typing.List[str] = []
         self.summaries: typing.List[str] = []
+        self.are_summaries_saved = True
         self.count_parities: typing.Dict[str, int] = {}
         self.count_diffs: typing.Dict[str, int] = {}  # {ab: diff}
         self.count_min: typing.Dict[str, int] = {}  # {shapes: min}
         self.count_max: typing.Dict[str, int] = {}  # {shapes: max}
 
+    def __getstate__(self):
+        # Locks can't be pickled, so each process gets its own.
+        state = self.__dict__.copy()
+        del state['cache_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cache_lock = Lock()
+
     def format_summaries(self):
         display = '\n'.join(self.summaries)
         self.summaries.clear()
@@ -250,19 +382,101 @@ class PackingFitnessCalculator:
         self.details.clear()
         return display
 
+    def create_scorer(self) -> 'PackingFitnessCalculator':
+        """ Copy the targets into a calculator for worker processes.
+
+        The copy has no cache, summaries, or stats, so it's small enough to
+        send with each batch of offspring. The packings it scores get
+        recorded by this calculator when they come back, see calculate().
+        """
+        scorer = type(self)(cache_size=0)
+        scorer.are_summaries_saved = False
+        scorer.count_parities = dict(self.count_parities)
+        scorer.count_diffs = dict(self.count_diffs)
+        scorer.count_min = dict(self.count_min)
+        scorer.count_max = dict(self.count_max)
+        return scorer
+
     def calculate(self, packing: Packing) -> FitnessScore:
         """ Calculate fitness score based on the solution. """
         value = packing.value
         fitness_x: FitnessScore | None = value.get('fitness')
         if fitness_x is not None:
+            if value.pop('is_scored_elsewhere', False):
+                self.record(value['state'], fitness_x)
             return fitness_x
         state = value['state']
-        fitness = self.calculate_from_state(state)
-        self.summaries.append(str(fitness))
+        fitness = self.calculate_cached(state)
+        self.add_summary(fitness)
 
         value['fitness'] = fitness
         return fitness
 
+    def record(self, state: np.ndarray, fitness: FitnessScore):
+        """ Record a score from a worker's calculator, as if it came from here.
+        """
+        self.add_summary(fitness)
+        key = self.find_cache_key(state)
+        if key is None:
+            return
+        with self.cache_lock:
+            self.count_cache_miss()
+            self.add_to_cache(key, fitness)
+
+    def calculate_cached(self, state: np.ndarray) -> FitnessScore:
+        """ Calculate fitness score, or find it in the cache.
+
+        Only full packings get cached, because they're the ones that get
+        parsed and checked for complete words.
+        """
+        key = self.find_cache_key(state)
+        if key is None:
+            return self.calculate_from_state(state)
+        with self.cache_lock:
+            fitness = self.cache.get(key)
+            if fitness is not None:
+                self.cache.move_to_end(key)
+                self.cache_hits += 1
+                if self.stats is not None:
+                    self.stats.fitness_cache_hits += 1
+                return fitness
+            self.count_cache_miss()
+        fitness = self.calculate_from_state(state)
+        with self.cache_lock:
+            self.add_to_cache(key, fitness)
+        return fitness
+
+    def find_cache_key(self, state: np.ndarray) -> tuple | None:
+        """ Find the cache key for a state, or None if it can't be cached.
+
+        The key includes the count targets, so changing them doesn't find
+        stale scores.
+        """
+        if self.cache_size <= 0 or (state == BlockPacker.UNUSED).any():
+            return None
+        canonical_state = find_canonical_state(state)
+        targets = tuple(tuple(sorted(target_counts.items()))
+                        for target_counts in (self.count_parities,
+                                              self.count_diffs,
+                                              self.count_min,
+                                              self.count_max))
+        return targets, canonical_state.shape, canonical_state.tobytes()
+
+    def count_cache_miss(self):
+        self.cache_misses += 1
+        if self.stats is not None:
+            self.stats.fitness_cache_misses += 1
+
+    def add_to_cache(self, key, fitness: FitnessScore):
+        self.cache[key] = fitness
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def add_summary(self, fitness: FitnessScore):
+        if self.are_summaries_saved:
+            self.summaries.append(str(fitness))
+
     def calculate_from_state(self, state) -> FitnessScore:
         # noinspection PyTypeChecker
         empty = np.nonzero(state == 0)
@@ -271,17 +485,10 @@ class PackingFitnessCalculator:
 
         if empty_spaces == 0:
             empty_fraction = 0
-            packer = BlockPacker(start_state=state)
-            display = packer.display()
-            puzzle = Puzzle.parse_sections('',
-                                           display,
-                                           '',
-                                           display)
-            warning_count = sum(1
-                                for warning in puzzle.check_word_length()
-                                if warning.startswith('complete word'))
+            spans = build_word_spans(state != BlockPacker.GAP)
+            warning_count = count_complete_words(state, spans)
             # Required features to balance the puzzle set.
-            shape_counts = puzzle.shape_counts
+            shape_counts = count_shapes(state)
             for shape, parity in self.count_parities.items():
                 if shape_counts[shape] % 2 != parity:
                     missed_targets += 1
@@ -312,7 +519,7 @@ class PackingFitnessCalculator:
                                empty_area=-empty_fraction,
                                missed_targets=-missed_targets,
                                warning_count=-warning_count)
-        self.summaries.append(str(fitness))
+        self.add_summary(fitness)
         return fitness
 
 
@@ -340,8 +547,29 @@ class EvoPacker(BlockPacker):
             -self.width * self.height,
             0)
         self.top_blocks = ''
+        self.top_state: np.ndarray | None = None
         self.top_choices: set[str] = set()
 
+        # Adapts the pools and decides when to stop. The default only
+        # estimates the time left.
+        self.controller = EvolutionController()
+
+        # Class of the packers that fill each individual in the population.
+        self.packer_class: typing.Type[BlockPacker] = BlockPacker
+
+        # Thread or process pool to breed offspring, or None to run serially.
+        self.executor: Executor | None = None
+
+        # Number of pools to evolve in their own processes, or 0 to evolve
+        # them all in this process.
+        self.island_count = 0
+
+        # Best fitness of each pool after the latest epoch.
+        self.pool_summaries: typing.List[str] = []
+
+        # Placement tables saved for the islands to share.
+        self.table_folder: TemporaryDirectory | None = None
+
     def setup(self,
               shape_counts: typing.Counter[str],
               fitness_calculator: PackingFitnessCalculator | None = None):
@@ -350,34 +578,83 @@ class EvoPacker(BlockPacker):
         if fitness_calculator is None:
             fitness_calculator = PackingFitnessCalculator()
         fitness_calculator.summaries.clear()
-
-        self.evo = Evolution(
-            pool_size=self.pool_size,
-            fitness=fitness_calculator.calculate,
-            individual_class=Packing,
-            n_offsprings=self.pool_size // 5,
-            pair_params=None,
-            mutate_params=None,
-            init_params=init_params,
-            pool_count=2)
+        fitness_calculator.stats = self.stats
+
+        if self.island_count:
+            if self.table_folder is None:
+                self.table_folder = TemporaryDirectory()
+            table_path = Path(self.table_folder.name)
+            save_tables(self.width, self.height, table_path)
+            self.evo = IslandEvolution(
+                pool_size=self.pool_size,
+                fitness=fitness_calculator.calculate,
+                individual_class=Packing,
+                n_offsprings=self.pool_size // 5,
+                pair_params=None,
+                mutate_params=None,
+                init_params=init_params,
+                pool_count=self.island_count,
+                rng=self.rng,
+                table_folder=table_path)
+        else:
+            self.evo = Evolution(
+                pool_size=self.pool_size,
+                fitness=fitness_calculator.calculate,
+                individual_class=Packing,
+                n_offsprings=self.pool_size // 5,
+                pair_params=None,
+                mutate_params=None,
+                init_params=init_params,
+                pool_count=2,
+                executor=self.executor,
+                rng=self.rng,
+                batch_fitness=fitness_calculator.create_scorer().calculate)
         self.shape_counts = shape_counts
+        self.controller.start()
 
     def create_init_params(self, shape_counts):
         init_params = dict(start_state=self.state.copy(),
                            shape_counts=shape_counts,
                            tries=self.tries,
-                           force_fours=self.force_fours)
+                           force_fours=self.force_fours,
+                           packer_class=self.packer_class)
         return init_params
 
     def fill(self, shape_counts: typing.Counter[str] | None = None) -> bool:
         if shape_counts is None:
             shape_counts = self.calculate_max_shape_counts()
         self.setup(shape_counts)
-        while self.current_epoch < self.epochs:
-            if self.run_epoch():
-                return True
-
-        return self.find_usable_packing()
+        try:
+            while (self.current_epoch < self.epochs and
+                   not self.controller.is_finished):
+                if self.run_epoch():
+                    return True
+
+            return self.find_usable_packing()
+        finally:
+            self.close()
+
+    def clone_empty(self, width: int, height: int) -> 'BlockPacker':
+        packer = super().clone_empty(width, height)
+        assert isinstance(packer, EvoPacker)
+        packer.current_epoch = 0
+        packer.shape_counts = Counter()
+        packer.evo = None
+        packer.top_fitness = FitnessScore(-width * height, 0)
+        packer.top_blocks = ''
+        packer.top_state = None
+        packer.top_choices = set()
+        packer.pool_summaries = []
+        packer.table_folder = None
+        return packer
+
+    def close(self):
+        """ Stop any worker processes, after the last epoch. """
+        if self.evo is not None:
+            self.evo.close()
+        if self.table_folder is not None:
+            self.table_folder.cleanup()
+            self.table_folder = None
 
     def run_epoch(self) -> bool:
         """ Run one epoch of the evolutionary search.
@@ -386,14 +663,14 @@ class EvoPacker(BlockPacker):
         """
         evo = self.evo
         assert evo is not None
-        top_individual = evo.pool.individuals[-1]
+        top_individual = evo.pool.top_individual
         top_fitness: FitnessScore = evo.pool.fitness(top_individual)
-        mid_fitness = evo.pool.fitness(
-            evo.pool.individuals[-len(evo.pool.individuals) // 5])
+        mid_fitness = evo.pool.fitness(evo.pool.mid_individual)
         summaries = []
         for pool in evo.pools:
-            pool_fitness = pool.fitness(pool.individuals[-1])
+            pool_fitness = pool.fitness(pool.top_individual)
             summaries.append(f'{pool_fitness}')
+        self.pool_summaries = summaries
         if self.is_logging:
             print(datetime.now().strftime('%H:%M'),
                   self.current_epoch,
@@ -411,6 +688,7 @@ class EvoPacker(BlockPacker):
                 self.top_fitness = top_fitness
                 self.top_choices.clear()
                 self.top_blocks = packer_display
+                self.top_state = top_individual.value['state']
             if packer_display not in self.top_choices:
                 self.top_choices.add(packer_display)
                 if self.is_logging:
@@ -419,25 +697,45 @@ class EvoPacker(BlockPacker):
         if (top_fitness.empty_spaces == 0 and
                 top_fitness.missed_targets == 0 and
                 top_fitness.warning_count == 0):
-            self.state = top_individual.value['state']
+            self.state = top_individual.value['state'].copy()
             return True
         evo.step()
         self.current_epoch += 1
+        self.stats.epoch_count += 1
+        diversity = None
+        if self.controller.is_resizing and not self.island_count:
+            diversity = sum(pool.measure_diversity(find_state_key)
+                            for pool in evo.pools) / len(evo.pools)
+        self.controller.update(evo, top_fitness.count_problems(), diversity)
         return False
 
+    @property
+    def estimated_time(self) -> float | None:
+        """ Seconds until a solution, at the current rate, or None. """
+        return self.controller.estimated_time
+
     def find_usable_packing(self) -> bool:
         evo = self.evo
         assert evo is not None
         original_state = self.state
-        top_individual = evo.pool.individuals[-1]
+        top_individual = evo.pool.top_individual
         top_fitness: FitnessScore = evo.pool.fitness(top_individual)
         if top_fitness is not None and top_fitness.empty_spaces == 0:
-            self.state = top_individual.value['state']
+            self.state = top_individual.value['state'].copy()
+            return True
+        if self.top_state is not None and self.top_fitness.empty_spaces == 0:
+            # Found before a restart.
+            self.state = self.top_state.copy()
             return True
         self.state = original_state
         return False
 
 
+def find_state_key(packing: Packing) -> bytes:
+    """ Equal for packings with the same state, to measure diversity. """
+    return packing.value['state'].tobytes()
+
+
 @cache
 def distance_ranking(grid_size: int) -> np.ndarray:
     """ Rank the positions in a grid by their distance from the centre.
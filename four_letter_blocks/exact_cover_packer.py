@@ -0,0 +1,332 @@
+import typing
+from collections import Counter
+from time import perf_counter
+
+import numpy as np
+from scipy.ndimage import label  # type: ignore
+
+from four_letter_blocks.bit_board import build_cell_index
+from four_letter_blocks.block_packer import BlockPacker
+
+
+class DancingLinks:
+    """ Knuth's Algorithm X, using dancing links to cover and uncover items.
+
+    Node 0 is the root, nodes 1 to item_count are the item headers, and the
+    rest are one node for each item in each option.
+    """
+    def __init__(self,
+                 item_count: int,
+                 options: typing.Sequence[typing.Sequence[int]]):
+        """ Initialize.
+
+        :param item_count: number of items to cover, numbered from 0
+        :param options: a list of items for each option
+        """
+        header_count = item_count + 1
+        self.left = [(i - 1) % header_count for i in range(header_count)]
+        self.right = [(i + 1) % header_count for i in range(header_count)]
+        self.up = list(range(header_count))
+        self.down = list(range(header_count))
+        self.column = list(range(header_count))
+        self.option = [-1] * header_count
+        self.size = [0] * header_count
+        self.remaining_count = item_count
+        for option_num, items in enumerate(options):
+            first = None
+            for item in items:
+                header = item + 1
+                node = len(self.column)
+                self.column.append(header)
+                self.option.append(option_num)
+                self.up.append(self.up[header])
+                self.down.append(header)
+                self.down[self.up[header]] = node
+                self.up[header] = node
+                self.size[header] += 1
+                if first is None:
+                    first = node
+                    self.left.append(node)
+                    self.right.append(node)
+                else:
+                    self.left.append(self.left[first])
+                    self.right.append(first)
+                    self.right[self.left[first]] = node
+                    self.left[first] = node
+
+    @property
+    def is_empty(self):
+        return self.right[0] == 0
+
+    def iter_items(self) -> typing.Iterator[int]:
+        """ Iterate through the header nodes of the uncovered items. """
+        header = self.right[0]
+        while header != 0:
+            yield header
+            header = self.right[header]
+
+    def iter_options(self, header: int) -> typing.Iterator[int]:
+        """ Iterate through the nodes in an item's column. """
+        node = self.down[header]
+        while node != header:
+            yield node
+            node = self.down[node]
+
+    def cover(self, header: int):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        self.remaining_count -= 1
+        row = down[header]
+        while row != header:
+            node = right[row]
+            while node != row:
+                down[up[node]] = down[node]
+                up[down[node]] = up[node]
+                self.size[self.column[node]] -= 1
+                node = right[node]
+            row = down[row]
+
+    def uncover(self, header: int):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        row = up[header]
+        while row != header:
+            node = left[row]
+            while node != row:
+                self.size[self.column[node]] += 1
+                down[up[node]] = node
+                up[down[node]] = node
+                node = left[node]
+            row = up[row]
+        self.remaining_count += 1
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def cover_others(self, row: int):
+        """ Cover all the other items in a chosen option. """
+        node = self.right[row]
+        while node != row:
+            self.cover(self.column[node])
+            node = self.right[node]
+
+    def uncover_others(self, row: int):
+        node = self.left[row]
+        while node != row:
+            self.uncover(self.column[node])
+            node = self.left[node]
+
+
+class ExactCoverPacker(BlockPacker):
+    """ Pack blocks with Algorithm X, treating it as an exact cover problem.
+
+    Every unused space is an item that must be covered exactly once, either by
+    a block or by a gap. The shape counts limit how many times each shape's
+    placements can be chosen:
+    * When the shapes don't fill the grid, all of them must be used, and the
+      leftover spaces become gaps.
+    * When the shapes can fill the grid, the counts are maximums, and no gaps
+      are allowed.
+
+    If force_fours is True, then every region of open spaces has to be a
+    multiple of 4, except for the spaces that can still be gaps.
+
+    When there are gaps, it looks for the cover that packs the blocks into
+    the fewest rows, like BlockPacker.fill(). It keeps searching until it has
+    tried every cover, or it reaches min_tries with a cover in hand.
+
+    This is a complete search, so it won't give up on layouts that have a
+    solution, unless it runs out of tries. Partial fills aren't exact covers,
+    so they use BlockPacker.fill().
+    """
+    GAP_KEY = '#'
+
+    def fill(self, shape_counts: typing.Counter[str] | None = None) -> bool:
+        if self.are_partials_saved:
+            return super().fill(shape_counts)
+        assert self.state is not None
+        if shape_counts is None:
+            shape_counts = self.calculate_max_shape_counts()
+        start_state = self.state
+        solution = self.find_cover(shape_counts)
+        if solution is None:
+            self.state = None
+            return False
+        self.state = self.number_blocks(start_state, solution)
+        return True
+
+    def find_cover(
+            self,
+            shape_counts: typing.Counter[str]) -> typing.List[np.ndarray] | None:
+        """ Search for an exact cover of the unused spaces.
+
+        :return: cells of each block in the cover, or None if there isn't one,
+            or we ran out of tries.
+        """
+        assert self.state is not None
+        is_rotation_allowed = all(len(shape) == 1 for shape in shape_counts)
+        remaining_counts = Counter({shape: count
+                                    for shape, count in shape_counts.items()
+                                    if count > 0})
+        is_open = (self.state == self.UNUSED).ravel()
+        open_cells, = np.nonzero(is_open)
+        cell_items = np.full(is_open.size, -1)
+        cell_items[open_cells] = np.arange(open_cells.size)
+        needed_spaces = sum(remaining_counts.values()) * 4
+        extra_gaps = open_cells.size - needed_spaces
+        if extra_gaps > 0:
+            remaining_counts[self.GAP_KEY] = extra_gaps
+
+        index = build_cell_index(self.width, self.height)
+        is_crossing = ((self.split_row - index.heights + 1 <= index.rows) &
+                       (index.rows < self.split_row))
+        is_usable = is_open[index.cells].all(axis=1) & ~is_crossing
+        option_cells: typing.List[np.ndarray] = []
+        option_keys: typing.List[str] = []
+        for shape, start, end in zip(index.shapes,
+                                     index.shape_starts[:-1],
+                                     index.shape_starts[1:]):
+            key = shape[0] if is_rotation_allowed else shape
+            if not remaining_counts[key]:
+                continue
+            for placement in np.nonzero(is_usable[start:end])[0] + start:
+                option_cells.append(index.cells[placement])
+                option_keys.append(key)
+        if extra_gaps > 0:
+            for cell in open_cells:
+                option_cells.append(np.array([cell]))
+                option_keys.append(self.GAP_KEY)
+        links = DancingLinks(open_cells.size,
+                             [cell_items[cells] for cells in option_cells])
+        # Rows used by each option, counting from the top of the grid.
+        option_rows = [0 if key == self.GAP_KEY else cells.max()//self.width + 1
+                       for cells, key in zip(option_cells, option_keys)]
+        shape_total = sum(count
+                          for key, count in remaining_counts.items()
+                          if key != self.GAP_KEY)
+        stats = self.stats
+
+        # Search depth first, with a stack instead of recursion, so big grids
+        # don't hit the recursion limit. Each frame is [header, row] for an
+        # item that's covered, and the row of the option chosen for it, or
+        # the header itself before choosing one.
+        frames: typing.List[typing.List[int]] = []
+        chosen: typing.List[int] = []
+        used_rows = [self.count_filled_rows()]
+        best_cover: typing.List[int] | None = None
+        fewest_rows = self.height + 1
+        is_descending = True
+        while True:
+            if is_descending:
+                is_descending = False
+                if links.is_empty or (
+                        shape_total == 0 and
+                        links.remaining_count <= remaining_counts[self.GAP_KEY]):
+                    # All shapes placed, and the rest can be gaps.
+                    best_cover = chosen[:]
+                    fewest_rows = used_rows[-1]
+                    if extra_gaps <= 0 or 0 <= self.tries <= self.stop_tries:
+                        # Without gaps, every cover uses the same rows.
+                        break
+                else:
+                    if extra_gaps > 0:
+                        # Fill in reading order, so blocks pack into the
+                        # fewest rows.
+                        header = links.right[0]
+                    else:
+                        header = min(links.iter_items(),
+                                     key=links.size.__getitem__)
+                    if links.size[header] > 0:
+                        links.cover(header)
+                        frames.append([header, header])
+            if not frames:
+                break
+            frame = frames[-1]
+            header, row = frame
+            if row != header:
+                # Undo the option chosen last time.
+                stats.backtrack_count += 1
+                links.uncover_others(row)
+                option = chosen.pop()
+                key = option_keys[option]
+                if key != self.GAP_KEY:
+                    shape_total += 1
+                remaining_counts[key] += 1
+                is_open[option_cells[option]] = True
+                used_rows.pop()
+            row = links.down[row]
+            while row != header:
+                option = links.option[row]
+                key = option_keys[option]
+                new_rows = max(used_rows[-1], option_rows[option])
+                if remaining_counts[key] == 0 or fewest_rows <= new_rows:
+                    row = links.down[row]
+                    continue
+                if self.tries == 0 or (best_cover is not None and
+                                       0 <= self.tries <= self.stop_tries):
+                    row = header
+                    break
+                if self.tries > 0:
+                    self.tries -= 1
+                stats.node_count += 1
+                cells = option_cells[option]
+                is_open[cells] = False
+                remaining_counts[key] -= 1
+                if self.force_fours and not self.has_even_regions(
+                        is_open,
+                        remaining_counts[self.GAP_KEY]):
+                    remaining_counts[key] += 1
+                    is_open[cells] = True
+                    stats.backtrack_count += 1
+                    row = links.down[row]
+                    continue
+                if key != self.GAP_KEY:
+                    shape_total -= 1
+                chosen.append(option)
+                used_rows.append(new_rows)
+                stats.max_depth = max(stats.max_depth, len(chosen))
+                links.cover_others(row)
+                is_descending = True
+                break
+            frame[1] = row
+            if row == header:
+                links.uncover(header)
+                frames.pop()
+
+        if best_cover is None:
+            return None
+        return [option_cells[option]
+                for option in best_cover
+                if option_keys[option] != self.GAP_KEY]
+
+    def has_even_regions(self, is_open: np.ndarray, gap_count: int = 0) -> bool:
+        """ Check that the regions of open spaces can be filled with blocks.
+
+        :param is_open: flat boolean array of open spaces
+        :param gap_count: number of spaces that can still be gaps, so regions
+            can have that many spaces left over in total.
+        """
+        label_start = perf_counter()
+        regions, _ = label(is_open.reshape(self.height, self.width))
+        region_sizes = np.bincount(regions.ravel())
+        self.stats.label_time += perf_counter() - label_start
+        return (region_sizes[1:] % 4).sum() <= gap_count
+
+    def number_blocks(self,
+                      start_state: np.ndarray,
+                      solution: typing.Iterable[np.ndarray]) -> np.ndarray:
+        """ Add the blocks in a solution to a copy of the start state.
+
+        Each block gets the lowest block number that isn't used yet.
+        """
+        state = start_state.copy()
+        used_blocks = set(np.unique(start_state).tolist())
+        used_blocks.add(self.GAP)
+        next_block = self.GAP + 1
+        for cells in solution:
+            while next_block in used_blocks:
+                next_block += 1
+            if next_block > 255:
+                raise ValueError('Maximum 254 blocks in packer.')
+            state.flat[cells] = next_block
+            used_blocks.add(next_block)
+        return state
@@ -1,10 +1,12 @@
 import typing
 from collections import Counter
+from datetime import timedelta
 from pathlib import Path
 
 from PySide6.QtCore import QThread, Signal, QObject
 
 from four_letter_blocks.block import Block
+from four_letter_blocks.evo_controller import EvolutionController
 from four_letter_blocks.evo_packer import EvoPacker, PackingFitnessCalculator, FitnessScore
 from four_letter_blocks.puzzle import Puzzle, RotationsDisplay
 
@@ -43,6 +45,16 @@ class FillThread(QThread):
         self.attempt_count = 0
         self.top_fitness = FitnessScore(-100, -1)
 
+        # Number of pools to evolve in separate processes, see EvoPacker.
+        self.island_count = 0
+
+        # Seconds to spend packing each side, or None for no limit.
+        self.time_budget: float | None = None
+
+        # True to resize the pools and restart stale searches, see
+        # EvolutionController.
+        self.is_adaptive = False
+
         # [(back, front, fitness)]
         self.solutions: typing.List[typing.Tuple[str, str, FitnessScore]] = []
 
@@ -170,34 +182,53 @@ class FillThread(QThread):
         start_text = puzzle.format_blocks().replace('?', '.')
 
         packer = EvoPacker(start_text=start_text)
+        packer.island_count = self.island_count
+        if self.is_adaptive:
+            packer.controller = EvolutionController(
+                time_budget=self.time_budget,
+                patience=100,
+                min_pool_size=200,
+                max_pool_size=2000)
+        else:
+            packer.controller = EvolutionController(
+                time_budget=self.time_budget)
         packer.setup(shape_counts, self.fitness_calculator)
-        while packer.current_epoch < 1000:
-            is_found = packer.run_epoch()
-            if self.isInterruptionRequested():
-                return None
-            if front_blocks is None:
-                side = 'front'
-                new_back = back_blocks
-                new_front = packer.top_blocks
-            else:
-                side = 'back'
-                new_back = packer.top_blocks
-                new_front = front_blocks
-            if self.attempt_count:
-                prefix = f'found {len(self.solutions)}/{self.attempt_count-1}, '
+        try:
+            while (packer.current_epoch < 1000 and
+                   not packer.controller.is_finished):
+                is_found = packer.run_epoch()
+                if self.isInterruptionRequested():
+                    return None
+                if front_blocks is None:
+                    side = 'front'
+                    new_back = back_blocks
+                    new_front = packer.top_blocks
+                else:
+                    side = 'back'
+                    new_back = packer.top_blocks
+                    new_front = front_blocks
+                if self.attempt_count:
+                    prefix = f'found {len(self.solutions)}/{self.attempt_count-1}, '
+                else:
+                    prefix = ''
+                status = f'Packing {side}: {prefix}epoch {packer.current_epoch}, ' \
+                         f'{packer.top_fitness}'
+                if packer.estimated_time is not None:
+                    time_left = timedelta(seconds=round(packer.estimated_time))
+                    status += f', about {time_left} left'
+                if self.island_count:
+                    status += ' islands: ' + ', '.join(packer.pool_summaries)
+
+                # noinspection PyUnresolvedReferences
+                self.status_update.emit(status, new_back, new_front)
+                self.top_fitness = packer.top_fitness
+                if is_found:
+                    break
             else:
-                prefix = ''
-            status = f'Packing {side}: {prefix}epoch {packer.current_epoch}, ' \
-                     f'{packer.top_fitness}'
-
-            # noinspection PyUnresolvedReferences
-            self.status_update.emit(status, new_back, new_front)
-            self.top_fitness = packer.top_fitness
-            if is_found:
-                break
-        else:
-            if not packer.find_usable_packing():
-                return None
+                if not packer.find_usable_packing():
+                    return None
+        finally:
+            packer.close()
 
         return Puzzle.parse_sections(puzzle.title,
                                      puzzle.format_grid(),
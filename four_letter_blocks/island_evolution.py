@@ -0,0 +1,236 @@
+""" Island-model evolution: each population runs in its own process.
+
+The driver process keeps a proxy for each island that looks enough like a
+Population for Evolution's stale pool replacement, and for
+EvoPacker.run_epoch() to report on all the islands.
+"""
+import multiprocessing
+import random
+import traceback
+import typing
+from multiprocessing.context import BaseContext
+from pathlib import Path
+
+from four_letter_blocks.bit_board import attach_tables
+from four_letter_blocks.block_packer import create_rng
+from four_letter_blocks.evo import Evolution
+
+
+def run_island(commands,
+               reports,
+               pool_size,
+               fitness,
+               individual_class,
+               n_offsprings,
+               pair_params,
+               mutate_params,
+               init_params,
+               migrant_count: int,
+               seed: int,
+               table_folder: Path | None = None):
+    """ Evolve one population in a worker process.
+
+    Sends a report after starting, and after each command. Each command is a
+    list of migrant payloads to add before the next epoch, or None to stop.
+    :param table_folder: placement tables from save_tables() to attach, or
+        None to build them in this process.
+    """
+    try:
+        if table_folder is not None:
+            attach_tables(table_folder)
+        evolution = Evolution(pool_size,
+                              fitness,
+                              individual_class,
+                              n_offsprings,
+                              pair_params,
+                              mutate_params,
+                              init_params,
+                              rng=create_rng(seed))
+        pool = evolution.pool
+        while True:
+            reports.put((
+                pool.top_individual.get_payload(),
+                pool.mid_individual.get_payload(),
+                [individual.get_payload()
+                 for individual in pool.individuals[-migrant_count:]],
+                pool.is_stale,
+                pool.unimproved_count))
+            migrant_payloads = commands.get()
+            if migrant_payloads is None:
+                return
+            if migrant_payloads:
+                pool.replace([individual_class.from_payload(payload,
+                                                            init_params)
+                              for payload in migrant_payloads])
+            evolution.step()
+    except Exception:
+        reports.put(traceback.format_exc())
+
+
+class Island:
+    """ Proxy for a population that evolves in a worker process. """
+    def __init__(self,
+                 context: BaseContext,
+                 pool_size,
+                 fitness,
+                 individual_class,
+                 n_offsprings,
+                 pair_params,
+                 mutate_params,
+                 init_params,
+                 migrant_count: int,
+                 seed: int,
+                 table_folder: Path | None = None):
+        self.fitness = fitness
+        self.individual_class = individual_class
+        self.init_params = init_params
+        self.top_individual = None
+        self.mid_individual = None
+        self.migrant_payloads: list = []
+        self.is_stale = False
+        self.unimproved_count = 0
+        self.commands = context.Queue()
+        self.reports = context.Queue()
+        self.process = context.Process(  # type: ignore[attr-defined]
+            target=run_island,
+            args=(self.commands,
+                  self.reports,
+                  pool_size,
+                  fitness,
+                  individual_class,
+                  n_offsprings,
+                  pair_params,
+                  mutate_params,
+                  init_params,
+                  migrant_count,
+                  seed,
+                  table_folder),
+            daemon=True)
+        self.process.start()
+
+    @property
+    def best_fitness(self):
+        return self.fitness(self.top_individual)
+
+    def start_epoch(self, migrant_payloads: list | None = None):
+        """ Tell the worker to run an epoch, after adding any migrants. """
+        self.commands.put(migrant_payloads or [])
+
+    def receive_report(self):
+        """ Wait for the worker to report on its population. """
+        report = self.reports.get()
+        if isinstance(report, str):
+            raise RuntimeError(f'Island failed:\n{report}')
+        (top_payload,
+         mid_payload,
+         self.migrant_payloads,
+         self.is_stale,
+         self.unimproved_count) = report
+        self.top_individual = self.individual_class.from_payload(
+            top_payload,
+            self.init_params)
+        self.mid_individual = self.individual_class.from_payload(
+            mid_payload,
+            self.init_params)
+
+    def close(self):
+        if self.process.is_alive():
+            self.commands.put(None)
+            self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class IslandEvolution(Evolution):
+    """ Evolve each pool in its own worker process.
+
+    Every migration_interval epochs, each island sends its top
+    migrant_count individuals to the next island in the ring. Stale islands
+    get replaced, just like Evolution's stale pools.
+    """
+    def __init__(self,
+                 pool_size,
+                 fitness,
+                 individual_class,
+                 n_offsprings,
+                 pair_params,
+                 mutate_params,
+                 init_params,
+                 pool_count: int = 2,
+                 migration_interval: int = 5,
+                 migrant_count: int = 2,
+                 mp_context: BaseContext | None = None,
+                 rng: random.Random | None = None,
+                 table_folder: Path | None = None):
+        """ Initialize.
+
+        :param table_folder: placement tables from save_tables() for the
+            islands to attach, or None for each island to build its own.
+        Other parameters are the same as Evolution.
+        """
+        if mp_context is None:
+            mp_context = multiprocessing.get_context()
+        self.mp_context = mp_context
+        self.table_folder = table_folder
+        self.migration_interval = migration_interval
+        self.migrant_count = migrant_count
+        self.n_offsprings = n_offsprings
+        self.epoch_count = 0
+        self.pools: typing.List[Island]  # type: ignore[assignment]
+        super().__init__(pool_size,
+                         fitness,
+                         individual_class,
+                         n_offsprings,
+                         pair_params,
+                         mutate_params,
+                         init_params,
+                         pool_count,
+                         rng=rng)
+
+    def add_pools(self):
+        new_islands = []
+        while len(self.pools) < self.pool_count:
+            island = Island(self.mp_context,
+                            self.pool_size,
+                            self.fitness,
+                            self.individual_class,
+                            self.n_offsprings,
+                            self.pair_params,
+                            self.mutate_params,
+                            self.init_params,
+                            self.migrant_count,
+                            seed=self.rng.getrandbits(64),
+                            table_folder=self.table_folder)
+            new_islands.append(island)
+            self.pools.append(island)
+
+        # Let the new islands start up in parallel.
+        for island in new_islands:
+            island.receive_report()
+
+    def step(self):
+        self.epoch_count += 1
+        is_migrating = (1 < len(self.pools) and
+                        self.epoch_count % self.migration_interval == 0)
+        for i, island in enumerate(self.pools):
+            if is_migrating:
+                island.start_epoch(self.pools[i-1].migrant_payloads)
+            else:
+                island.start_epoch()
+        for island in self.pools:
+            island.receive_report()
+        old_islands = list(self.pools)
+        self.replace_stale_pools(any(island.is_stale
+                                     for island in self.pools))
+        for island in old_islands:
+            if island not in self.pools:
+                island.close()
+
+    def resize_pools(self, pool_size: int):
+        """ Running islands keep their size, so only new islands change. """
+        self.pool_size = pool_size
+        self.n_offsprings = pool_size // 5
+
+    def close(self):
+        for island in self.pools:
+            island.close()
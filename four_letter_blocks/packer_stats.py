@@ -0,0 +1,43 @@
+""" Count what a packer does, to compare packing strategies.
+
+The counters only add a few integer updates and timer reads to each search
+node, so packers always keep them.
+"""
+from dataclasses import dataclass, asdict, fields
+
+
+@dataclass
+class PackerStats:
+    node_count: int = 0  # search nodes that spent a try
+    backtrack_count: int = 0  # branches that didn't lead to a fill
+    max_depth: int = 0  # most blocks placed on one branch of the search
+    slot_search_count: int = 0  # calls to find_slots()
+    slot_search_time: float = 0.0  # seconds spent in find_slots()
+    label_time: float = 0.0  # seconds labelling regions for force_fours
+    forced_move_count: int = 0  # blocks placed without branching
+    pruned_count: int = 0  # branches skipped as symmetric images
+    epoch_count: int = 0  # evolution epochs
+    restart_count: int = 0  # searches started by a restart schedule
+    fitness_cache_hits: int = 0
+    fitness_cache_misses: int = 0
+
+    def add(self, other: 'PackerStats'):
+        """ Add another packer's counters to these, like a parallel worker. """
+        for field in fields(self):
+            name = field.name
+            value = getattr(self, name)
+            other_value = getattr(other, name)
+            if name == 'max_depth':
+                setattr(self, name, max(value, other_value))
+            else:
+                setattr(self, name, value + other_value)
+
+    def as_dict(self) -> dict[str, int | float]:
+        return asdict(self)
+
+    def __str__(self):
+        return (f'{self.node_count} nodes, '
+                f'{self.backtrack_count} backtracks, '
+                f'max depth {self.max_depth}, '
+                f'{self.slot_search_count} slot searches '
+                f'in {self.slot_search_time:.3f}s')
@@ -0,0 +1,270 @@
+import multiprocessing
+import os
+import random
+import typing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing.synchronize import Event
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from four_letter_blocks.bit_board import attach_tables, save_tables
+from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.branching import BranchingStrategy
+from four_letter_blocks.packer_stats import PackerStats
+from four_letter_blocks.transposition_table import TranspositionTable
+
+# Set in each worker process by start_worker().
+stop_event: Event | None = None
+
+
+class FillResult(typing.NamedTuple):
+    is_filled: bool
+    state: np.ndarray | None
+    tries: int
+    filled_rows: int
+    is_complete: bool = False  # False if tries ran out before placing all
+    stats: PackerStats | None = None
+
+
+class CancellableBlockPacker(BlockPacker):
+    """ Give up when another worker process sets the stop event. """
+    CHECK_INTERVAL = 256
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fill_count = 0
+        self.is_cancelled = False
+
+    def fill(self, shape_counts: typing.Counter[str] | None = None) -> bool:
+        self.fill_count += 1
+        if (stop_event is not None and
+                self.fill_count % self.CHECK_INTERVAL == 0 and
+                stop_event.is_set()):
+            self.is_cancelled = True
+            self.tries = 0
+        return super().fill(shape_counts)
+
+
+def start_worker(event: Event, table_folder: Path | None = None):
+    """ Set up a worker process.
+
+    :param event: set when the workers should stop
+    :param table_folder: placement tables from save_tables() to attach, or
+        None to build them in this process.
+    """
+    global stop_event
+    stop_event = event
+    if table_folder is not None:
+        attach_tables(table_folder)
+
+
+def fill_worker(start_state: np.ndarray,
+                shape_counts: typing.Counter[str] | None,
+                seed: int | None,
+                tries: int,
+                stop_tries: int,
+                split_row: int,
+                force_fours: bool,
+                branching: BranchingStrategy | None = None,
+                extra_gaps: int = -1,
+                are_symmetries_pruned: bool = False,
+                restart_unit: int = 0,
+                restart_schedule: str = 'luby',
+                transposition_size: int | None = None) -> FillResult:
+    """ Run one fill in a worker process.
+
+    :param seed: random seed for shuffling the slots, or None to fill them
+        in order, like BlockPacker.
+    :param transposition_size: max_size for a transposition table of dead
+        states in this fill, or None to search without one.
+    Other parameters are the BlockPacker settings with the same names.
+    """
+    packer = CancellableBlockPacker(start_state=start_state,
+                                    tries=tries,
+                                    split_row=split_row)
+    packer.stop_tries = stop_tries
+    packer.force_fours = force_fours
+    if branching is not None:
+        packer.branching = branching
+    packer.extra_gaps = extra_gaps
+    packer.are_symmetries_pruned = are_symmetries_pruned
+    packer.restart_unit = restart_unit
+    packer.restart_schedule = restart_schedule
+    if transposition_size is not None:
+        packer.transposition_table = TranspositionTable(transposition_size)
+    if seed is not None:
+        packer.rng = random.Random(seed)
+        packer.are_slots_shuffled = True
+    requested_count = None
+    if shape_counts is not None:
+        requested_count = sum(shape_counts.values())
+    is_filled = packer.fill(shape_counts) and not packer.is_cancelled
+    if not is_filled:
+        return FillResult(False, None, packer.tries, 0, stats=packer.stats)
+    state = packer.state
+    assert state is not None
+    new_block_count = (len(np.unique(state[state > packer.GAP])) -
+                       len(np.unique(start_state[start_state > packer.GAP])))
+    is_complete = (not np.any(state == packer.UNUSED) or
+                   (requested_count is not None and
+                    new_block_count >= requested_count))
+    return FillResult(True,
+                      state,
+                      packer.tries,
+                      packer.count_filled_rows(),
+                      is_complete,
+                      packer.stats)
+
+
+class ParallelBlockPacker(BlockPacker):
+    """ Run several randomized fills at once, in separate processes.
+
+    The first worker fills the slots in order, just like BlockPacker, and
+    each of the others shuffles the slots with a different seed. If
+    is_first_fill_used is True, the first complete fill wins, and the other
+    workers are stopped. Otherwise, wait for all the workers, and keep the
+    fill with the fewest rows. A worker that runs out of tries can return a
+    partial fill, just like BlockPacker, but that only wins if no other
+    worker completes.
+
+    The worker processes start with the first fill, and later fills reuse
+    them, so call close() when you're done packing.
+    """
+    def __init__(self,
+                 width=0,
+                 height=0,
+                 tries=-1,
+                 min_tries=-1,
+                 start_text: str | None = None,
+                 start_state: np.ndarray | None = None,
+                 split_row=0,
+                 worker_count: int | None = None,
+                 seed: int | None = None):
+        """ Initialize.
+
+        :param worker_count: number of fills to run, or None for one on
+            each CPU.
+        :param seed: random seed for choosing each worker's seed, or None
+            to choose them from self.rng.
+        Other parameters are the same as BlockPacker.
+        """
+        super().__init__(width,
+                         height,
+                         tries,
+                         min_tries,
+                         start_text,
+                         start_state,
+                         split_row)
+        if worker_count is None:
+            worker_count = os.cpu_count() or 1
+        self.worker_count = worker_count
+        self.seed = seed
+        self.is_first_fill_used = True
+
+        # Worker processes, started by the first fill, and kept until close().
+        self.executor: ProcessPoolExecutor | None = None
+        self.stop_event: Event | None = None
+        self.table_folder: TemporaryDirectory | None = None
+        self.table_size: typing.Tuple[int, int] | None = None
+
+    def start_workers(self) -> ProcessPoolExecutor:
+        """ Start the worker processes, unless they're already running. """
+        table_size = (self.width, self.height)
+        if self.executor is not None and self.table_size != table_size:
+            self.close()
+        if self.executor is None:
+            context = multiprocessing.get_context()
+            self.stop_event = context.Event()
+            self.table_folder = TemporaryDirectory()
+            table_path = Path(self.table_folder.name)
+            save_tables(self.width, self.height, table_path)
+            self.table_size = table_size
+            self.executor = ProcessPoolExecutor(
+                self.worker_count,
+                mp_context=context,
+                initializer=start_worker,
+                initargs=(self.stop_event, table_path))
+        assert self.stop_event is not None
+        self.stop_event.clear()
+        return self.executor
+
+    def close(self):
+        """ Stop the worker processes, and delete their placement tables. """
+        if self.executor is not None:
+            assert self.stop_event is not None
+            self.stop_event.set()
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        if self.table_folder is not None:
+            self.table_folder.cleanup()
+            self.table_folder = None
+        self.table_size = None
+
+    def clone_empty(self, width: int, height: int) -> 'BlockPacker':
+        packer = super().clone_empty(width, height)
+        assert isinstance(packer, ParallelBlockPacker)
+        packer.executor = None
+        packer.stop_event = None
+        packer.table_folder = None
+        packer.table_size = None
+        return packer
+
+    def fill(self, shape_counts: typing.Counter[str] | None = None) -> bool:
+        if self.are_partials_saved or self.state is None:
+            return super().fill(shape_counts)
+        rng = self.rng if self.seed is None else random.Random(self.seed)
+        seeds: typing.List[int | None] = [None]
+        seeds.extend(rng.randrange(2**32) for _ in range(self.worker_count-1))
+        executor = self.start_workers()
+        table = self.transposition_table
+        transposition_size = None if table is None else table.max_size
+        pending = {executor.submit(fill_worker,
+                                   self.state,
+                                   shape_counts,
+                                   seed,
+                                   self.tries,
+                                   self.stop_tries,
+                                   self.split_row,
+                                   self.force_fours,
+                                   self.branching,
+                                   self.extra_gaps,
+                                   self.are_symmetries_pruned,
+                                   self.restart_unit,
+                                   self.restart_schedule,
+                                   transposition_size)
+                   for seed in seeds}
+        results: typing.List[FillResult] = []
+        best_result = None
+        try:
+            while pending and best_result is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results.append(result)
+                    if self.is_first_fill_used and result.is_complete:
+                        best_result = result
+        finally:
+            # Stop the other workers before the next fill clears the event.
+            assert self.stop_event is not None
+            self.stop_event.set()
+            for future in pending:
+                future.cancel()
+            wait(pending)
+        for result in results:
+            if result.stats is not None:
+                self.stats.add(result.stats)
+        if best_result is None:
+            filled_results = [result for result in results if result.is_filled]
+            if filled_results:
+                best_result = min(filled_results,
+                                  key=lambda result: (not result.is_complete,
+                                                      result.filled_rows))
+        if best_result is None:
+            self.tries = min(result.tries for result in results)
+            self.state = None
+            return False
+        self.tries = best_result.tries
+        self.state = best_result.state
+        return True
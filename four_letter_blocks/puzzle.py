@@ -25,6 +25,27 @@ class RotationsDisplay(Enum):
     BACK = auto()
 
 
+@dataclass(frozen=True, order=True)
+class WordWarning:
+    """ A style problem with one word.
+
+    Coordinates are (x, y), counting from 1 at the top left, the same as the
+    warning messages.
+    """
+    start: typing.Tuple[int, int]
+    end: typing.Tuple[int, int]
+    is_complete: bool  # True if all on one block, False if two letters
+    block_index: int | None = None  # index in Puzzle.blocks, if complete
+
+    @property
+    def squares(self) -> typing.List[typing.Tuple[int, int]]:
+        """ All the (x, y) coordinates in the word, counting from 1. """
+        (x1, y1), (x2, y2) = self.start, self.end
+        return [(x, y)
+                for x in range(x1, x2+1)
+                for y in range(y1, y2+1)]
+
+
 @dataclass
 class Puzzle:
     HINT = 'Clue numbers are shuffled: 1 Across might not be the top left.'
@@ -310,9 +331,22 @@ class Puzzle:
         return warnings
 
     def check_word_length(self):
+        for warning in self.find_word_warnings():
+            if warning.is_complete:
+                yield (f'complete word on one block from {warning.start} '
+                       f'to {warning.end}')
+            else:
+                yield f'two-letter word at {warning.start} and {warning.end}'
+
+    def find_word_warnings(self) -> typing.List['WordWarning']:
+        """ Find two-letter words, and words that are all on one block.
+
+        Two-letter warnings come first, then complete words, each sorted by
+        position.
+        """
         short_warnings = []
         complete_warnings = []
-        for block in self.blocks:
+        for block_index, block in enumerate(self.blocks):
             for square1 in block.squares:
                 for word, dx, dy in ((square1.across_word, 1, 0),
                                      (square1.down_word, 0, 1)):
@@ -325,9 +359,7 @@ class Puzzle:
                     end = (x1 + word_length * dx + dy, y1 + word_length * dy + dx)
                     if word_length == 2:
                         short_warnings.append(
-                            (start,
-                             end,
-                             f'two-letter word at {start} and {end}'))
+                            WordWarning(start, end, is_complete=False))
                     if block.marker == Block.UNUSED:
                         continue
                     block_coordinates = block.calculate_coordinates()
@@ -336,14 +368,14 @@ class Puzzle:
                         if (square2.x, square2.y) not in block_coordinates:
                             break
                     else:
-                        complete_warnings.append((
-                            start,
-                            end,
-                            f'complete word on one block from {start} to {end}'))
+                        complete_warnings.append(
+                            WordWarning(start,
+                                        end,
+                                        is_complete=True,
+                                        block_index=block_index))
         short_warnings.sort()
-        yield from (warning for start, end, warning in short_warnings)
         complete_warnings.sort()
-        yield from (warning for start, end, warning in complete_warnings)
+        return short_warnings + complete_warnings
 
     def check_repeats(self):
         word_counts = Counter()
@@ -50,11 +50,8 @@ class PuzzlePair(PuzzleSet):
             self.block_packer = flipped_packer
         else:
             grid_size = front_puzzle.grid.width
-            self.block_packer = BlockPacker(
-                grid_size,
-                grid_size,
-                self.block_packer.tries,
-                split_row=self.block_packer.split_row)
+            self.block_packer = self.block_packer.clone_empty(grid_size,
+                                                              grid_size)
             is_filled = self.block_packer.fill(Counter(self.shape_counts))
             if not is_filled:
                 raise RuntimeError("Blocks didn't fit.")
@@ -0,0 +1,173 @@
+""" Check which placements would leave uneven regions of empty spaces.
+
+When BlockPacker.force_fours is on, a placement is only usable if every
+region of empty spaces left after placing it has a multiple of four spaces.
+Instead of labelling the whole grid again for every placement, label it once,
+then only look closely at the placements that might split their region.
+"""
+import typing
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from scipy.ndimage import label  # type: ignore
+
+from four_letter_blocks.bit_board import (build_placements, shape_cell_offsets,
+                                          TABLE_CACHE_SIZE)
+
+# Connect spaces within each plane of a stack of grids, but not across planes.
+STACKED_STRUCTURE = np.zeros((3, 3, 3), bool)
+STACKED_STRUCTURE[1] = [[0, 1, 0],
+                        [1, 1, 1],
+                        [0, 1, 0]]
+
+
+@dataclass(frozen=True)
+class PlacementWindows:
+    """ The spaces around each placement of one shape rotation.
+
+    A window is the placement's bounding box, plus a border of one space.
+    """
+    cells: np.ndarray  # [placement, row, col] flat index, or -1 outside grid
+    is_block: np.ndarray  # [row, col] True where the block covers the window
+    is_ring: np.ndarray  # [row, col] True next to the block, but not on it
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def build_windows(width: int, height: int) -> dict[str, PlacementWindows]:
+    all_windows = {}
+    all_placements = build_placements(width, height)
+    for shape, offsets in shape_cell_offsets().items():
+        placements = all_placements[shape]
+        offset_array = np.array(offsets) + 1
+        window_height = offset_array[:, 0].max() + 2
+        window_width = offset_array[:, 1].max() + 2
+        is_block = np.zeros((window_height, window_width), bool)
+        is_block[offset_array[:, 0], offset_array[:, 1]] = True
+        is_ring = np.zeros_like(is_block)
+        is_ring[:-1] |= is_block[1:]
+        is_ring[1:] |= is_block[:-1]
+        is_ring[:, :-1] |= is_block[:, 1:]
+        is_ring[:, 1:] |= is_block[:, :-1]
+        is_ring &= ~is_block
+
+        window_rows, window_cols = np.mgrid[0:window_height, 0:window_width]
+        rows = placements.rows[:, None, None] + window_rows - 1
+        cols = placements.cols[:, None, None] + window_cols - 1
+        is_inside = (0 <= rows) & (rows < height) & (0 <= cols) & (cols < width)
+        cells = np.where(is_inside, rows * width + cols, -1)
+        for array in (cells, is_block, is_ring):
+            array.setflags(write=False)
+        all_windows[shape] = PlacementWindows(cells=cells,
+                                              is_block=is_block,
+                                              is_ring=is_ring)
+    return all_windows
+
+
+class RegionParity:
+    """ Label the regions of empty spaces in one state of the grid. """
+    def __init__(self, is_empty: np.ndarray):
+        """ Initialize.
+
+        :param is_empty: boolean array of empty spaces in the grid
+        """
+        self.height, self.width = is_empty.shape
+        self.is_empty = is_empty
+        self.regions: np.ndarray
+        self.regions, _ = label(is_empty)
+        region_sizes = np.bincount(self.regions.ravel())
+        region_sizes[0] = 0
+        self.is_even = not (region_sizes % 4).any()
+
+        # Flat copy with an extra False at the end for cells outside the grid.
+        self.padded_empty = np.append(is_empty.ravel(), False)
+
+    def find_even(self,
+                  shape: str,
+                  placements: np.ndarray) -> np.ndarray:
+        """ Check which placements leave only even regions.
+
+        :param shape: the shape rotation to place, like 'L0'
+        :param placements: placement numbers from build_placements(), all of
+            them on empty spaces
+        :return: a boolean array, True for each placement that leaves every
+            region a multiple of four
+        """
+        if not self.is_even or placements.size == 0:
+            # A placement only changes its own region by four spaces, so any
+            # odd regions stay odd.
+            return np.full(placements.size, self.is_even)
+        windows = build_windows(self.width, self.height)[shape]
+        window_empty = self.padded_empty[windows.cells[placements]]
+        window_empty &= ~windows.is_block
+        window_regions, _ = label(window_empty, structure=STACKED_STRUCTURE)
+
+        # If all the empty spaces next to the block are still connected
+        # within the window, then the block can't split its region.
+        ring_regions = window_regions[:, windows.is_ring]
+        ring_max = ring_regions.max(axis=1)
+        ring_regions = np.where(ring_regions == 0, ring_max[:, None],
+                                ring_regions)
+        is_connected = ring_regions.min(axis=1) == ring_max
+        is_even = is_connected.copy()
+        unsure, = np.nonzero(~is_connected)
+        if unsure.size:
+            is_even[unsure] = self.check_splits(shape, placements[unsure])
+        return is_even
+
+    def check_splits(self,
+                     shape: str,
+                     placements: np.ndarray) -> np.ndarray:
+        """ Label each placement's region again, without the placement.
+
+        :return: a boolean array, True for each placement that splits its
+            region into pieces that are all multiples of four
+        """
+        all_placements = build_placements(self.width, self.height)
+        cells = all_placements[shape].cells[placements]
+        placement_regions = self.regions.flat[cells[:, 0]]
+        is_even = np.zeros(placements.size, bool)
+        for region in np.unique(placement_regions):
+            is_in_region = placement_regions == region
+            region_rows, region_cols = np.nonzero(self.regions == region)
+            top, left = region_rows.min(), region_cols.min()
+            bottom, right = region_rows.max() + 1, region_cols.max() + 1
+            region_empty = self.regions[top:bottom, left:right] == region
+            region_cells = cells[is_in_region]
+            cell_rows = region_cells // self.width - top
+            cell_cols = region_cells % self.width - left
+            stacked = np.repeat(region_empty[None],
+                                region_cells.shape[0],
+                                axis=0)
+            planes = np.arange(region_cells.shape[0])[:, None]
+            stacked[planes, cell_rows, cell_cols] = False
+            pieces, piece_count = label(stacked, structure=STACKED_STRUCTURE)
+            piece_sizes = np.bincount(pieces.ravel(),
+                                      minlength=piece_count + 1)
+            is_odd_piece = piece_sizes % 4 != 0
+            is_odd_piece[0] = False
+            has_odd = is_odd_piece[pieces].any(axis=(1, 2))
+            is_even[is_in_region] = ~has_odd
+        return is_even
+
+
+def find_even_slots(
+        is_empty: np.ndarray,
+        slots: typing.Dict[str, np.ndarray]) -> typing.Dict[str, np.ndarray]:
+    """ Remove slots that would leave uneven regions of empty spaces.
+
+    :param is_empty: boolean array of empty spaces in the grid
+    :param slots: {shape: bitmap} of open slots, see BlockPacker.find_slots()
+    :return: {shape: bitmap} of the open slots that leave even regions
+    """
+    height, width = is_empty.shape
+    parity = RegionParity(is_empty)
+    all_placements = build_placements(width, height)
+    even_slots = {}
+    for shape, shape_slots in slots.items():
+        slot_rows, slot_cols = np.nonzero(shape_slots)
+        placements = all_placements[shape].index[slot_rows, slot_cols]
+        is_even = parity.find_even(shape, placements)
+        even_slots[shape] = np.zeros_like(shape_slots)
+        even_slots[shape][slot_rows[is_even], slot_cols[is_even]] = True
+    return even_slots
@@ -0,0 +1,49 @@
+""" Budget schedules for restarting a randomized search.
+
+A depth-first search that makes one unlucky choice near the top of the tree
+can spend its whole budget under that choice. Restarting with a new random
+order after a small budget, then a bigger one, and so on, avoids those long
+runs. The Luby schedule is within a log factor of the best fixed restart
+budget, without knowing that budget in advance.
+"""
+import typing
+
+SCHEDULES = ('luby', 'geometric')
+
+
+def luby(index: int) -> int:
+    """ Find a term of the Luby sequence: 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+
+    :param index: position in the sequence, starting at 1
+    """
+    power = 1
+    while (1 << power) - 1 < index:
+        power += 1
+    while index != (1 << power) - 1:
+        # Each block of the sequence repeats everything before it.
+        index -= (1 << (power - 1)) - 1
+        power = 1
+        while (1 << power) - 1 < index:
+            power += 1
+    return 1 << (power - 1)
+
+
+def iter_budgets(schedule: str,
+                 unit: int,
+                 factor: float = 1.5) -> typing.Iterator[int]:
+    """ Generate the tries to allow for each restart.
+
+    :param schedule: 'luby' for unit times the Luby sequence, or
+        'geometric' for unit times a growing power of factor
+    :param unit: tries for the first restart
+    :param factor: growth for each geometric restart
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f'Unknown restart schedule: {schedule!r}.')
+    index = 1
+    while True:
+        if schedule == 'luby':
+            yield unit * luby(index)
+        else:
+            yield round(unit * factor ** (index - 1))
+        index += 1
@@ -0,0 +1,103 @@
+import typing
+
+import numpy as np
+
+from four_letter_blocks.bit_board import build_cell_index
+
+
+class SlotTracker:
+    """ Keep slot coverage up to date as blocks are placed and removed.
+
+    Instead of checking every placement after each move, only the placements
+    that cover the changed cells get updated. Each call to place() can be
+    undone by a call to undo(), in reverse order, as a search backtracks.
+    """
+    def __init__(self, occupied: np.ndarray, split_row: int = 0):
+        """ Initialize.
+
+        :param occupied: boolean array of the grid's filled spaces
+        :param split_row: placements may not cross above this row, see
+            BlockPacker.split_row
+        """
+        self.height, self.width = occupied.shape
+        self.index = index = build_cell_index(self.width, self.height)
+        self.occupied = occupied.ravel().copy()
+
+        # Count the reasons each placement can't be used: occupied cells, plus
+        # one for crossing the split row.
+        is_crossing = ((split_row - index.heights + 1 <= index.rows) &
+                       (index.rows < split_row))
+        self.blockers = (self.occupied[index.cells].sum(axis=1) +
+                         is_crossing).astype(np.int16)
+
+        is_usable = self.blockers == 0
+        self.slot_maps = np.zeros((len(index.shapes), self.height, self.width),
+                                  dtype=bool)
+        self.slot_maps.flat[index.slot_positions[is_usable]] = True
+        self.coverage = np.bincount(index.cells[is_usable].ravel(),
+                                    minlength=self.occupied.size)
+        self.uncovered_count = int(np.count_nonzero(
+            (self.coverage == 0) & ~self.occupied))
+
+        # [(cells, affected placements, counts, newly blocked placements)]
+        self.history: typing.List[typing.Tuple[np.ndarray,
+                                               np.ndarray,
+                                               np.ndarray,
+                                               np.ndarray]] = []
+
+    @property
+    def slot_coverage(self) -> np.ndarray:
+        """ Coverage of each space, in the format of BlockPacker.find_slots().
+
+        Filled spaces have coverage 255.
+        """
+        coverage = self.coverage.astype(np.uint8)
+        coverage[self.occupied] = 255
+        return coverage.reshape(self.height, self.width)
+
+    def find_slots(self) -> dict[str, np.ndarray]:
+        """ Copy the current slots for each shape rotation.
+
+        :return: {shape: bitmap}, like BlockPacker.find_slots().
+        """
+        slot_maps = self.slot_maps.copy()
+        return dict(zip(self.index.shapes, slot_maps))
+
+    def place(self, cells: np.ndarray):
+        """ Record a new block in the grid.
+
+        :param cells: flat indexes of the block's spaces
+        """
+        affected, counts = np.unique(self.index.find_covering(cells),
+                                     return_counts=True)
+        old_blockers = self.blockers[affected]
+        newly_blocked = affected[old_blockers == 0]
+        changed_cells = np.union1d(cells, self.index.cells[newly_blocked])
+        old_uncovered = self.count_uncovered(changed_cells)
+
+        self.blockers[affected] = old_blockers + counts
+        self.slot_maps.flat[self.index.slot_positions[newly_blocked]] = False
+        np.subtract.at(self.coverage, self.index.cells[newly_blocked], 1)
+        self.occupied[cells] = True
+
+        self.uncovered_count += self.count_uncovered(changed_cells)
+        self.uncovered_count -= old_uncovered
+        self.history.append((cells, affected, counts, newly_blocked))
+
+    def undo(self):
+        """ Remove the most recently placed block. """
+        cells, affected, counts, newly_blocked = self.history.pop()
+        changed_cells = np.union1d(cells, self.index.cells[newly_blocked])
+        old_uncovered = self.count_uncovered(changed_cells)
+
+        self.occupied[cells] = False
+        np.add.at(self.coverage, self.index.cells[newly_blocked], 1)
+        self.slot_maps.flat[self.index.slot_positions[newly_blocked]] = True
+        self.blockers[affected] -= counts
+
+        self.uncovered_count += self.count_uncovered(changed_cells)
+        self.uncovered_count -= old_uncovered
+
+    def count_uncovered(self, cells: np.ndarray) -> int:
+        return int(np.count_nonzero((self.coverage[cells] == 0) &
+                                    ~self.occupied[cells]))
@@ -0,0 +1,145 @@
+""" Skip branches of a packing search that mirror branches already searched.
+
+If turning or flipping the grid maps the open spaces onto themselves, and the
+remaining shape counts onto themselves, then it maps every packing onto
+another valid packing. When a branch has no solution, its images have no
+solution either, so a packer can skip them.
+"""
+import typing
+from functools import cache
+
+import numpy as np
+
+from four_letter_blocks.bit_board import shape_cell_offsets
+
+# Transformations of a 2-D array that work on any grid.
+TRANSFORMS: dict[str, typing.Callable[[np.ndarray], np.ndarray]] = {
+    'rot180': lambda a: np.rot90(a, 2),
+    'flip_lr': np.fliplr,
+    'flip_ud': np.flipud}
+
+# Transformations that only work on a square grid.
+SQUARE_TRANSFORMS: dict[str, typing.Callable[[np.ndarray], np.ndarray]] = {
+    'rot90': np.rot90,
+    'rot270': lambda a: np.rot90(a, -1),
+    'transpose': np.transpose,
+    'anti_transpose': lambda a: np.rot90(a, 2).T}
+
+
+class GridSymmetry(typing.NamedTuple):
+    name: str
+    cell_map: np.ndarray  # new flat index for each old flat index
+    shape_map: dict[str, str]  # new shape for each old shape or letter
+
+
+@cache
+def map_shapes(transform_name: str) -> dict[str, str]:
+    """ Find what each shape rotation becomes after a transformation.
+
+    Letters without a rotation number are included, like 'L' to 'J' for a
+    mirror image.
+    """
+    transform = TRANSFORMS.get(transform_name) or SQUARE_TRANSFORMS[
+        transform_name]
+    all_offsets = shape_cell_offsets()
+    shape_names = {offsets: name for name, offsets in all_offsets.items()}
+    shape_map = {}
+    for name, offsets in all_offsets.items():
+        pattern = np.zeros((4, 4), dtype=bool)
+        pattern[tuple(zip(*offsets))] = True
+        rows, cols = np.nonzero(transform(pattern))
+        new_offsets = tuple(sorted(zip((rows - rows.min()).tolist(),
+                                       (cols - cols.min()).tolist())))
+        new_name = shape_names[new_offsets]
+        shape_map[name] = new_name
+        shape_map[name[0]] = new_name[0]
+    return shape_map
+
+
+@cache
+def list_grid_symmetries(width: int,
+                         height: int) -> typing.Tuple[GridSymmetry, ...]:
+    """ List the transformations that fit a grid, except the identity. """
+    transforms = dict(TRANSFORMS)
+    if width == height:
+        transforms.update(SQUARE_TRANSFORMS)
+    cell_count = width * height
+    symmetries = []
+    for name, transform in transforms.items():
+        old_cells = transform(np.arange(cell_count).reshape(height, width))
+        cell_map = np.empty(cell_count, dtype=int)
+        cell_map[old_cells.ravel()] = np.arange(cell_count)
+        cell_map.setflags(write=False)
+        symmetries.append(GridSymmetry(name, cell_map, map_shapes(name)))
+    return tuple(symmetries)
+
+
+def find_symmetries(
+        is_open: np.ndarray,
+        shape_counts: typing.Mapping[str, int],
+        split_row: int = 0,
+        candidates: typing.Iterable[GridSymmetry] | None = None) -> typing.List[
+            GridSymmetry]:
+    """ Find the transformations that leave a search state unchanged.
+
+    :param is_open: boolean array of spaces that still need filling
+    :param shape_counts: number of blocks left for each shape
+    :param split_row: blocks can't cross above this row, so it has to map
+        onto itself. Zero if there's no split.
+    :param candidates: transformations to check, or None for all that fit
+        the grid.
+    """
+    height, width = is_open.shape
+    if candidates is None:
+        candidates = list_grid_symmetries(width, height)
+    flat_open = is_open.ravel()
+    is_bottom = np.arange(width * height) >= split_row * width
+    symmetries = []
+    for symmetry in candidates:
+        cell_map = symmetry.cell_map
+        if not np.array_equal(flat_open[cell_map], flat_open):
+            continue
+        mapped_bottom = is_bottom[cell_map]
+        if not (np.array_equal(mapped_bottom, is_bottom) or
+                np.array_equal(mapped_bottom, ~is_bottom)):
+            continue
+        shape_map = symmetry.shape_map
+        if any(shape_counts.get(shape_map[shape], 0) != count
+               for shape, count in shape_counts.items()):
+            continue
+        symmetries.append(symmetry)
+    return symmetries
+
+
+class SymmetryPruner:
+    """ Remember branches with no solution, and recognize their images.
+
+    A branch is a group of flat cell indexes for each grid that the block
+    covers, so a double-sided packer passes the front and back cells, and
+    a cell map for each of them.
+    """
+    def __init__(self, cell_maps: typing.Sequence[typing.Tuple[np.ndarray, ...]]):
+        """ Initialize.
+
+        :param cell_maps: for each symmetry, GridSymmetry.cell_map for each
+            group of cells in a branch.
+        """
+        self.cell_maps = cell_maps
+        self.refuted: typing.Set[tuple] = set()
+        self.pruned_count = 0
+
+    def add_refuted(self, *cell_groups: np.ndarray):
+        self.refuted.add(tuple(tuple(sorted(cells.tolist()))
+                               for cells in cell_groups))
+
+    def is_image(self, *cell_groups: np.ndarray) -> bool:
+        """ Check if a branch is an image of a refuted branch. """
+        if not self.refuted:
+            return False
+        for group_maps in self.cell_maps:
+            key = tuple(tuple(sorted(cell_map[cells].tolist()))
+                        for cell_map, cells in zip(group_maps, cell_groups))
+            if key in self.refuted:
+                self.pruned_count += 1
+                return True
+        return False
@@ -0,0 +1,106 @@
+""" Remember search states that are known to have no solution.
+
+A packer's search often reaches the same spaces filled with the same shapes
+left, just by placing blocks in a different order. Each state gets a Zobrist
+hash: every cell and every (shape, count) pair has a random 64-bit key, and
+the state's hash is all of its keys XORed together. Different states can
+share a hash, so the table also stores each state in full, and only counts
+a match when the whole state is the same.
+"""
+import typing
+from collections import OrderedDict
+from functools import cache
+from hashlib import blake2b
+
+import numpy as np
+
+
+@cache
+def build_cell_keys(cell_count: int) -> np.ndarray:
+    """ Random keys for each cell, the same every time. """
+    rng = np.random.default_rng(cell_count)
+    keys = rng.integers(np.iinfo(np.uint64).max,
+                        size=cell_count,
+                        dtype=np.uint64,
+                        endpoint=True)
+    keys.setflags(write=False)
+    return keys
+
+
+@cache
+def get_count_key(shape: str, count: int) -> int:
+    """ Random key for a remaining count of one shape, the same every time. """
+    digest = blake2b(f'{shape}:{count}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class StateKey(typing.NamedTuple):
+    hash: int  # Zobrist hash of the spaces and counts, plus the settings
+    cells: bytes  # filled spaces, packed into bits
+    shape_counts: typing.Tuple[typing.Tuple[str, int], ...]  # non-zero, sorted
+    settings: typing.Tuple[int, ...]
+
+
+class TranspositionTable:
+    """ A memory-bounded set of dead search states.
+
+    When the table is full, the least recently used state gets evicted.
+    """
+    def __init__(self, max_size: int = 200_000):
+        """ Initialize.
+
+        :param max_size: the most states to remember
+        """
+        self.max_size = max_size
+        self.dead_states: OrderedDict[int, StateKey] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.dead_states)
+
+    @staticmethod
+    def find_key(occupied: np.ndarray,
+                 shape_counts: typing.Mapping[str, int],
+                 *settings: int) -> StateKey:
+        """ Hash a search state.
+
+        :param occupied: boolean array of filled spaces
+        :param shape_counts: number of blocks of each shape left to place
+        :param settings: anything else that changes the search's result, like
+            the packer's width and split row
+        """
+        cell_keys = build_cell_keys(occupied.size)
+        flat_occupied = occupied.ravel()
+        key = int(np.bitwise_xor.reduce(cell_keys[flat_occupied]))
+        counts = tuple(sorted((shape, count)
+                              for shape, count in shape_counts.items()
+                              if count))
+        for shape, count in counts:
+            key ^= get_count_key(shape, count)
+        return StateKey(hash((key, *settings)),
+                        np.packbits(flat_occupied).tobytes(),
+                        counts,
+                        settings)
+
+    def is_dead(self, key: StateKey) -> bool:
+        """ Check if a state was recorded as dead, and count hits and misses.
+
+        A different state with the same hash counts as a miss.
+        """
+        if self.dead_states.get(key.hash) != key:
+            self.misses += 1
+            return False
+        self.dead_states.move_to_end(key.hash)
+        self.hits += 1
+        return True
+
+    def add_dead(self, key: StateKey):
+        """ Record a state that has no solution.
+
+        Replaces any other state with the same hash.
+        """
+        self.dead_states[key.hash] = key
+        self.dead_states.move_to_end(key.hash)
+        if len(self.dead_states) > self.max_size:
+            self.dead_states.popitem(last=False)
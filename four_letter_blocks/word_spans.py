@@ -0,0 +1,225 @@
+""" Score packed states with array operations, instead of parsing a Puzzle.
+
+A word is a run of two or more letters across or down, between gaps or
+the edges of the grid, the same as Grid finds. Only words of four letters
+or fewer can fit on one block.
+"""
+import typing
+from collections import Counter
+from dataclasses import dataclass
+from functools import cache, lru_cache
+
+import numpy as np
+
+from four_letter_blocks.bit_board import shape_cell_offsets
+
+BLOCK_SIZE = 4
+
+
+@dataclass(frozen=True)
+class WordSpans:
+    """ The short words in a grid, by their flat cell indexes. """
+    cells: np.ndarray  # [word, 4], short words padded with their first cell
+    lengths: np.ndarray  # [word]
+    cell_words: typing.Tuple[np.ndarray, ...]  # word indexes for each cell
+
+    def __len__(self):
+        return len(self.cells)
+
+    def find_words(self, cells: np.ndarray) -> np.ndarray:
+        """ Find the indexes of all words that cover any of the cells. """
+        if not len(cells):
+            return np.zeros(0, dtype=int)
+        return np.unique(np.concatenate([self.cell_words[cell]
+                                         for cell in cells]))
+
+
+def build_word_spans(is_letter: np.ndarray, split_row: int = 0) -> WordSpans:
+    """ Find the words that are short enough to fit on one block.
+
+    :param is_letter: boolean array, False for gaps
+    :param split_row: words can't cross above this row, like the top of the
+        back grid in a double packing. Zero if there's no split.
+    """
+    height, width = is_letter.shape
+    return find_word_spans(width,
+                           height,
+                           np.packbits(is_letter).tobytes(),
+                           split_row)
+
+
+@lru_cache(maxsize=100)
+def find_word_spans(width: int,
+                    height: int,
+                    packed_letters: bytes,
+                    split_row: int = 0):
+    bits = np.unpackbits(np.frombuffer(packed_letters, np.uint8),
+                         count=width*height)
+    is_letter = bits.astype(bool).reshape(height, width)
+    flat_indexes = np.arange(width * height).reshape(height, width)
+    spans = []
+    lengths = []
+    for letters, indexes, is_column in ((is_letter, flat_indexes, False),
+                                        (is_letter.T, flat_indexes.T, True)):
+        for line, line_indexes in zip(letters, indexes):
+            if is_column and split_row:
+                # Insert a gap at the split, so words can't cross it.
+                line = np.insert(line, split_row, False)
+                line_indexes = np.insert(line_indexes, split_row, -1)
+            padded = np.concatenate(([False], line, [False]))
+            changes = np.diff(padded.astype(np.int8))
+            starts, = np.nonzero(changes == 1)
+            ends, = np.nonzero(changes == -1)
+            for start, end in zip(starts, ends):
+                if 2 <= end - start <= BLOCK_SIZE:
+                    cells = line_indexes[start:end].tolist()
+                    cells += cells[:1] * (BLOCK_SIZE - len(cells))
+                    spans.append(cells)
+                    lengths.append(end - start)
+    cells = np.array(spans, dtype=int).reshape(-1, BLOCK_SIZE)
+    cells.setflags(write=False)
+    word_lengths = np.array(lengths, dtype=int)
+    word_lengths.setflags(write=False)
+    cell_words: typing.List[typing.List[int]] = [[] for _ in range(width*height)]
+    for word_index, (word_cells, length) in enumerate(zip(spans, lengths)):
+        for cell in word_cells[:length]:
+            cell_words[cell].append(word_index)
+    return WordSpans(cells,
+                     word_lengths,
+                     tuple(np.array(words, dtype=int) for words in cell_words))
+
+
+def count_complete_words(state: np.ndarray, spans: WordSpans) -> int:
+    """ Count words that are all on one block. """
+    return int(np.count_nonzero(find_complete_words(state, spans)))
+
+
+def find_complete_words(state: np.ndarray,
+                        spans: WordSpans,
+                        words: np.ndarray | None = None) -> np.ndarray:
+    """ Check which words are all on one block.
+
+    :param state: block numbers for each cell
+    :param spans: the words in the grid
+    :param words: indexes of the words to check, or None for all of them
+    :return: a boolean array for each word checked. Unused spaces are not a
+        block, so words on them aren't complete.
+    """
+    cells = spans.cells if words is None else spans.cells[words]
+    word_blocks = state.ravel()[cells]
+    return ((word_blocks == word_blocks[:, :1]).all(axis=1) &
+            (word_blocks[:, 0] > 1))
+
+
+def update_complete_words(state: np.ndarray,
+                          spans: WordSpans,
+                          is_complete: np.ndarray,
+                          changed_cells: np.ndarray) -> np.ndarray:
+    """ Recheck only the words that cover changed cells.
+
+    :param state: block numbers for each cell, after the changes
+    :param spans: the words in the grid
+    :param is_complete: find_complete_words() from before the changes
+    :param changed_cells: flat indexes of the cells that changed
+    :return: a new array, like find_complete_words() after the changes
+    """
+    is_complete = is_complete.copy()
+    words = spans.find_words(changed_cells)
+    is_complete[words] = find_complete_words(state, spans, words)
+    return is_complete
+
+
+def find_hot_spots(spans: WordSpans, is_complete: np.ndarray) -> np.ndarray:
+    """ List the flat cell indexes in every complete word.
+
+    A cell appears once for each complete word that covers it.
+    """
+    cells = spans.cells[is_complete]
+    lengths = spans.lengths[is_complete]
+    is_used = np.arange(BLOCK_SIZE) < lengths[:, None]
+    return cells[is_used]
+
+
+@cache
+def build_shape_lookup() -> np.ndarray:
+    """ Map a block's bit mask in a 4x4 box to its shape letter's index.
+
+    Bit row*4 + col is set for each square, after moving the block to the
+    top left. Unknown shapes map to -1.
+    """
+    lookup = np.full(1 << (BLOCK_SIZE*BLOCK_SIZE), -1, dtype=np.int8)
+    letters = shape_letters()
+    for shape, offsets in shape_cell_offsets().items():
+        lookup[find_offsets_mask(offsets)] = letters.index(shape[0])
+    lookup.setflags(write=False)
+    return lookup
+
+
+@cache
+def build_rotation_lookup() -> np.ndarray:
+    """ Map a block's bit mask to its index in rotation_names().
+
+    Masks are the same as build_shape_lookup(), and unknown shapes map to -1.
+    """
+    lookup = np.full(1 << (BLOCK_SIZE*BLOCK_SIZE), -1, dtype=np.int8)
+    for i, offsets in enumerate(shape_cell_offsets().values()):
+        lookup[find_offsets_mask(offsets)] = i
+    lookup.setflags(write=False)
+    return lookup
+
+
+def find_offsets_mask(offsets: typing.Iterable[typing.Tuple[int, int]]) -> int:
+    return sum(1 << (row*BLOCK_SIZE + col) for row, col in offsets)
+
+
+@cache
+def shape_letters() -> str:
+    return ''.join(sorted({shape[0] for shape in shape_cell_offsets()}))
+
+
+@cache
+def rotation_names() -> typing.Tuple[str, ...]:
+    """ Shape names with rotations, like BlockPacker uses, except for O. """
+    return tuple(shape_cell_offsets())
+
+
+class BlockCells(typing.NamedTuple):
+    block_nums: np.ndarray  # [block]
+    cells: np.ndarray  # [block, 4] flat cell indexes, in order
+    masks: np.ndarray  # [block] see build_shape_lookup(), 0 if too big
+
+
+def find_blocks(state: np.ndarray) -> BlockCells:
+    """ Find the cells and shape masks of all the four-square blocks.
+
+    Blocks come in order of their block numbers.
+    """
+    width = state.shape[1]
+    flat = state.ravel().astype(np.intp)
+    block_sizes = np.bincount(flat)
+    block_sizes[:2] = 0  # unused spaces and gaps
+    is_whole = block_sizes[flat] == BLOCK_SIZE
+    whole_cells, = np.nonzero(is_whole)
+    whole_cells = whole_cells[np.argsort(flat[whole_cells], kind='stable')]
+    cells = whole_cells.reshape(-1, BLOCK_SIZE)
+    rows, cols = np.divmod(cells, width)
+    rows -= rows.min(axis=1, keepdims=True)
+    cols -= cols.min(axis=1, keepdims=True)
+    is_small = ((rows < BLOCK_SIZE) & (cols < BLOCK_SIZE)).all(axis=1)
+    bits = rows[is_small]*BLOCK_SIZE + cols[is_small]
+    masks = np.zeros(len(cells), dtype=np.intp)
+    masks[is_small] = np.left_shift(1, bits).sum(axis=1)
+    return BlockCells(flat[cells[:, 0]], cells, masks)
+
+
+def count_shapes(state: np.ndarray) -> typing.Counter[str]:
+    """ Count the blocks of each shape, ignoring rotations.
+
+    Matches Puzzle.shape_counts for a grid parsed from the state.
+    """
+    shape_indexes = build_shape_lookup()[find_blocks(state).masks]
+    counts = np.bincount(shape_indexes[shape_indexes >= 0],
+                         minlength=len(shape_letters()))
+    return Counter({letter: int(count)
+                    for letter, count in zip(shape_letters(), counts)
+                    if count})
@@ -0,0 +1,113 @@
+import numpy as np
+
+from four_letter_blocks import bit_board
+from four_letter_blocks.bit_board import (attach_tables, build_cell_index,
+                                          build_placements, build_tables,
+                                          find_index_dtype, pack_bits,
+                                          save_tables, shape_cell_offsets,
+                                          TABLE_CACHE_SIZE, unpack_bits)
+from four_letter_blocks.block_packer import build_masks
+
+
+def test_pack_bits():
+    occupied = np.array([[1, 0, 0],
+                         [0, 1, 1]], dtype=bool)
+
+    words = pack_bits(occupied)
+
+    assert words.tolist() == [0b110001]
+
+
+def test_pack_bits_multiple_words():
+    occupied = np.zeros((9, 9), dtype=bool)
+    occupied[8, 8] = True
+
+    words = pack_bits(occupied)
+
+    assert words.tolist() == [0, 1 << (80 - 64)]
+
+
+def test_unpack_bits():
+    occupied = np.zeros((9, 9), dtype=bool)
+    occupied[0, 1] = True
+    occupied[7, 3] = True
+
+    words = pack_bits(occupied)
+    unpacked = unpack_bits(words, 9, 9)
+
+    np.testing.assert_array_equal(unpacked, occupied)
+
+
+def test_shape_names():
+    assert list(shape_cell_offsets()) == list(build_masks(4, 4))
+
+
+def test_placements():
+    placements = build_placements(width=5, height=3)['L0']
+
+    assert len(placements) == 4
+    assert placements.rows.tolist() == [0, 0, 0, 0]
+    assert placements.cols.tolist() == [0, 1, 2, 3]
+    assert placements.cells[1].tolist() == [1, 6, 11, 12]
+    assert placements.index[0].tolist() == [0, 1, 2, 3, -1]
+    assert placements.index[1].tolist() == [-1, -1, -1, -1, -1]
+
+
+def test_placements_match_masks():
+    width, height = 6, 7
+    all_masks = build_masks(width, height)
+
+    for shape, placements in build_placements(width, height).items():
+        masks = all_masks[shape]
+        for row, col, words in zip(placements.rows,
+                                   placements.cols,
+                                   placements.words):
+            expected_mask = masks[row, col, :height, :width]
+            np.testing.assert_array_equal(unpack_bits(words, width, height),
+                                          expected_mask)
+
+
+def test_too_small_for_shape():
+    placements = build_placements(width=3, height=2)['I0']
+
+    assert len(placements) == 0
+
+
+def test_compact_tables():
+    placements = build_placements(width=5, height=3)['L0']
+    index = build_cell_index(width=5, height=3)
+
+    assert placements.cells.dtype == np.int16
+    assert index.cell_placements.dtype == np.int16
+    assert find_index_dtype(40_000) == np.int32
+
+
+def test_tables_cache_bounded():
+    assert build_tables.cache_info().maxsize == TABLE_CACHE_SIZE
+    assert build_placements.cache_info().maxsize == TABLE_CACHE_SIZE
+
+
+def test_attach_tables(tmp_path, monkeypatch):
+    width, height = 7, 5
+    expected_index = build_cell_index(width, height)
+    expected_placements = build_placements(width, height)
+    monkeypatch.setattr(bit_board, 'attached_tables', {})
+
+    save_tables(width, height, tmp_path)
+    try:
+        attach_tables(tmp_path)
+        index = build_cell_index(width, height)
+        placements = build_placements(width, height)
+    finally:
+        build_tables.cache_clear()
+        build_placements.cache_clear()
+        build_cell_index.cache_clear()
+
+    assert isinstance(index.cells, np.memmap)
+    np.testing.assert_array_equal(index.cells, expected_index.cells)
+    np.testing.assert_array_equal(index.cell_placements,
+                                  expected_index.cell_placements)
+    for shape, shape_placements in placements.items():
+        expected = expected_placements[shape]
+        np.testing.assert_array_equal(shape_placements.words, expected.words)
+        np.testing.assert_array_equal(shape_placements.index, expected.index)
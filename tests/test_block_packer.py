@@ -6,7 +6,8 @@ import numpy as np
 import pytest
 
 from four_letter_blocks.block import Block
-from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.block_packer import BlockPacker, create_rng
+from four_letter_blocks.transposition_table import TranspositionTable
 
 
 def test_display():
@@ -285,6 +286,19 @@ def test_random_fill_no_gaps():
         assert packer.state.max() == 2
 
 
+def test_random_fill_seed():
+    displays = []
+    for seed in (1, 1, 2):
+        packer = BlockPacker(6, 6, tries=1000)
+        packer.rng = create_rng(seed)
+        packer.are_slots_shuffled = True
+        packer.fill(Counter({shape: 3 for shape in Block.shape_names()}))
+        displays.append(packer.display())
+
+    assert displays[0] == displays[1]
+    assert displays[0] != displays[2]
+
+
 def test_positions():
     packer = BlockPacker(start_text=dedent("""\
         AA#CC
@@ -415,6 +429,37 @@ def test_fill_fail():
     assert not is_filled
 
 
+def test_fill_fail_with_transposition_table():
+    shape_counts = Counter({'S': 3, 'Z': 3})
+    packer = BlockPacker(4, 6, tries=10_000)
+    cached_packer = BlockPacker(4, 6, tries=10_000)
+    cached_packer.transposition_table = TranspositionTable()
+
+    is_filled = packer.fill(Counter(shape_counts))
+    is_cached_filled = cached_packer.fill(Counter(shape_counts))
+
+    assert not is_filled
+    assert not is_cached_filled
+    assert cached_packer.transposition_table.hits > 0
+    assert cached_packer.tries > packer.tries > 0
+
+
+def test_fill_with_transposition_table():
+    """ Only dead states get skipped, so the result doesn't change. """
+    shape_counts = Counter({'L': 2, 'O': 2})
+    packer = BlockPacker(4, 4)
+    cached_packer = BlockPacker(4, 4)
+    cached_packer.transposition_table = TranspositionTable()
+
+    is_filled = packer.fill(Counter(shape_counts))
+    is_cached_filled = cached_packer.fill(Counter(shape_counts))
+
+    assert is_filled
+    assert is_cached_filled
+    assert cached_packer.transposition_table.hits > 0
+    assert cached_packer.display() == packer.display()
+
+
 # noinspection DuplicatedCode
 def test_place_block():
     packer = BlockPacker(start_text=dedent("""\
@@ -614,3 +659,202 @@ def test_shape_counts_9x9():
     shape_counts = packer.calculate_max_shape_counts()
 
     assert shape_counts == expected_shape_counts
+
+
+def test_symmetries_pruned():
+    start_text = dedent("""\
+        ....
+        ....
+        ....
+        ....""")
+    packer1 = BlockPacker(start_text=start_text, tries=1000)
+    packer1.force_fours = True
+    packer2 = BlockPacker(start_text=start_text, tries=1000)
+    packer2.force_fours = True
+    packer2.are_symmetries_pruned = True
+
+    is_filled1 = packer1.fill(Counter(O=1, T=3))
+    is_filled2 = packer2.fill(Counter(O=1, T=3))
+
+    assert not is_filled1
+    assert not is_filled2
+    assert packer1.tries == 1000 - 114
+    assert packer2.tries == 1000 - 16
+
+
+def test_symmetries_pruned_still_fills():
+    start_text = dedent("""\
+        ....
+        ....
+        ....
+        ....""")
+    packer = BlockPacker(start_text=start_text, tries=1000)
+    packer.force_fours = True
+    packer.are_symmetries_pruned = True
+
+    is_filled = packer.fill(Counter(T=4))
+
+    assert is_filled
+    assert np.count_nonzero(packer.state == packer.UNUSED) == 0
+
+
+def test_stats():
+    packer = BlockPacker(start_text=dedent("""\
+        ....
+        ....
+        ....
+        ...."""), tries=1000)
+    packer.force_fours = True
+
+    packer.fill(Counter(O=1, T=3))
+    stats = packer.stats
+
+    assert stats.node_count == 1000 - packer.tries == 114
+    assert stats.backtrack_count == 113
+    assert stats.max_depth == 3
+    assert stats.slot_search_count == 114
+    assert 0 < stats.label_time < stats.slot_search_time
+    assert packer.depth == 0
+
+
+def test_iter_solutions():
+    packer = BlockPacker(start_text=dedent("""\
+        ....
+        ....
+        ....
+        ...."""))
+    start_state = packer.state.copy()
+    expected_displays = {dedent("""\
+                             AAAA
+                             BBBB
+                             CCCC
+                             DDDD"""),
+                         dedent("""\
+                             ABCD
+                             ABCD
+                             ABCD
+                             ABCD""")}
+
+    solutions = list(packer.iter_solutions(Counter(I=4)))
+
+    assert {packer.display(state) for state in solutions} == expected_displays
+    assert len(solutions) == 2
+    np.testing.assert_array_equal(packer.state, start_state)
+
+
+def test_iter_solutions_with_spare_spaces():
+    packer = BlockPacker(start_text=dedent("""\
+        ....
+        ...."""))
+    expected_displays = {dedent("""\
+                             AA..
+                             AA.."""),
+                         dedent("""\
+                             .AA.
+                             .AA."""),
+                         dedent("""\
+                             ..AA
+                             ..AA""")}
+
+    displays = [packer.display(state)
+                for state in packer.iter_solutions(Counter(O=1))]
+
+    assert set(displays) == expected_displays
+    assert len(displays) == 3
+
+
+def test_iter_solutions_stops_early():
+    packer = BlockPacker(start_text=dedent("""\
+        ........
+        ........
+        ........
+        ........"""))
+    packer.force_fours = True
+    shape_counts = Counter(O=2, I=2, T=2, L=2)
+
+    solutions = packer.iter_solutions(shape_counts)
+    first_solution = next(solutions)
+    first_nodes = packer.stats.node_count
+    solutions.close()
+
+    assert not (first_solution == BlockPacker.UNUSED).any()
+    assert first_nodes < 100
+    assert shape_counts == Counter(O=2, I=2, T=2, L=2)
+    assert packer.slot_tracker is None
+
+
+def test_fill_with_restarts():
+    packer = BlockPacker(start_text=dedent("""\
+        ......
+        ......
+        ......
+        ......"""), tries=1000)
+    packer.force_fours = True
+    packer.restart_unit = 5
+    packer.rng = create_rng(0)
+
+    is_filled = packer.fill(Counter(T=4, L=2))
+
+    assert is_filled
+    assert packer.is_full
+    assert packer.stats.restart_count > 1
+    assert packer.tries == 1000 - packer.stats.node_count
+    assert packer.restart_unit == 5
+    assert not packer.are_slots_shuffled
+
+
+def test_fill_with_restarts_keeps_best_partial():
+    # No solution, and too many tries to prove that.
+    packer = BlockPacker(start_text=dedent("""\
+        ......
+        ......
+        ......
+        ......"""), tries=100)
+    packer.force_fours = True
+    packer.restart_unit = 10
+    packer.rng = create_rng(0)
+
+    is_filled = packer.fill(Counter(T=6))
+
+    assert is_filled
+    assert not packer.is_full
+    assert packer.tries == 0
+    assert packer.stats.node_count == 100
+    assert packer.stats.restart_count > 1
+
+
+def test_fill_with_restarts_stops_after_full_search():
+    packer = BlockPacker(start_text=dedent("""\
+        ..
+        .."""), tries=1000)
+    packer.restart_unit = 10
+
+    is_filled = packer.fill(Counter(I=1))
+
+    assert not is_filled
+    assert packer.state is None
+    assert packer.stats.restart_count == 1
+
+
+def test_clone_empty():
+    packer = BlockPacker(start_text=dedent("""\
+        AAA.
+        A.#."""), tries=100, split_row=1)
+    packer.force_fours = True
+    packer.transposition_table = TranspositionTable()
+    packer.stats.node_count = 5
+    expected_display = dedent("""\
+        ...
+        ...
+        ...""")
+
+    clone = packer.clone_empty(3, 3)
+
+    assert clone.display() == expected_display
+    assert clone.tries == 100
+    assert clone.split_row == 1
+    assert clone.force_fours
+    assert clone.transposition_table is packer.transposition_table
+    assert clone.branching is packer.branching
+    assert clone.stats.node_count == 0
+    assert packer.width == 4
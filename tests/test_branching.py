@@ -0,0 +1,162 @@
+from collections import Counter
+from textwrap import dedent
+
+import pytest
+
+from four_letter_blocks.block_packer import BlockPacker, create_rng
+from four_letter_blocks.branching import (Branch, BRANCHING_STRATEGIES,
+                                          BranchingStrategy,
+                                          FewestRowsBranching,
+                                          LeastConstrainingBranching,
+                                          MostConstrainedCellBranching)
+
+
+def start_search(start_text: str, shape_counts: Counter):
+    packer = BlockPacker(start_text=start_text)
+    slots = packer.find_slots(shape_counts)
+    return packer, slots
+
+
+def test_default_order():
+    packer, slots = start_search(dedent("""\
+        ....
+        ....
+        #..."""), Counter(O=1, I=2))
+    # I has one slot for each block, and O has five.
+    expected_branches = [Branch('I', 'I1', 0, 0),
+                         Branch('I', 'I1', 1, 0),
+                         Branch('O', 'O', 0, 0),
+                         Branch('O', 'O', 0, 1),
+                         Branch('O', 'O', 0, 2),
+                         Branch('O', 'O', 1, 1),
+                         Branch('O', 'O', 1, 2)]
+
+    branches = list(BranchingStrategy().iter_branches(packer,
+                                                      slots,
+                                                      Counter(O=1, I=2)))
+
+    assert branches == expected_branches
+
+
+def test_most_constrained_cell():
+    shape_counts = Counter(O=1, I=1)
+    packer, slots = start_search(dedent("""\
+        ##..
+        ....
+        ##.."""), shape_counts)
+    packer.extra_gaps = 0
+
+    branches = list(MostConstrainedCellBranching().iter_branches(
+        packer,
+        slots,
+        shape_counts))
+
+    # Top-left space can only be covered by the horizontal I.
+    assert branches == [Branch('I', 'I1', 1, 0)]
+
+
+def test_most_constrained_cell_with_spare_spaces():
+    shape_counts = Counter(O=1, I=1)
+    packer, slots = start_search(dedent("""\
+        ##..
+        ....
+        ##.."""), shape_counts)
+    packer.extra_gaps = 4
+
+    branches = list(MostConstrainedCellBranching().iter_branches(
+        packer,
+        slots,
+        shape_counts))
+
+    assert branches[0] == Branch('I', 'I1', 1, 0)
+    assert len(branches) == 3
+
+
+def test_least_constraining():
+    shape_counts = Counter(I=1)
+    packer, slots = start_search(dedent("""\
+        .....
+        ....#"""), shape_counts)
+
+    branches = list(LeastConstrainingBranching().iter_branches(
+        packer,
+        slots,
+        shape_counts))
+
+    # Bottom row has the least coverage, because it's shorter.
+    assert branches == [Branch('I', 'I1', 1, 0),
+                        Branch('I', 'I1', 0, 1),
+                        Branch('I', 'I1', 0, 0)]
+
+
+def test_fewest_rows():
+    shape_counts = Counter(I=1, O=1)
+    packer, slots = start_search(dedent("""\
+        ....
+        ....
+        ....
+        ...."""), shape_counts)
+
+    branches = list(FewestRowsBranching().iter_branches(packer,
+                                                        slots,
+                                                        shape_counts))
+
+    assert branches[:5] == [Branch('I', 'I1', 0, 0),
+                            Branch('I', 'I1', 1, 0),
+                            Branch('O', 'O', 0, 0),
+                            Branch('O', 'O', 0, 1),
+                            Branch('O', 'O', 0, 2)]
+    assert branches[-1] == Branch('O', 'O', 2, 2)
+
+
+def test_random_ties():
+    shape_counts = Counter(I=1)
+    packer, slots = start_search(dedent("""\
+        ....
+        ....
+        ....
+        ...."""), shape_counts)
+    packer.are_slots_shuffled = True
+    packer.rng = create_rng(0)
+    strategy = FewestRowsBranching()
+
+    first_branches = [list(strategy.iter_branches(packer, slots, shape_counts))
+                      for _ in range(10)]
+
+    assert {branches[0] for branches in first_branches} == {
+        Branch('I', 'I1', 0, 0)}
+    assert len({tuple(branches) for branches in first_branches}) > 1
+
+
+@pytest.mark.parametrize('name', list(BRANCHING_STRATEGIES))
+def test_fill(name):
+    packer = BlockPacker(start_text=dedent("""\
+        ......
+        ......
+        ......
+        ......"""), tries=1000)
+    packer.force_fours = True
+    packer.branching = BRANCHING_STRATEGIES[name]()
+
+    is_filled = packer.fill(Counter(T=4, L=2))
+
+    assert is_filled
+    assert packer.is_full
+
+
+def test_most_constrained_cell_searches_less():
+    start_text = dedent("""\
+        ......
+        ......
+        ......
+        ......""")
+    node_counts = []
+    for strategy in (BranchingStrategy(), MostConstrainedCellBranching()):
+        packer = BlockPacker(start_text=start_text, tries=1000)
+        packer.force_fours = True
+        packer.branching = strategy
+        packer.fill(Counter(T=4, L=2))
+        node_counts.append(packer.stats.node_count)
+
+    default_nodes, constrained_nodes = node_counts
+    assert constrained_nodes < default_nodes
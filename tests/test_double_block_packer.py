@@ -3,7 +3,11 @@ from textwrap import dedent
 import numpy as np
 import pytest
 
-from four_letter_blocks.double_block_packer import DoubleBlockPacker
+from four_letter_blocks.block_packer import build_masks
+from four_letter_blocks.double_block_packer import (DoubleBlockPacker,
+                                                   build_cell_placements,
+                                                   iter_slot_pairs)
+from four_letter_blocks.transposition_table import TranspositionTable
 
 
 def test_different_space_count():
@@ -119,6 +123,124 @@ def test_fill_rectangle():
     assert packer.display() == expected_display
 
 
+def test_transposition_table():
+    front_text = dedent("""\
+        ##..
+        ....
+        ..##""")
+    back_text = dedent("""\
+        ....
+        #..#
+        #..#""")
+    table = TranspositionTable()
+    packer1 = DoubleBlockPacker(front_text, back_text, tries=100)
+    packer1.are_forced_moves_propagated = False
+    packer1.transposition_table = table
+    packer2 = DoubleBlockPacker(front_text, back_text, tries=100)
+    packer2.are_forced_moves_propagated = False
+    packer2.transposition_table = table
+
+    is_filled1 = packer1.fill()
+    dead_count = len(table)
+    is_filled2 = packer2.fill()
+
+    assert not is_filled1
+    assert dead_count == 3
+    assert not is_filled2
+    assert table.hits == 1
+    assert packer2.tries == 100
+
+
+def test_forced_moves_find_contradiction():
+    front_text = dedent("""\
+        ##..
+        ....
+        ..##""")
+    back_text = dedent("""\
+        ....
+        #..#
+        #..#""")
+    packer = DoubleBlockPacker(front_text, back_text, tries=100)
+
+    is_filled = packer.fill()
+
+    assert not is_filled
+    assert packer.tries == 99
+    assert packer.display() == dedent("""\
+        ##..
+        ....
+        ..##
+
+        ....
+        #..#
+        #..#""")
+
+
+def test_forced_moves_placed_without_branching():
+    front_text = dedent("""\
+        .#..
+        .#.#
+        .#..
+        ....""")
+    back_text = dedent("""\
+        ..#.
+        #.#.
+        ..#.
+        ....""")
+    expected_display = dedent("""\
+        A#BB
+        A#B#
+        A#BC
+        ACCC
+
+        BB#A
+        #B#A
+        CB#A
+        CCCA""")
+    packer1 = DoubleBlockPacker(front_text, back_text, tries=100)
+    packer2 = DoubleBlockPacker(front_text, back_text, tries=100)
+    packer2.are_forced_moves_propagated = False
+
+    is_filled1 = packer1.fill()
+    is_filled2 = packer2.fill()
+
+    assert is_filled1
+    assert is_filled2
+    assert packer1.tries == 99
+    assert packer2.tries == 96
+    assert packer1.stats.node_count == 1
+    assert packer1.stats.forced_move_count == 3
+    assert packer2.stats.node_count == 4
+    assert packer2.stats.max_depth == 3
+    packer1.sort_blocks()
+    assert packer1.display() == expected_display
+
+
+def test_symmetries_pruned():
+    front_text = dedent("""\
+        ..#.#.
+        ......
+        ......
+        .#.#..""")
+    back_text = dedent("""\
+        .#.#..
+        ......
+        ......
+        ..#.#.""")
+    packer1 = DoubleBlockPacker(front_text, back_text, tries=100)
+    packer2 = DoubleBlockPacker(front_text, back_text, tries=100)
+    packer2.are_symmetries_pruned = True
+
+    is_filled1 = packer1.fill()
+    is_filled2 = packer2.fill()
+
+    assert not is_filled1
+    assert not is_filled2
+    assert packer1.tries == 100 - 13
+    assert packer2.tries == 100 - 7
+    assert packer2.stats.pruned_count > 0
+
+
 def test_slots_shuffled():
     front_text = dedent("""\
         #?????#
@@ -285,3 +407,52 @@ def test_sort_blocks():
     packer.sort_blocks()
 
     assert packer.display() == expected_display
+
+
+def test_cell_placements_like_masks():
+    width, height = 5, 4
+    all_masks = build_masks(width, height)
+
+    all_placements = build_cell_placements(width, height)
+
+    for shape, masks in all_masks.items():
+        # Only placements that fit inside the grid.
+        fits = ~masks[:, :, height:, :].any(axis=(2, 3))
+        fits &= ~masks[:, :, :, width:].any(axis=(2, 3))
+        for row in range(height):
+            for col in range(width):
+                expected_coords = np.argwhere(masks[:, :, row, col] & fits)
+                placements = all_placements[shape][row*width + col]
+                coords = np.stack(np.divmod(placements, width), axis=1)
+                assert coords.tolist() == expected_coords.tolist()
+
+
+def test_slot_pairs():
+    width, height = 4, 3
+    coords1 = np.array([[0, 1], [2, 0]])
+    masks2 = build_masks(width, height)['I1']  # horizontal, 4 wide
+    shape2_slots = np.zeros((height, width), dtype=bool)
+    shape2_slots[1:, 0] = True
+    sorted_cells2 = np.array([2*width + 3, width + 1, 0])
+    placements2 = build_cell_placements(width, height)['I1']
+    expected_pairs = []
+    tried_slots2 = set()
+    for cell2 in sorted_cells2:
+        row2, col2 = divmod(cell2, width)
+        covering_slots2 = masks2[:, :, row2, col2] & shape2_slots
+        for slot2 in map(tuple, np.argwhere(covering_slots2).tolist()):
+            if slot2 not in tried_slots2:
+                tried_slots2.add(slot2)
+                expected_pairs.extend((tuple(slot1), slot2)
+                                      for slot1 in coords1.tolist())
+
+    pairs = list(iter_slot_pairs(coords1,
+                                 shape2_slots,
+                                 placements2,
+                                 sorted_cells2))
+
+    assert pairs == expected_pairs
+    assert pairs == [((0, 1), (2, 0)),
+                     ((2, 0), (2, 0)),
+                     ((0, 1), (1, 0)),
+                     ((2, 0), (1, 0))]
@@ -0,0 +1,145 @@
+from random import Random
+
+from four_letter_blocks.evo import Evolution, Individual
+from four_letter_blocks.evo_controller import EvolutionController
+from four_letter_blocks.evo_packer import EvoPacker
+
+
+class Number(Individual):
+    """ Evolve towards a target number. """
+    def pair(self, other, pair_params, rng: Random | None = None):
+        return Number(dict(number=self.value['number']))
+
+    def mutate(self, mutate_params, rng: Random | None = None):
+        assert rng is not None
+        self.value = dict(number=self.value['number'] + rng.randrange(-1, 2))
+
+    def _random_init(self, init_params, rng: Random | None = None):
+        assert rng is not None
+        return dict(number=rng.randrange(init_params['max_number']))
+
+
+def build_evolution(pool_size=10, max_number=1000, pool_count=1):
+    return Evolution(pool_size=pool_size,
+                     fitness=lambda individual: individual.value['number'],
+                     individual_class=Number,
+                     n_offsprings=pool_size // 5,
+                     pair_params=None,
+                     mutate_params=None,
+                     init_params=dict(max_number=max_number),
+                     pool_count=pool_count)
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+def test_time_budget():
+    clock = FakeClock()
+    controller = EvolutionController(time_budget=10)
+    controller.clock = clock
+    controller.start()
+
+    clock.time = 9
+    is_finished1 = controller.is_finished
+    clock.time = 10
+    is_finished2 = controller.is_finished
+
+    assert not is_finished1
+    assert is_finished2
+
+
+def test_no_budget():
+    controller = EvolutionController()
+
+    assert not controller.is_finished
+
+
+def test_estimated_time():
+    clock = FakeClock()
+    controller = EvolutionController()
+    controller.clock = clock
+    controller.start()
+    evolution = build_evolution()
+
+    controller.update(evolution, distance=10)
+    estimate1 = controller.estimated_time
+    clock.time = 4
+    controller.update(evolution, distance=8)
+    estimate2 = controller.estimated_time
+    clock.time = 5
+    controller.update(evolution, distance=0)
+    estimate3 = controller.estimated_time
+
+    assert estimate1 is None  # No progress yet.
+    assert estimate2 == 16  # 2 every 4 seconds, with 8 left.
+    assert estimate3 == 0
+
+
+def test_restart_when_stale():
+    evolution = build_evolution(max_number=1)
+    controller = EvolutionController(patience=3)
+    start_pool = evolution.pool
+    start_pool.replace_count = 20
+    start_pool.unimproved_count = 20
+
+    for _ in range(4):  # First update sets the best, then 3 unimproved.
+        controller.update(evolution, distance=1)
+
+    assert evolution.pool is not start_pool
+    assert controller.restart_count == 1
+
+
+def test_no_restart_while_improving():
+    evolution = build_evolution(max_number=1)
+    controller = EvolutionController(patience=3)
+    start_pool = evolution.pool
+    start_pool.replace_count = 20
+    start_pool.unimproved_count = 20
+
+    for _ in range(4):
+        start_pool.individuals[-1].value['number'] += 1
+        controller.update(evolution, distance=1)
+
+    assert evolution.pool is start_pool
+
+
+def test_grow_pools():
+    evolution = build_evolution(pool_size=100, max_number=2)
+    controller = EvolutionController(min_pool_size=50, max_pool_size=110)
+
+    controller.update(evolution,
+                      distance=1,
+                      diversity=evolution.pool.measure_diversity(
+                          lambda individual: individual.value['number']))
+
+    assert evolution.pool_size == 110
+    assert evolution.n_offsprings == 22
+    assert len(evolution.pool.individuals) == 110
+
+
+def test_shrink_pools():
+    evolution = build_evolution(pool_size=100, max_number=1_000_000)
+    controller = EvolutionController(min_pool_size=50, max_pool_size=200)
+
+    controller.update(evolution,
+                      distance=1,
+                      diversity=evolution.pool.measure_diversity(
+                          lambda individual: individual.value['number']))
+
+    assert evolution.pool_size == 80
+    assert len(evolution.pool.individuals) == 80
+
+
+def test_packer_out_of_time():
+    packer = EvoPacker(4, 4, tries=10)
+    packer.pool_size = 10
+    packer.controller = EvolutionController(time_budget=0)
+
+    packer.fill()
+
+    assert packer.current_epoch == 0
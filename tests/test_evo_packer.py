@@ -1,12 +1,95 @@
+import pickle
+import random
+import typing
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import count
 from textwrap import dedent
-from unittest.mock import patch
+from unittest.mock import Mock
 
 import numpy as np
 
-from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.block_packer import BlockPacker, create_rng
+from four_letter_blocks.double_block_packer import DoubleBlockPacker
 from four_letter_blocks.evo_packer import EvoPacker, Packing,\
-    PackingFitnessCalculator, FitnessScore, distance_ranking, ranked_offsets
+    PackingFitnessCalculator, FitnessScore, distance_ranking, ranked_offsets, \
+    find_canonical_state, cross_states
+from four_letter_blocks.packer_stats import PackerStats
+from four_letter_blocks.word_spans import build_word_spans, find_complete_words
+
+
+class BlockMover:
+    """ Move blocks one position at a time, the old way to cross states. """
+    def __init__(self,
+                 source: np.ndarray,
+                 target: np.ndarray,
+                 can_rotate: bool,
+                 shape_counts: typing.Counter[str | None] | None = None):
+        self.source = source
+        self.target = target
+        self.can_rotate = can_rotate
+        self.packer = BlockPacker(start_state=self.source)
+        self.blocks = {
+            block_number: block
+            for block_number, block in self.packer.create_blocks_with_block_num()}
+        if shape_counts is not None:
+            self.shape_counts = shape_counts
+        else:
+            self.shape_counts = Counter()
+            for block in self.blocks.values():
+                shape = block.shape
+                if shape != 'O' and shape is not None and not can_rotate:
+                    shape += str(block.shape_rotation)
+                self.shape_counts[shape] += 1
+
+    def move(self, row: int, col: int):
+        grid_size = self.source.shape[0]
+        if not 0 <= row < grid_size:
+            return
+        if not 0 <= col < grid_size:
+            return
+        # noinspection PyTypeChecker
+        block_num: int = self.source[row, col]
+        if block_num == 1:
+            self.target[row, col] = 1
+            return
+        try:
+            block = self.blocks.pop(block_num)
+        except KeyError:
+            return
+        shape = block.shape
+        assert shape is not None
+        if shape != 'O' and not self.can_rotate:
+            shape += str(block.shape_rotation)
+        if self.shape_counts[shape] == 0:
+            return
+        for square in block.squares:
+            if self.target[square.y, square.x] != 0:
+                return
+        # noinspection PyUnresolvedReferences
+        if (self.target == block_num).any():
+            used_nums = set(np.unique(self.target))
+            for block_num in count(2):
+                if block_num not in used_nums:
+                    break
+        for square in block.squares:
+            self.target[square.y, square.x] = block_num
+        self.shape_counts[shape] -= 1
+
+
+def cross_with_block_movers(state1, state2, can_rotate, shape_counts,
+                            position1, position2):
+    grid_size = state1.shape[0]
+    new_state = np.zeros((grid_size, grid_size), dtype=np.uint8)
+    mover1 = BlockMover(state1, new_state, can_rotate)
+    mover1.shape_counts += shape_counts
+    mover2 = BlockMover(state2, new_state, can_rotate, mover1.shape_counts)
+    positions1 = ranked_offsets(grid_size) + position1
+    positions2 = ranked_offsets(grid_size) + position2
+    for (i1, j1), (i2, j2) in zip(positions1, positions2):
+        mover1.move(i1, j1)
+        mover2.move(i2, j2)
+    return new_state, mover1.shape_counts
 
 
 def test_no_rotations():
@@ -36,6 +119,79 @@ def test_no_rotations():
     assert packer.display() == expected_display
 
 
+def test_no_rotations_in_executors():
+    shape_counts = Counter({'S0': 1, 'S1': 1, 'L0': 1, 'L1': 1, 'I0': 1})
+    start_text = dedent("""\
+        .##..
+        .....
+        ..#..
+        .....
+        ..##.""")
+    for executor_class in (ThreadPoolExecutor, ProcessPoolExecutor):
+        with executor_class(2) as executor:
+            packer = EvoPacker(start_text=start_text, tries=100, min_tries=1)
+            packer.epochs = 2
+            packer.pool_size = 100
+            packer.executor = executor
+
+            is_filled = packer.fill(shape_counts)
+
+        assert is_filled, executor_class
+        assert packer.is_full
+
+
+def test_seed():
+    start_text = dedent("""\
+        .##...
+        ......
+        ..#...
+        ......
+        ......
+        ..##..""")
+    states = []
+    for seed in (1, 1, 2):
+        with ThreadPoolExecutor(2) as executor:
+            packer = EvoPacker(start_text=start_text, tries=100, min_tries=1)
+            packer.rng = create_rng(seed)
+            packer.epochs = 3
+            packer.pool_size = 20
+            packer.executor = executor
+            packer.setup(Counter({shape: 2 for shape in 'IJLOSTZ'}))
+            for _ in range(packer.epochs):
+                packer.run_epoch()
+            evo = packer.evo
+            assert evo is not None
+        states.append([packing.value['state'].tolist()
+                       for pool in evo.pools
+                       for packing in pool.individuals])
+
+    assert states[0] == states[1]
+    assert states[0] != states[2]
+
+
+def test_payload():
+    shape_counts = Counter({'O': 2})
+    init_params = dict(start_state=np.zeros((4, 4), dtype=np.uint8),
+                       shape_counts=Counter({'O': 4}),
+                       tries=100)
+    packing = Packing(init_params=init_params)
+    calculator = PackingFitnessCalculator()
+    packing.value['shape_counts'] = shape_counts
+    fitness = calculator.calculate(packing)
+
+    payload = packing.get_payload()
+    packing2 = Packing.from_payload(payload, init_params)
+
+    assert len(payload) == 3
+    assert packing2.value['state'] is packing.value['state']
+    assert packing2.value['shape_counts'] == shape_counts
+    assert packing2.value['can_rotate']
+    assert not packing2.value['force_fours']
+    assert packing2.value['packer_class'] is BlockPacker
+    assert packing2.value['tries'] == 100
+    assert calculator.calculate(packing2) == fitness
+
+
 def test_mutate():
     unused_counts = []
     for _ in range(100):
@@ -69,6 +225,29 @@ def test_mutate():
     assert max(unused_counts) == 3
 
 
+def test_mutate_double():
+    """ Words don't run from the bottom of the front into the back. """
+    packer = DoubleBlockPacker(dedent("""\
+        AABB
+        AABB"""), dedent("""\
+        CCDD
+        CCDD"""))
+    start_state = packer.state
+    packing = Packing(dict(state=start_state,
+                           shape_counts=Counter(),
+                           can_rotate=True,
+                           force_fours=False,
+                           packer_class=DoubleBlockPacker,
+                           tries=100))
+    split_spans = build_word_spans(start_state != BlockPacker.GAP, 2)
+
+    packing.mutate(None, create_rng(0))
+
+    assert len(split_spans) == 12
+    assert len(packing.value['complete_words']) == len(split_spans)
+    assert not packing.value['state'].flags.writeable
+
+
 def test_mutate_around_warnings():
     start_text = dedent("""\
         AAB#CDDDD
@@ -108,11 +287,112 @@ def test_mutate_around_warnings():
     assert warning_change_rate > average_change_rate * 1.5
 
 
-@patch('four_letter_blocks.evo_packer.randrange')
-@patch('four_letter_blocks.evo_packer.choices')
-def test_pair(mock_choices, mock_randrange):
-    mock_choices.side_effect = [['mix']]
-    mock_randrange.side_effect = [0, 0, 4, 4]
+def test_mutate_tracks_complete_words():
+    start_text = dedent("""\
+        AAB#CDDDD
+        ABB#CEEEE
+        ABF#CGGHH
+        FFFICGGHH
+        ###I#J###
+        KKIIJJLLL
+        KKMMJ#NOL
+        PMMQQ#NOO
+        PPPQQ#NNO""")
+    packer = EvoPacker(start_text=start_text, tries=50, min_tries=1)
+    packing = Packing(dict(state=packer.state,
+                           shape_counts=packer.calculate_max_shape_counts(),
+                           can_rotate=True,
+                           force_fours=False,
+                           packer_class=BlockPacker,
+                           tries=100))
+    spans = build_word_spans(packer.state != BlockPacker.GAP)
+
+    for _ in range(20):
+        packing.mutate(None)
+        state = packing.value['state']
+
+        expected_words = find_complete_words(state, spans)
+        assert packing.value['complete_words'].tolist() == \
+               expected_words.tolist()
+
+
+def test_shared_read_only_state():
+    start_text = dedent("""\
+        AAB#C
+        ABB#C
+        ABD#C
+        DDD#C""")
+    packer = EvoPacker(start_text=start_text)
+    parent = Packing(dict(state=packer.state,
+                          shape_counts=Counter(),
+                          can_rotate=True,
+                          force_fours=False,
+                          packer_class=BlockPacker,
+                          tries=100))
+    start_display = packer.display()
+
+    child = parent.pair(parent, None)
+    child.mutate(None)
+
+    assert not parent.value['state'].flags.writeable
+    assert not child.value['state'].flags.writeable
+    assert not hasattr(child, '__dict__')
+    assert BlockPacker(start_state=parent.value['state']).display() == \
+           start_display
+
+
+def test_cross_states_like_block_movers():
+    random.seed(0)
+    start_text = dedent("""\
+        ..#....
+        .......
+        ...#...
+        .......
+        ....#..
+        .......
+        .......""")
+    for can_rotate in (True, False):
+        for _ in range(20):
+            states = []
+            counts: typing.List[typing.Counter[str]] = []
+            for _ in range(2):
+                packer = BlockPacker(start_text=start_text, tries=100)
+                packer.are_slots_shuffled = True
+                packer.are_partials_saved = True
+                shape_counts = Counter({shape: 4 for shape in 'IJLOSTZ'})
+                if not can_rotate:
+                    shape_counts = Counter({shape: 2
+                                            for shape in ('I0', 'I1', 'J0',
+                                                          'L2', 'O', 'S1',
+                                                          'T3', 'Z0')})
+                packer.fill(shape_counts)
+                states.append(packer.state)
+                counts.append(shape_counts)
+            position1 = (random.randrange(7), random.randrange(7))
+            position2 = (random.randrange(7), random.randrange(7))
+
+            new_state, new_counts = cross_states(states[0],
+                                                 states[1],
+                                                 can_rotate,
+                                                 counts[0],
+                                                 position1,
+                                                 position2)
+            expected_state, expected_counts = cross_with_block_movers(
+                states[0],
+                states[1],
+                can_rotate,
+                counts[0],
+                position1,
+                position2)
+
+            assert new_state.tolist() == expected_state.tolist()
+            assert +new_counts == +expected_counts
+
+
+def test_pair():
+    rng = Mock(wraps=random.Random(0))
+    rng.choices.side_effect = [['mix']]
+    rng.randrange.side_effect = [0, 0, 4, 4]
 
     shape_counts1 = Counter({'I0': 4})
     start_text1 = dedent("""\
@@ -150,17 +430,16 @@ def test_pair(mock_choices, mock_randrange):
         DD##A""")
     expected_shape_counts = {'I0': 2, 'O': 2}
 
-    child = packing1.pair(packing2, {})
+    child = packing1.pair(packing2, {}, rng)
 
     assert packer2.display(child.value['state']) == expected_display
     assert child.value['shape_counts'] == expected_shape_counts
 
 
-@patch('four_letter_blocks.evo_packer.randrange')
-@patch('four_letter_blocks.evo_packer.choices')
-def test_pair_with_fill(mock_choices, mock_randrange):
-    mock_choices.side_effect = [['mix']]
-    mock_randrange.side_effect = [0, 0, 4, 4]
+def test_pair_with_fill():
+    rng = Mock(wraps=random.Random(0))
+    rng.choices.side_effect = [['mix']]
+    rng.randrange.side_effect = [0, 0, 4, 4]
 
     shape_counts1 = Counter({'L1': 1})
     start_text1 = dedent("""\
@@ -198,7 +477,7 @@ def test_pair_with_fill(mock_choices, mock_randrange):
         BB##.""")
     expected_shape_counts = Counter({'J1': 1})
 
-    child = packing1.pair(packing2, {})
+    child = packing1.pair(packing2, {}, rng)
 
     assert packer2.display(child.value['state']) == expected_display
     assert child.value['shape_counts'] == expected_shape_counts
@@ -238,6 +517,163 @@ def test_fitness_parity():
                                    warning_count=-3)
 
 
+def test_canonical_state():
+    packer = EvoPacker(start_text=dedent("""\
+        E##DA
+        EDDDA
+        EE#AA
+        BBCC.
+        BB##."""))
+    state = packer.state.copy()
+    packer.sort_blocks()
+
+    canonical_state = find_canonical_state(state)
+
+    assert canonical_state.tolist() == packer.state.tolist()
+
+
+def test_fitness_cache():
+    start_text = dedent("""\
+        E##DA
+        EDDDA
+        EE#AA
+        BBCCC
+        BB##C""")
+    relabelled_text = start_text.replace('A', 'X').replace('E', 'A')
+    calculator = PackingFitnessCalculator()
+    packing1 = Packing(dict(state=EvoPacker(start_text=start_text).state))
+    packing2 = Packing(dict(state=EvoPacker(start_text=start_text).state))
+    packing3 = Packing(dict(state=EvoPacker(start_text=relabelled_text).state))
+
+    fitness1 = calculator.calculate(packing1)
+    fitness2 = calculator.calculate(packing2)
+    fitness3 = calculator.calculate(packing3)
+
+    assert fitness1 == FitnessScore(empty_spaces=0,
+                                    empty_area=0,
+                                    warning_count=-3)
+    assert fitness2 == fitness1
+    assert fitness3 == fitness1
+    assert calculator.cache_misses == 1
+    assert calculator.cache_hits == 2
+
+
+def test_scorer_records_in_calculator():
+    start_text = dedent("""\
+        E##DA
+        EDDDA
+        EE#AA
+        BBCCC
+        BB##C""")
+    init_params = dict(shape_counts=Counter({'O': 3}), tries=100)
+    calculator = PackingFitnessCalculator()
+    calculator.count_diffs['SZ'] = 0
+    calculator.summaries.append('before')
+    scorer = calculator.create_scorer()
+    packing = Packing(dict(state=EvoPacker(start_text=start_text).state,
+                           shape_counts=Counter({'O': 3})))
+
+    fitness = scorer.calculate(packing)
+    packing2 = Packing.from_payload(packing.get_payload(), init_params)
+    fitness2 = calculator.calculate(packing2)
+    packing3 = Packing(dict(state=EvoPacker(start_text=start_text).state))
+    fitness3 = calculator.calculate(packing3)
+
+    assert scorer.count_diffs == calculator.count_diffs
+    assert len(scorer.cache) == 0
+    assert scorer.summaries == []
+    assert len(pickle.dumps(scorer)) < 1000
+    assert fitness2 == fitness
+    assert fitness3 == fitness
+    assert calculator.cache_misses == 1
+    assert calculator.cache_hits == 1
+    assert calculator.summaries == ['before', str(fitness), str(fitness)]
+
+
+def test_fitness_cache_targets():
+    state = EvoPacker(start_text=dedent("""\
+        A##EE
+        ADDDE
+        AD#CE
+        ABBCC
+        BB##C""")).state
+    calculator = PackingFitnessCalculator()
+
+    fitness1 = calculator.calculate_cached(state)
+    calculator.count_min['SZ'] = 4
+    fitness2 = calculator.calculate_cached(state)
+
+    assert fitness1.missed_targets == 0
+    assert fitness2.missed_targets == -2
+    assert calculator.cache_misses == 2
+
+
+def test_fitness_cache_threads():
+    states = [EvoPacker(start_text=text).state
+              for text in ('AABB\nAABB', 'AAAB\nABBB', 'ABBB\nAAAB')]
+    calculator = PackingFitnessCalculator(cache_size=2)
+
+    with ThreadPoolExecutor(4) as executor:
+        scores = list(executor.map(calculator.calculate_cached, states * 200))
+    copy = pickle.loads(pickle.dumps(calculator))
+
+    assert scores == [calculator.calculate_from_state(state)
+                      for state in states] * 200
+    assert calculator.cache_hits + calculator.cache_misses == 600
+    assert len(copy.cache) == len(calculator.cache) == 2
+    assert copy.cache_lock is not calculator.cache_lock
+
+
+def test_fitness_cache_stats():
+    state = EvoPacker(start_text=dedent("""\
+        E##DA
+        EDDDA
+        EE#AA
+        BBCCC
+        BB##C""")).state
+    calculator = PackingFitnessCalculator()
+    calculator.stats = PackerStats()
+
+    calculator.calculate_cached(state)
+    calculator.calculate_cached(state)
+
+    assert calculator.stats.fitness_cache_misses == 1
+    assert calculator.stats.fitness_cache_hits == 1
+
+
+def test_epoch_stats():
+    packer = EvoPacker(start_text=dedent("""\
+        .##...
+        ......
+        ..#...
+        ......
+        ......
+        ..##.."""), tries=100, min_tries=1)
+    packer.rng = create_rng(1)
+    packer.pool_size = 20
+    packer.setup(Counter({shape: 2 for shape in 'IJLOSTZ'}))
+
+    for _ in range(2):
+        packer.run_epoch()
+
+    assert packer.stats.epoch_count == packer.current_epoch == 2
+
+
+def test_fitness_cache_size():
+    calculator = PackingFitnessCalculator(cache_size=1)
+    state1 = EvoPacker(start_text='AABB\nAABB').state
+    state2 = EvoPacker(start_text='AAAB\nABBB').state
+    partial_state = EvoPacker(start_text='AA..\nAA..').state
+
+    calculator.calculate_cached(state1)
+    calculator.calculate_cached(state2)
+    calculator.calculate_cached(state1)
+    calculator.calculate_cached(partial_state)
+
+    assert calculator.cache_misses == 3
+    assert len(calculator.cache) == 1
+
+
 # noinspection DuplicatedCode
 def test_fitness_count_diff():
     start_state = EvoPacker(start_text=dedent("""\
@@ -0,0 +1,259 @@
+from collections import Counter
+from textwrap import dedent
+
+import numpy as np
+
+from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.exact_cover_packer import DancingLinks, ExactCoverPacker
+
+
+def test_dancing_links_cover():
+    links = DancingLinks(3, [[0, 1], [1, 2], [2]])
+    header1 = 2
+
+    links.cover(header1)
+
+    assert list(links.iter_items()) == [1, 3]
+    assert links.size[1:] == [0, 2, 1]
+    assert links.remaining_count == 2
+
+
+def test_dancing_links_uncover():
+    links = DancingLinks(3, [[0, 1], [1, 2], [2]])
+    header1 = 2
+    links.cover(header1)
+
+    links.uncover(header1)
+
+    assert list(links.iter_items()) == [1, 2, 3]
+    assert links.size[1:] == [1, 2, 2]
+    assert links.remaining_count == 3
+
+
+def test_dancing_links_options():
+    links = DancingLinks(3, [[0, 1], [1, 2], [2]])
+
+    options = [links.option[node] for node in links.iter_options(3)]
+
+    assert options == [1, 2]
+
+
+def test_fill_three_blocks():
+    width = height = 5
+    shape_counts = Counter('OLO')
+    expected_display = dedent("""\
+        AABB.
+        AABBC
+        ..CCC
+        .....
+        .....""")
+    packer = ExactCoverPacker(width, height)
+    is_filled = packer.fill(shape_counts)
+
+    assert is_filled
+    assert packer.display() == expected_display
+
+
+def test_fill_exact():
+    packer = ExactCoverPacker(start_text=dedent("""\
+        ......#
+        .#.#...
+        .......
+        .#.#.#.
+        .......
+        ...#.#.
+        #......"""))
+    shape_counts = Counter({'T': 4, 'I': 4, 'O': 1, 'J': 1})
+
+    is_filled = packer.fill(shape_counts)
+
+    assert is_filled
+    assert packer.is_full
+    assert len(packer.positions['T']) == 4
+
+
+def test_fill_max_counts():
+    """ More shapes than spaces, so fill all the spaces. """
+    packer = ExactCoverPacker(start_text=dedent("""\
+        ..
+        .."""))
+
+    is_filled = packer.fill(Counter({'O': 2}))
+
+    assert is_filled
+    assert packer.is_full
+
+
+def test_fill_no_rotations():
+    width = height = 5
+    shape_counts = Counter(('O', 'I0', 'O'))
+    packer = ExactCoverPacker(width, height)
+
+    is_filled = packer.fill(shape_counts)
+
+    assert is_filled
+    assert packer.rotated_positions.keys() == {'O', 'I0'}
+
+
+def test_fill_with_split_row():
+    width, height = 3, 7
+    shape_counts = Counter('OOT')
+    expected_display = dedent("""\
+        AA.
+        AA.
+        ...
+        BB.
+        BBC
+        .CC
+        ..C""")
+    packer = ExactCoverPacker(width, height, split_row=3)
+
+    packer.fill(shape_counts)
+
+    assert packer.display() == expected_display
+
+
+def test_fill_fail():
+    packer = ExactCoverPacker(2, 3, tries=500)
+
+    is_filled = packer.fill(Counter({'O': 2}))
+
+    assert not is_filled
+    assert packer.state is None
+
+
+def test_fill_out_of_tries():
+    packer = ExactCoverPacker(4, 4, tries=2)
+
+    is_filled = packer.fill(Counter({'O': 4}))
+
+    assert not is_filled
+    assert packer.tries == 0
+
+
+def test_fill_keeps_block_numbers():
+    packer = ExactCoverPacker(start_text=dedent("""\
+        BB..
+        BB.."""))
+    expected_display = dedent("""\
+        BBAA
+        BBAA""")
+
+    packer.fill(Counter({'O': 2}))
+
+    assert packer.display() == expected_display
+
+
+def test_force_fours():
+    packer = ExactCoverPacker(start_text=dedent("""\
+        ......
+        ......
+        ......
+        ......"""))
+    packer.force_fours = True
+
+    is_filled = packer.fill(Counter({'L': 4, 'O': 2}))
+
+    assert is_filled
+    assert packer.is_full
+
+
+def test_force_fours_with_gaps():
+    start_text = dedent("""\
+        ......
+        ......
+        ......
+        ......""")
+    packer = ExactCoverPacker(start_text=start_text)
+    unchecked_packer = ExactCoverPacker(start_text=start_text)
+    packer.force_fours = True
+
+    is_filled = packer.fill(Counter({'T': 3, 'L': 2}))
+    unchecked_packer.fill(Counter({'T': 3, 'L': 2}))
+
+    assert is_filled
+    assert packer.stats.node_count < unchecked_packer.stats.node_count
+
+
+def test_stats():
+    packer = ExactCoverPacker(4, 4)
+
+    packer.fill(Counter({'O': 4}))
+
+    assert packer.stats.node_count == 4
+    assert packer.stats.max_depth == 4
+    assert packer.stats.backtrack_count == 0
+
+
+def test_fewest_rows():
+    shape_counts = Counter({'I': 2, 'O': 1})
+    block_packer = BlockPacker(6, 4)
+    block_packer.fill(Counter(shape_counts))
+    packer = ExactCoverPacker(6, 4)
+
+    is_filled = packer.fill(shape_counts)
+
+    assert is_filled
+    assert packer.count_filled_rows() == 2
+    assert block_packer.count_filled_rows() == 2
+
+
+def test_min_tries_keeps_first_cover():
+    packer = ExactCoverPacker(6, 4, tries=1000, min_tries=0)
+
+    is_filled = packer.fill(Counter({'I': 2, 'O': 1}))
+
+    assert is_filled
+    assert packer.count_filled_rows() == 4
+    assert packer.stats.node_count == 3
+
+
+def test_deep_search():
+    """ Choose more gaps than Python's recursion limit. """
+    packer = ExactCoverPacker(start_text='.#\n' * 1500 + '..\n..')
+    expected_tail = dedent("""\
+        .#
+        AA
+        AA""")
+
+    is_filled = packer.fill(Counter({'O': 1}))
+
+    assert is_filled
+    assert packer.display().endswith(expected_tail)
+
+
+def test_finds_solution_greedy_misses():
+    start_text = dedent("""\
+        ......#
+        .#.#...
+        .......
+        .#.#.#.
+        .......
+        ...#.#.
+        #......""")
+    shape_counts = Counter({'T': 4, 'I': 4, 'O': 1, 'J': 1})
+    greedy_packer = BlockPacker(start_text=start_text, tries=1000)
+    greedy_packer.fill(Counter(shape_counts))
+    packer = ExactCoverPacker(start_text=start_text, tries=1000)
+
+    is_filled = packer.fill(shape_counts)
+
+    assert not greedy_packer.is_full
+    assert is_filled
+    assert packer.is_full
+
+
+def test_partial_fill():
+    shape_counts = Counter({'O': 5})
+    packer = ExactCoverPacker(start_text=dedent("""\
+        .##..
+        .....
+        ..#..
+        .....
+        ..##."""))
+    packer.are_partials_saved = True
+
+    packer.fill(shape_counts)
+
+    assert 1 <= shape_counts['O'] <= 3
+    assert np.count_nonzero(packer.state > 1) == (5 - shape_counts['O']) * 4
@@ -0,0 +1,61 @@
+from collections import Counter
+from textwrap import dedent
+
+from four_letter_blocks.evo_packer import (EvoPacker, Packing,
+                                           PackingFitnessCalculator)
+from four_letter_blocks.island_evolution import IslandEvolution
+
+
+def test_fill():
+    shape_counts = Counter({'S0': 1, 'S1': 1, 'L0': 1, 'L1': 1, 'I0': 1})
+    start_text = dedent("""\
+        .##..
+        .....
+        ..#..
+        .....
+        ..##.""")
+    packer = EvoPacker(start_text=start_text, tries=100, min_tries=1)
+    packer.epochs = 2
+    packer.pool_size = 100
+    packer.island_count = 2
+
+    is_filled = packer.fill(shape_counts)
+
+    assert is_filled
+    assert packer.is_full
+    assert isinstance(packer.evo, IslandEvolution)
+    assert len(packer.pool_summaries) == 2
+    assert not any(island.process.is_alive() for island in packer.evo.pools)
+
+
+def test_migration():
+    init_params = dict(start_state=EvoPacker(6, 6).state,
+                       shape_counts=Counter({'O': 5, 'T': 4}),
+                       tries=100)
+    calculator = PackingFitnessCalculator()
+    evolution = IslandEvolution(pool_size=20,
+                                fitness=calculator.calculate,
+                                individual_class=Packing,
+                                n_offsprings=4,
+                                pair_params=None,
+                                mutate_params=None,
+                                init_params=init_params,
+                                pool_count=3,
+                                migration_interval=2,
+                                migrant_count=3)
+    try:
+        evolution.step()
+        start_fitnesses = [island.best_fitness for island in evolution.pools]
+
+        evolution.step()  # Second epoch sends migrants.
+
+        end_fitnesses = [island.best_fitness for island in evolution.pools]
+        migrant_counts = [len(island.migrant_payloads)
+                          for island in evolution.pools]
+    finally:
+        evolution.close()
+
+    # Each island got the top individuals from the one before it.
+    for i, end_fitness in enumerate(end_fitnesses):
+        assert end_fitness >= start_fitnesses[i-1]
+    assert migrant_counts == [3, 3, 3]
@@ -0,0 +1,33 @@
+from four_letter_blocks.packer_stats import PackerStats
+
+
+def test_add():
+    stats = PackerStats(node_count=10, max_depth=3, slot_search_time=0.5)
+    worker_stats = PackerStats(node_count=5, max_depth=7, slot_search_time=0.25)
+
+    stats.add(worker_stats)
+
+    assert stats.node_count == 15
+    assert stats.max_depth == 7
+    assert stats.slot_search_time == 0.75
+
+
+def test_as_dict():
+    stats = PackerStats(node_count=10, backtrack_count=4)
+
+    stats_dict = stats.as_dict()
+
+    assert stats_dict['node_count'] == 10
+    assert stats_dict['backtrack_count'] == 4
+    assert stats_dict['fitness_cache_hits'] == 0
+
+
+def test_display():
+    stats = PackerStats(node_count=10,
+                        backtrack_count=4,
+                        max_depth=3,
+                        slot_search_count=12,
+                        slot_search_time=0.0125)
+
+    assert str(stats) == ('10 nodes, 4 backtracks, max depth 3, '
+                          '12 slot searches in 0.013s')
@@ -0,0 +1,133 @@
+from collections import Counter
+from pathlib import Path
+from textwrap import dedent
+
+from four_letter_blocks.block_packer import BlockPacker
+from tools.packing_benchmark import (BenchmarkCase, build_cases,
+                                     compare_results, find_pairs, run_case,
+                                     summarize, time_fill)
+
+TESTS_PATH = Path(__file__).parent
+
+
+def build_report(**result_fields):
+    result = dict(key='BlockPacker:a.txt:0',
+                  packer='BlockPacker',
+                  puzzle='a.txt',
+                  seed=0,
+                  seconds=1.0,
+                  nodes=100,
+                  is_filled=True,
+                  peak_memory_kb=1000)
+    result.update(result_fields)
+    return dict(results=[result], summary=summarize([result]))
+
+
+def test_find_pairs():
+    paths = [Path('x/test-front11x11.txt'),
+             Path('x/test-back11x11.txt'),
+             Path('x/other-front.txt'),
+             Path('x/single.txt')]
+
+    pairs = find_pairs(paths)
+
+    assert pairs == [(Path('x/test-front11x11.txt'),
+                      Path('x/test-back11x11.txt'))]
+
+
+def test_build_cases():
+    paths = [TESTS_PATH / 'test-front11x11.txt',
+             TESTS_PATH / 'test-back11x11.txt']
+
+    cases = build_cases(paths,
+                        ['BlockPacker', 'DoubleBlockPacker'],
+                        seeds=[0, 1],
+                        tries=10,
+                        epochs=1,
+                        pool_size=10)
+
+    assert [case.key for case in cases] == [
+        'BlockPacker:test-front11x11.txt:0',
+        'BlockPacker:test-front11x11.txt:1',
+        'BlockPacker:test-back11x11.txt:0',
+        'BlockPacker:test-back11x11.txt:1',
+        'DoubleBlockPacker:test-front11x11.txt:0',
+        'DoubleBlockPacker:test-front11x11.txt:1']
+    assert cases[-1].back_path == TESTS_PATH / 'test-back11x11.txt'
+
+
+def test_build_cases_with_branching():
+    paths = [TESTS_PATH / 'test-front11x11.txt',
+             TESTS_PATH / 'test-back11x11.txt']
+
+    cases = build_cases(paths,
+                        ['BlockPacker', 'DoubleBlockPacker'],
+                        seeds=[0],
+                        tries=10,
+                        epochs=1,
+                        pool_size=10,
+                        branching_names=['shape-scores', 'fewest-rows'])
+
+    assert [case.key for case in cases] == [
+        'BlockPacker:test-front11x11.txt:0',
+        'BlockPacker:test-front11x11.txt:0:fewest-rows',
+        'BlockPacker:test-back11x11.txt:0',
+        'BlockPacker:test-back11x11.txt:0:fewest-rows',
+        'DoubleBlockPacker:test-front11x11.txt:0']
+
+
+def test_run_case():
+    case = BenchmarkCase('BlockPacker',
+                         TESTS_PATH / 'test-front11x11.txt',
+                         back_path=None,
+                         seed=0,
+                         tries=5,
+                         epochs=1,
+                         pool_size=10)
+
+    result1 = run_case(case)
+    result2 = run_case(case)
+
+    assert result1['key'] == 'BlockPacker:test-front11x11.txt:0'
+    assert result1['nodes'] == 5
+    assert not result1['is_filled']
+    assert result1['seconds'] > 0
+    assert result1['stats']['node_count'] == 5
+    assert result2['stats']['max_depth'] == result1['stats']['max_depth']
+
+
+def test_no_regressions():
+    baseline = build_report()
+    report = build_report(seconds=1.1, nodes=100, peak_memory_kb=1100)
+
+    regressions = compare_results(baseline, report)
+
+    assert regressions == []
+
+
+def test_regressions():
+    baseline = build_report()
+    report = build_report(seconds=1.5,
+                          nodes=200,
+                          is_filled=False,
+                          peak_memory_kb=None)
+
+    regressions = compare_results(baseline, report)
+
+    assert regressions == [
+        'BlockPacker:a.txt:0: no longer filled.',
+        'BlockPacker:a.txt:0: seconds went from 1s to 1.5s.',
+        'BlockPacker:a.txt:0: nodes went from 100 nodes to 200 nodes.',
+        'BlockPacker: success rate went from 100% to 0%.']
+
+
+def test_time_fill():
+    packer = BlockPacker(start_text=dedent("""\
+        ....
+        ...."""))
+
+    timing = time_fill(packer, lambda: packer.fill(Counter(I=2)))
+
+    assert timing.is_filled
+    assert timing.seconds > 0
+    assert timing.nodes == packer.stats.node_count
@@ -0,0 +1,158 @@
+from collections import Counter
+from textwrap import dedent
+
+from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.parallel_block_packer import (ParallelBlockPacker,
+                                                      fill_worker)
+
+
+def test_fill():
+    packer = ParallelBlockPacker(4, 4, tries=1000, worker_count=2, seed=0)
+
+    is_filled = packer.fill(Counter({'L': 2, 'O': 2}))
+    packer.close()
+
+    assert is_filled
+    assert packer.is_full
+    assert len(packer.positions['L']) == 2
+    assert len(packer.positions['O']) == 2
+
+
+def test_fewest_rows():
+    shape_counts = Counter({'O': 1, 'I': 1})
+    packer = ParallelBlockPacker(4, 4, worker_count=3, seed=0)
+    packer.is_first_fill_used = False
+
+    is_filled = packer.fill(shape_counts)
+
+    assert is_filled
+    assert packer.count_filled_rows() == 3
+    assert packer.stats.node_count >= 3  # At least one from each worker.
+
+
+def test_fill_fail():
+    packer = ParallelBlockPacker(2, 3, tries=500, worker_count=2, seed=0)
+
+    is_filled = packer.fill(Counter({'O': 2}))
+
+    assert not is_filled
+    assert packer.state is None
+
+
+def test_split_row():
+    packer = ParallelBlockPacker(1, 8, split_row=2, worker_count=2, seed=0)
+
+    is_filled = packer.fill(Counter({'I': 1}))
+
+    assert is_filled
+    assert packer.display() == dedent("""\
+        .
+        .
+        A
+        A
+        A
+        A
+        .
+        .""")
+
+
+def test_worker_seed():
+    start_state = BlockPacker(5, 5).state
+    shape_counts = Counter({'T': 2, 'L': 2})
+
+    result1 = fill_worker(start_state, Counter(shape_counts), 1, 1000, 0, 0,
+                          False)
+    result2 = fill_worker(start_state, Counter(shape_counts), 1, 1000, 0, 0,
+                          False)
+
+    assert result1.is_filled
+    assert result1.state.tolist() == result2.state.tolist()
+
+
+def test_worker_runs_out_of_tries():
+    start_state = BlockPacker(5, 5).state
+    shape_counts = Counter({'T0': 2, 'O': 1, 'L2': 1, 'J0': 1})
+
+    result = fill_worker(start_state, shape_counts, 5, 1000, 0, 0, False)
+
+    # BlockPacker reports success, but only some of the blocks got placed.
+    assert result.is_filled
+    assert not result.is_complete
+
+
+def test_first_worker_in_order():
+    shape_counts = Counter({'T0': 2, 'O': 1, 'L2': 1, 'J0': 1})
+    serial_packer = BlockPacker(5, 5, tries=1000)
+    packer = ParallelBlockPacker(5, 5, tries=1000, worker_count=1, seed=5)
+
+    serial_packer.fill(Counter(shape_counts))
+    packer.fill(Counter(shape_counts))
+
+    assert packer.display() == serial_packer.display()
+
+
+def test_partial_fill():
+    """ Partial fills don't choose between workers, so they run serially. """
+    start_text = dedent("""\
+        .##..
+        .....
+        .....
+        .....""")
+    serial_packer = BlockPacker(start_text=start_text)
+    serial_packer.are_partials_saved = True
+    packer = ParallelBlockPacker(start_text=start_text, worker_count=2)
+    packer.are_partials_saved = True
+
+    serial_packer.fill(Counter({'O': 5}))
+    packer.fill(Counter({'O': 5}))
+
+    assert packer.display() == serial_packer.display()
+
+
+def test_reuses_workers():
+    packer = ParallelBlockPacker(4, 4, tries=1000, worker_count=2, seed=0)
+    start_state = packer.state
+
+    is_filled1 = packer.fill(Counter({'L': 2, 'O': 2}))
+    executor = packer.executor
+    packer.state = start_state
+    is_filled2 = packer.fill(Counter({'T': 4}))
+    is_same_executor = packer.executor is executor
+    packer.close()
+
+    assert is_filled1
+    assert is_filled2
+    assert is_same_executor
+    assert packer.executor is None
+    assert packer.table_folder is None
+
+
+def test_worker_settings():
+    start_state = BlockPacker(6, 4).state
+    shape_counts = Counter({'T': 4, 'L': 2})
+
+    result = fill_worker(start_state, shape_counts, 0, 1000, 0, 0, True,
+                         restart_unit=5,
+                         transposition_size=100)
+
+    assert result.is_complete
+    assert result.stats.restart_count > 1
+
+
+def test_clone_empty():
+    packer = ParallelBlockPacker(4, 4, tries=1000, worker_count=2, seed=0)
+    packer.force_fours = True
+    packer.restart_unit = 10
+    packer.fill(Counter({'L': 2, 'O': 2}))
+
+    clone = packer.clone_empty(5, 5)
+    packer.close()
+
+    assert isinstance(clone, ParallelBlockPacker)
+    assert clone.worker_count == 2
+    assert clone.seed == 0
+    assert clone.force_fours
+    assert clone.restart_unit == 10
+    assert clone.executor is None
+    assert clone.display() == BlockPacker(5, 5).display()
+    assert clone.stats.node_count == 0
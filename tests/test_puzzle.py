@@ -6,7 +6,7 @@ import pytest
 from PySide6.QtGui import QTextDocument, QPainter
 
 from four_letter_blocks.clue import Clue
-from four_letter_blocks.puzzle import Puzzle, RotationsDisplay
+from four_letter_blocks.puzzle import Puzzle, RotationsDisplay, WordWarning
 import four_letter_blocks.puzzle
 from tests.pixmap_differ import PixmapDiffer
 
@@ -665,6 +665,33 @@ BBBC
     assert warnings == ['complete word on one block from (4, 1) to (4, 4)']
 
 
+def test_find_word_warnings():
+    source_file = StringIO("""\
+Title
+
+WORD
+I##A
+N##S
+EACH
+
+-
+
+AAAC
+A##C
+B##C
+BBBC
+""")
+    puzzle = Puzzle.parse(source_file)
+
+    warnings = puzzle.find_word_warnings()
+
+    assert warnings == [WordWarning((4, 1), (4, 4),
+                                    is_complete=True,
+                                    block_index=2)]
+    assert warnings[0].squares == [(4, 1), (4, 2), (4, 3), (4, 4)]
+    assert puzzle.blocks[2].marker == 'C'
+
+
 def test_warning_complete_unused():
     source_file = StringIO("""\
 Title
@@ -1,3 +1,4 @@
+from collections import Counter
 from io import StringIO
 from pathlib import Path
 from textwrap import dedent
@@ -8,6 +9,8 @@ from PySide6.QtGui import QPainter, QColor, QImage, QFont, Qt
 from four_letter_blocks.block import Block
 from four_letter_blocks.block_packer import BlockPacker
 from four_letter_blocks.clue_painter import CluePainter
+from four_letter_blocks.exact_cover_packer import ExactCoverPacker
+from four_letter_blocks.parallel_block_packer import ParallelBlockPacker
 from four_letter_blocks.puzzle import Puzzle, draw_rotated_tiles, RotationsDisplay
 from four_letter_blocks.puzzle_pair import PuzzlePair
 from four_letter_blocks.square import draw_gradient_rect, Square
@@ -388,6 +391,36 @@ def test_packing():
     assert packing == expected_packing
 
 
+def test_packing_exact_cover():
+    puzzle_pair = parse_puzzle_pair(ExactCoverPacker(5, 5, tries=1000))
+
+    block_packer = puzzle_pair.block_packer
+    shape_counts = Counter({
+        shape: len(positions)
+        for shape, positions in block_packer.rotated_positions.items()})
+
+    assert isinstance(block_packer, ExactCoverPacker)
+    assert shape_counts == puzzle_pair.shape_counts
+
+
+def test_packing_parallel():
+    puzzle_pair = parse_puzzle_pair(ParallelBlockPacker(5,
+                                                        5,
+                                                        tries=1000,
+                                                        worker_count=2))
+
+    block_packer = puzzle_pair.block_packer
+    assert isinstance(block_packer, ParallelBlockPacker)
+    block_packer.close()
+    shape_counts = Counter({
+        shape: len(positions)
+        for shape, positions in block_packer.rotated_positions.items()})
+
+    assert block_packer.worker_count == 2
+    assert block_packer.stats.node_count > 0
+    assert shape_counts == puzzle_pair.shape_counts
+
+
 def test_prepacking():
     expected_packing = dedent("""\
         AAA..
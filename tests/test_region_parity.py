@@ -0,0 +1,104 @@
+from textwrap import dedent
+
+import numpy as np
+from scipy.ndimage import label
+
+from four_letter_blocks.bit_board import build_placements
+from four_letter_blocks.block_packer import BlockPacker, build_masks
+from four_letter_blocks.region_parity import (RegionParity, build_windows,
+                                              find_even_slots)
+
+
+def find_dense_even_slots(non_gaps: np.ndarray) -> dict[str, np.ndarray]:
+    """ Label every placement separately, the way find_slots() used to. """
+    height, width = non_gaps.shape
+    padded = np.pad(non_gaps, (0, 3), constant_values=1)
+    structure = np.zeros((3, 3, 3, 3), bool)
+    structure[1, 1, :, :] = [[0, 1, 0],
+                             [1, 1, 1],
+                             [0, 1, 0]]
+    slots = {}
+    for shape, masks in build_masks(width, height).items():
+        collisions = np.logical_and(masks, padded)
+        open_slots = np.logical_not(np.any(collisions, axis=(2, 3)))
+        gaps = np.logical_not(np.logical_or(masks, padded))
+        gap_groups, _ = label(gaps, structure=structure)
+        bin_counts = np.bincount(gap_groups.flatten())
+        uneven_groups, = np.nonzero(bin_counts % 4)
+        if uneven_groups.size and uneven_groups[0] == 0:
+            uneven_groups = uneven_groups[1:]
+        is_uneven = np.isin(gap_groups, uneven_groups)
+        has_even = np.logical_not(np.any(is_uneven, axis=(2, 3)))
+        slots[shape] = np.logical_and(open_slots, has_even)
+    return slots
+
+
+def test_windows():
+    windows = build_windows(5, 4)['T0']
+    expected_ring = np.array([[0, 1, 1, 1, 0],
+                              [1, 0, 0, 0, 1],
+                              [0, 1, 0, 1, 0],
+                              [0, 0, 1, 0, 0]], dtype=bool)
+
+    assert windows.cells[0, 0].tolist() == [-1, -1, -1, -1, -1]
+    assert windows.cells[0, 1].tolist() == [-1, 0, 1, 2, 3]
+    np.testing.assert_array_equal(windows.is_ring, expected_ring)
+
+
+def test_uneven_region():
+    parity = RegionParity(np.array([[1, 1, 0, 1],
+                                    [1, 1, 0, 1]], dtype=bool))
+    o_placement = build_placements(4, 2)['O'].index[0, 0]
+
+    is_even = parity.find_even('O', np.array([o_placement]))
+
+    assert not parity.is_even
+    assert is_even.tolist() == [False]
+
+
+def test_split_region():
+    parity = RegionParity(np.array([[1, 1, 1, 1, 1, 1],
+                                    [1, 1, 1, 1, 1, 1]], dtype=bool))
+    index = build_placements(6, 2)['O'].index
+    placements = index[0, :5]
+
+    is_even = parity.find_even('O', placements)
+
+    assert is_even.tolist() == [True, False, True, False, True]
+
+
+# noinspection DuplicatedCode
+def test_find_even_slots():
+    packer = BlockPacker(start_text=dedent("""\
+        #..#.
+        .....
+        ..#..
+        .....
+        .#..#"""))
+    non_gaps = packer.state != 0
+    # Not at (1, 3) or (2, 0), because they cut off something.
+    expected_o_slots = np.array(object=[[0, 1, 0, 0, 0],
+                                        [1, 0, 0, 0, 0],
+                                        [0, 0, 0, 1, 0],
+                                        [0, 0, 1, 0, 0],
+                                        [0, 0, 0, 0, 0]],
+                                dtype=bool)
+
+    slots = find_even_slots(~non_gaps, packer.scan_slots(non_gaps))
+
+    np.testing.assert_array_equal(slots['O'], expected_o_slots)
+
+
+def test_matches_dense_labels():
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        width, height = rng.integers(3, 10, size=2)
+        non_gaps = rng.random((height, width)) < rng.random() * 0.5
+        packer = BlockPacker(start_state=non_gaps.astype(np.uint8))
+        expected_slots = find_dense_even_slots(non_gaps)
+
+        slots = find_even_slots(~non_gaps, packer.scan_slots(non_gaps))
+
+        assert slots.keys() == expected_slots.keys()
+        for shape, shape_slots in slots.items():
+            np.testing.assert_array_equal(shape_slots, expected_slots[shape])
@@ -0,0 +1,28 @@
+from itertools import islice
+
+import pytest
+
+from four_letter_blocks.restarts import iter_budgets, luby
+
+
+def test_luby():
+    terms = [luby(index) for index in range(1, 16)]
+
+    assert terms == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+
+
+def test_luby_budgets():
+    budgets = list(islice(iter_budgets('luby', 10), 7))
+
+    assert budgets == [10, 10, 20, 10, 10, 20, 40]
+
+
+def test_geometric_budgets():
+    budgets = list(islice(iter_budgets('geometric', 100, factor=2), 4))
+
+    assert budgets == [100, 200, 400, 800]
+
+
+def test_unknown_schedule():
+    with pytest.raises(ValueError, match="Unknown restart schedule: 'x'."):
+        next(iter_budgets('x', 10))
@@ -0,0 +1,116 @@
+from textwrap import dedent
+
+import numpy as np
+
+from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.slot_tracker import SlotTracker
+
+
+def assert_matches_packer(tracker: SlotTracker, packer: BlockPacker):
+    non_gaps = packer.state != 0
+    expected_slots = packer.scan_slots(non_gaps)
+    expected_coverage = packer.calculate_coverage(expected_slots, non_gaps)
+
+    slots = tracker.find_slots()
+
+    assert list(slots) == list(expected_slots)
+    for shape, shape_slots in slots.items():
+        np.testing.assert_array_equal(shape_slots, expected_slots[shape])
+    np.testing.assert_array_equal(tracker.slot_coverage, expected_coverage)
+    assert tracker.uncovered_count == (expected_coverage == 0).sum()
+
+
+# noinspection DuplicatedCode
+def test_start():
+    packer = BlockPacker(start_text=dedent("""\
+        #..#.
+        .....
+        ..#..
+        .....
+        .#..#"""))
+
+    tracker = SlotTracker(packer.state != 0)
+
+    assert_matches_packer(tracker, packer)
+
+
+# noinspection DuplicatedCode
+def test_place():
+    packer = BlockPacker(start_text=dedent("""\
+        #..#.
+        .....
+        AA#..
+        AA...
+        .#..#"""))
+    tracker = SlotTracker(packer.state != 0)
+
+    new_state, cells = next(packer.place_block_with_cells('L0', 1, 3, 3))
+    tracker.place(cells)
+    packer.state = new_state
+
+    assert_matches_packer(tracker, packer)
+
+
+# noinspection DuplicatedCode
+def test_undo():
+    packer = BlockPacker(start_text=dedent("""\
+        #..#.
+        .....
+        AA#..
+        AA...
+        .#..#"""))
+    tracker = SlotTracker(packer.state != 0)
+    _new_state, cells = next(packer.place_block_with_cells('L0', 1, 3, 3))
+    tracker.place(cells)
+
+    tracker.undo()
+
+    assert_matches_packer(tracker, packer)
+    assert not tracker.history
+
+
+def test_split_row():
+    packer = BlockPacker(5, 5, split_row=2)
+    tracker = SlotTracker(packer.state != 0, split_row=2)
+
+    slots = tracker.find_slots()
+
+    assert not slots['O'][1].any()
+    assert_matches_packer(tracker, packer)
+
+
+def test_random_moves():
+    rng = np.random.default_rng(0)
+    packer = BlockPacker(start_text=dedent("""\
+        #.....#
+        ...#...
+        .......
+        .#.#.#.
+        .......
+        ...#...
+        #.....#"""))
+    start_state = packer.state
+    tracker = SlotTracker(start_state != 0)
+    states = [start_state]
+    for block_num in range(2, 12):
+        slots = tracker.find_slots()
+        choices = [(shape, row, col)
+                   for shape, shape_slots in slots.items()
+                   for row, col in zip(*np.nonzero(shape_slots))]
+        if not choices:
+            break
+        shape, row, col = choices[rng.integers(len(choices))]
+        new_state, cells = next(
+            packer.place_block_with_cells(shape, row, col, block_num))
+        tracker.place(cells)
+        packer.state = new_state
+        states.append(new_state)
+
+        assert_matches_packer(tracker, packer)
+
+    while tracker.history:
+        tracker.undo()
+        states.pop()
+        packer.state = states[-1]
+
+        assert_matches_packer(tracker, packer)
@@ -0,0 +1,68 @@
+from collections import Counter
+
+import numpy as np
+
+from four_letter_blocks.symmetry import (find_symmetries, list_grid_symmetries,
+                                         map_shapes, SymmetryPruner)
+
+
+def test_map_shapes():
+    mirror_map = map_shapes('flip_lr')
+    turn_map = map_shapes('rot180')
+
+    assert mirror_map['L0'] == 'J0'
+    assert mirror_map['L'] == 'J'
+    assert mirror_map['I1'] == 'I1'
+    assert turn_map['T0'] == 'T2'
+    assert turn_map['S0'] == 'S0'
+
+
+def test_grid_symmetries():
+    rectangle_names = [symmetry.name
+                       for symmetry in list_grid_symmetries(3, 2)]
+    square_names = [symmetry.name
+                    for symmetry in list_grid_symmetries(2, 2)]
+    mirror = list_grid_symmetries(3, 2)[1]
+
+    assert rectangle_names == ['rot180', 'flip_lr', 'flip_ud']
+    assert len(square_names) == 7
+    assert mirror.name == 'flip_lr'
+    assert mirror.cell_map.tolist() == [2, 1, 0, 5, 4, 3]
+
+
+def test_find_symmetries():
+    is_open = np.ones((4, 6), dtype=bool)
+    is_open[0, 0] = is_open[3, 5] = False
+
+    names = [symmetry.name
+             for symmetry in find_symmetries(is_open, Counter(T=5))]
+    lopsided_names = [symmetry.name
+                      for symmetry in find_symmetries(np.ones((4, 6), bool),
+                                                      Counter(L=6))]
+    all_open_names = [symmetry.name
+                      for symmetry in find_symmetries(np.ones((4, 6), bool),
+                                                      Counter(T=6))]
+    split_names = [symmetry.name
+                   for symmetry in find_symmetries(np.ones((4, 6), bool),
+                                                   Counter(T=6),
+                                                   split_row=1)]
+
+    assert names == ['rot180']
+    assert lopsided_names == ['rot180']
+    assert all_open_names == ['rot180', 'flip_lr', 'flip_ud']
+    assert split_names == ['flip_lr']
+
+
+def test_pruner():
+    mirror = list_grid_symmetries(3, 2)[1]
+    pruner = SymmetryPruner([(mirror.cell_map,)])
+
+    is_image1 = pruner.is_image(np.array([0, 3]))
+    pruner.add_refuted(np.array([0, 3]))
+    is_image2 = pruner.is_image(np.array([2, 5]))
+    is_image3 = pruner.is_image(np.array([1, 4]))
+
+    assert not is_image1
+    assert is_image2
+    assert not is_image3
+    assert pruner.pruned_count == 1
@@ -0,0 +1,63 @@
+from collections import Counter
+
+import numpy as np
+
+from four_letter_blocks.transposition_table import StateKey, TranspositionTable
+
+
+def make_key(hash_value: int, cells: bytes = b'') -> StateKey:
+    return StateKey(hash_value, cells, (), ())
+
+
+def test_find_key():
+    occupied = np.array([[1, 0, 0],
+                         [0, 1, 0]], dtype=bool)
+    key = TranspositionTable.find_key(occupied, Counter(O=1, T=2), 3)
+
+    # Shape order and zero counts don't matter.
+    key2 = TranspositionTable.find_key(occupied, Counter(T=2, O=1, S=0), 3)
+
+    # Changes to spaces, counts, or settings do.
+    other_occupied = np.array([[1, 0, 0],
+                               [0, 0, 1]], dtype=bool)
+    key3 = TranspositionTable.find_key(other_occupied, Counter(O=1, T=2), 3)
+    key4 = TranspositionTable.find_key(occupied, Counter(O=2, T=1), 3)
+    key5 = TranspositionTable.find_key(occupied, Counter(O=1, T=2), 2)
+
+    assert key2 == key
+    assert len({key, key3, key4, key5}) == 4
+
+
+def test_dead_states():
+    table = TranspositionTable()
+
+    table.add_dead(make_key(100))
+
+    assert table.is_dead(make_key(100))
+    assert not table.is_dead(make_key(200))
+    assert table.hits == 1
+    assert table.misses == 1
+    assert len(table) == 1
+
+
+def test_evicts_least_recently_used():
+    table = TranspositionTable(max_size=2)
+    table.add_dead(make_key(100))
+    table.add_dead(make_key(200))
+    table.is_dead(make_key(100))
+
+    table.add_dead(make_key(300))
+
+    assert table.is_dead(make_key(100))
+    assert not table.is_dead(make_key(200))
+    assert table.is_dead(make_key(300))
+
+
+def test_hash_collision():
+    table = TranspositionTable()
+    table.add_dead(make_key(100, b'\x01'))
+
+    is_dead = table.is_dead(make_key(100, b'\x02'))
+
+    assert not is_dead
+    assert table.misses == 1
@@ -0,0 +1,132 @@
+import random
+from collections import Counter
+from textwrap import dedent
+
+import numpy as np
+
+from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.puzzle import Puzzle
+from four_letter_blocks.word_spans import (build_word_spans,
+                                           count_complete_words, count_shapes,
+                                           find_complete_words, find_hot_spots,
+                                           update_complete_words)
+
+
+def score_with_puzzle(state: np.ndarray) -> tuple[int, Counter]:
+    """ Score a state the old way, by parsing it into a Puzzle. """
+    display = BlockPacker(start_state=state).display()
+    puzzle = Puzzle.parse_sections('', display, '', display)
+    warning_count = sum(1
+                        for warning in puzzle.check_word_length()
+                        if warning.startswith('complete word'))
+    return warning_count, puzzle.shape_counts
+
+
+def score_with_arrays(state: np.ndarray) -> tuple[int, Counter]:
+    spans = build_word_spans(state != BlockPacker.GAP)
+    return count_complete_words(state, spans), count_shapes(state)
+
+
+def test_word_spans():
+    is_letter = np.array([[1, 1, 0, 1, 1, 1, 1, 1],
+                          [1, 0, 0, 0, 0, 0, 0, 1]], dtype=bool)
+
+    spans = build_word_spans(is_letter)
+
+    # Across: (0, 1) only, because the second word is too long for a block.
+    # Down: (0, 8) and (7, 15).
+    assert spans.cells.tolist() == [[0, 1, 0, 0],
+                                    [0, 8, 0, 0],
+                                    [7, 15, 7, 7]]
+
+
+def test_word_spans_split_row():
+    is_letter = np.array([[1, 0],
+                          [1, 0],
+                          [1, 1],
+                          [1, 0]], dtype=bool)
+
+    spans = build_word_spans(is_letter, split_row=2)
+
+    # Down: (0, 2) and (4, 6), but not across the split.
+    assert spans.cells.tolist() == [[4, 5, 4, 4],
+                                    [0, 2, 0, 0],
+                                    [4, 6, 4, 4]]
+
+
+def test_fixture():
+    state = BlockPacker(start_text=dedent("""\
+        AAB#CDDDD
+        ABB#CEEEE
+        ABF#CGGHH
+        FFFICGGHH
+        ###I#J###
+        KKIIJJLLL
+        KKMMJ#NOL
+        PMMQQ#NOO
+        PPPQQ#NNO""")).state
+
+    warning_count, shape_counts = score_with_arrays(state)
+
+    assert (warning_count, shape_counts) == score_with_puzzle(state)
+    assert warning_count == 1
+
+
+def test_random_packings():
+    random.seed(0)
+    for _ in range(30):
+        width = random.randrange(4, 10)
+        height = random.randrange(4, 10)
+        packer = BlockPacker(width, height, tries=100)
+        packer.are_slots_shuffled = True
+        packer.are_partials_saved = True
+        shape_counts = Counter({shape: width * height // 20 + 1
+                                for shape in 'IJLOSTZ'})
+        packer.fill(shape_counts)
+        state = packer.state.copy()
+        state[state == BlockPacker.UNUSED] = BlockPacker.GAP
+
+        assert score_with_arrays(state) == score_with_puzzle(state)
+
+
+def test_hot_spots():
+    state = BlockPacker(start_text=dedent("""\
+        AAB#C
+        ABB#C
+        ABF#C
+        FFF#C""")).state
+    spans = build_word_spans(state != BlockPacker.GAP)
+
+    is_complete = find_complete_words(state, spans)
+    hot_spots = find_hot_spots(spans, is_complete)
+
+    # Block C has a whole word down the right side, and F across the bottom.
+    assert sorted(hot_spots.tolist()) == [4, 9, 14, 15, 16, 17, 19]
+
+
+def test_update_complete_words():
+    random.seed(1)
+    packer = BlockPacker(6, 6, tries=100)
+    packer.are_slots_shuffled = True
+    packer.fill(Counter({shape: 3 for shape in 'IJLOSTZ'}))
+    state = packer.state.copy()
+    spans = build_word_spans(state != BlockPacker.GAP)
+    is_complete = find_complete_words(state, spans)
+    for _ in range(10):
+        row = random.randrange(packer.height)
+        col = random.randrange(packer.width)
+        try:
+            packer.remove_block(row, col)
+        except ValueError:
+            continue
+        new_state = packer.state
+        changed_cells, = np.nonzero((new_state != state).ravel())
+
+        is_complete = update_complete_words(new_state,
+                                            spans,
+                                            is_complete,
+                                            changed_cells)
+        state = new_state.copy()
+
+        assert is_complete.tolist() == find_complete_words(state,
+                                                           spans).tolist()
@@ -0,0 +1,358 @@
+""" Measure packing speed over a folder of puzzles, and flag regressions.
+
+Each packer runs on the empty grid of each puzzle, trying to pack the same
+shapes as the puzzle's blocks. Double-sided packers run on pairs of files
+with the same name, except for 'front' and 'back', like
+test-front11x11.txt and test-back11x11.txt. Every run uses a fixed seed, and
+runs in its own process, so its peak memory doesn't include earlier runs.
+
+    python -m tools.packing_benchmark tests --output new.json \\
+        --baseline old.json
+
+The other benchmarks in this folder share time_fill() to time each packing.
+"""
+import argparse
+import json
+import re
+import sys
+import typing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from four_letter_blocks.block_packer import BlockPacker, create_rng
+from four_letter_blocks.branching import BRANCHING_STRATEGIES, BranchingStrategy
+from four_letter_blocks.double_block_packer import DoubleBlockPacker
+from four_letter_blocks.double_evo_packer import DoubleEvoPacker
+from four_letter_blocks.evo_packer import EvoPacker
+from four_letter_blocks.puzzle import Puzzle
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, so peak memory isn't recorded.
+    resource = None  # type: ignore
+
+SINGLE_PACKERS = ('BlockPacker', 'EvoPacker')
+DOUBLE_PACKERS = ('DoubleBlockPacker', 'DoubleEvoPacker')
+
+
+class FillTiming(typing.NamedTuple):
+    is_filled: bool
+    seconds: float
+    nodes: int  # search nodes, or epochs for evolutionary packers
+
+
+class BenchmarkCase(typing.NamedTuple):
+    packer_name: str
+    puzzle_path: Path
+    back_path: Path | None  # only for double-sided packers
+    seed: int
+    tries: int
+    epochs: int
+    pool_size: int
+    branching: str = BranchingStrategy.name  # only for BlockPacker
+
+    @property
+    def key(self) -> str:
+        """ Identify the same case in a baseline. """
+        key = f'{self.packer_name}:{self.puzzle_path.name}:{self.seed}'
+        if self.branching != BranchingStrategy.name:
+            key += f':{self.branching}'
+        return key
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Measure packing speed over a folder of puzzles.')
+    default_path = Path(__file__).parent.with_name('dump')
+    parser.add_argument('puzzle_paths',
+                        type=Path,
+                        nargs='*',
+                        default=[default_path / 'single-sided-as-is',
+                                 default_path / 'single-sided-other'],
+                        help='puzzle files or folders of them')
+    parser.add_argument('--packers',
+                        nargs='+',
+                        choices=SINGLE_PACKERS + DOUBLE_PACKERS,
+                        default=list(SINGLE_PACKERS + DOUBLE_PACKERS))
+    parser.add_argument('--seeds',
+                        type=int,
+                        nargs='+',
+                        default=[0, 1, 2])
+    parser.add_argument('--tries',
+                        type=int,
+                        default=10_000,
+                        help='tries for each search packer, or each individual')
+    parser.add_argument('--epochs',
+                        type=int,
+                        default=20,
+                        help='epochs for each evolutionary packer')
+    parser.add_argument('--pool-size', type=int, default=100)
+    parser.add_argument('--branching',
+                        nargs='+',
+                        choices=list(BRANCHING_STRATEGIES),
+                        default=[BranchingStrategy.name],
+                        help='branching strategies to compare for BlockPacker')
+    parser.add_argument('--output',
+                        type=Path,
+                        help='JSON file to write results to')
+    parser.add_argument('--baseline',
+                        type=Path,
+                        help='JSON file of earlier results to compare with')
+    parser.add_argument('--tolerance',
+                        type=float,
+                        default=0.2,
+                        help='fraction worse than the baseline to report')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    puzzle_paths = find_puzzle_paths(args.puzzle_paths)
+    cases = build_cases(puzzle_paths,
+                        args.packers,
+                        args.seeds,
+                        args.tries,
+                        args.epochs,
+                        args.pool_size,
+                        args.branching)
+    if not cases:
+        path_names = ', '.join(map(str, args.puzzle_paths))
+        sys.exit(f'No puzzles found in {path_names}.')
+    results = []
+    with ProcessPoolExecutor(1, max_tasks_per_child=1) as executor:
+        for case, result in zip(cases, executor.map(run_case, cases)):
+            print(f'{case.key}\t{result["seconds"]:.2f}s\t'
+                  f'{result["nodes"]} nodes\t'
+                  f'{"filled" if result["is_filled"] else "not filled"}')
+            results.append(result)
+    report = dict(results=results, summary=summarize(results))
+    for packer_name, summary in report['summary'].items():
+        print(f'{packer_name}: {summary["success_rate"]:.0%} filled, '
+              f'{summary["seconds"]:.2f}s, {summary["nodes"]} nodes')
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare_results(baseline, report, args.tolerance)
+        for regression in regressions:
+            print(regression)
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions from {args.baseline}.')
+
+
+def find_puzzle_paths(paths: typing.Iterable[Path]) -> typing.List[Path]:
+    """ List puzzle files, looking inside any folders. """
+    puzzle_paths = []
+    for path in paths:
+        if path.is_dir():
+            puzzle_paths.extend(sorted(path.glob('*.txt')))
+        elif path.exists():
+            puzzle_paths.append(path)
+    return puzzle_paths
+
+
+def find_pairs(
+        puzzle_paths: typing.Iterable[Path]) -> typing.List[typing.Tuple[Path,
+                                                                         Path]]:
+    """ Match front files with back files that only differ in that word. """
+    paths_by_name = {path.name: path for path in puzzle_paths}
+    pairs = []
+    for name, path in paths_by_name.items():
+        if 'front' not in name:
+            continue
+        back_path = paths_by_name.get(name.replace('front', 'back'))
+        if back_path is not None:
+            pairs.append((path, back_path))
+    return pairs
+
+
+def build_cases(puzzle_paths: typing.Sequence[Path],
+                packer_names: typing.Iterable[str],
+                seeds: typing.Iterable[int],
+                tries: int,
+                epochs: int,
+                pool_size: int,
+                branching_names: typing.Sequence[str] = (
+                    BranchingStrategy.name,)) -> typing.List[BenchmarkCase]:
+    pairs = find_pairs(puzzle_paths)
+    cases = []
+    for packer_name in packer_names:
+        if packer_name in DOUBLE_PACKERS:
+            puzzle_pairs: typing.Iterable[tuple] = pairs
+        else:
+            puzzle_pairs = ((path, None) for path in puzzle_paths)
+        if packer_name == 'BlockPacker':
+            packer_branchings = branching_names
+        else:
+            packer_branchings = (BranchingStrategy.name,)
+        for puzzle_path, back_path in puzzle_pairs:
+            for seed in seeds:
+                for branching in packer_branchings:
+                    cases.append(BenchmarkCase(packer_name,
+                                               puzzle_path,
+                                               back_path,
+                                               seed,
+                                               tries,
+                                               epochs,
+                                               pool_size,
+                                               branching))
+    return cases
+
+
+def load_grid(puzzle_path: Path) -> typing.Tuple[str, typing.Counter[str]]:
+    """ Read a puzzle's empty grid, and the shapes of its blocks.
+
+    :return: (grid_text, shape_counts) where grid_text has '.' for each letter.
+    """
+    with puzzle_path.open() as puzzle_file:
+        puzzle = Puzzle.parse(puzzle_file)
+    grid_text = re.sub(r'[^#\n]', '.', puzzle.format_grid())
+    return grid_text, puzzle.shape_counts
+
+
+def run_case(case: BenchmarkCase) -> dict:
+    """ Run one packer on one puzzle, and measure it. """
+    grid_text, shape_counts = load_grid(case.puzzle_path)
+    packer: BlockPacker | DoubleBlockPacker
+    fill_counts: typing.Any = shape_counts  # DoubleBlockPacker has its own type
+    if case.packer_name == 'BlockPacker':
+        packer = BlockPacker(start_text=grid_text, tries=case.tries)
+        packer.are_slots_shuffled = True
+        packer.branching = BRANCHING_STRATEGIES[case.branching]()
+    elif case.packer_name == 'EvoPacker':
+        packer = EvoPacker(start_text=grid_text, tries=case.tries)
+    else:
+        assert case.back_path is not None
+        back_text, _ = load_grid(case.back_path)
+        fill_counts = None
+        if case.packer_name == 'DoubleBlockPacker':
+            packer = DoubleBlockPacker(grid_text, back_text, tries=case.tries)
+            packer.are_slots_shuffled = True
+        else:
+            packer = DoubleEvoPacker(grid_text, back_text, tries=case.tries)
+            fill_counts = packer.front_shape_counts.copy()
+    if isinstance(packer, EvoPacker):
+        packer.epochs = case.epochs
+        packer.pool_size = case.pool_size
+    if isinstance(packer, BlockPacker):
+        packer.force_fours = True
+    packer.rng = create_rng(case.seed)
+
+    timing = time_fill(packer, lambda: packer.fill(fill_counts))
+
+    state = packer.state
+    is_filled = (timing.is_filled and
+                 state is not None and
+                 not (state == BlockPacker.UNUSED).any())
+    return dict(key=case.key,
+                packer=case.packer_name,
+                branching=case.branching,
+                puzzle=case.puzzle_path.name,
+                seed=case.seed,
+                seconds=timing.seconds,
+                nodes=timing.nodes,
+                is_filled=bool(is_filled),
+                peak_memory_kb=find_peak_memory(),
+                stats=packer.stats.as_dict())
+
+
+def time_fill(packer: BlockPacker | DoubleBlockPacker,
+              fill: typing.Callable[[], bool]) -> FillTiming:
+    """ Time one packing, and count the search nodes it used.
+
+    :param packer: the packer that fill uses, with fresh stats
+    :param fill: packs with the packer, and returns True if it filled
+    """
+    start_time = perf_counter()
+    is_filled = fill()
+    seconds = perf_counter() - start_time
+    stats = packer.stats
+    nodes = stats.epoch_count if isinstance(packer, EvoPacker) else stats.node_count
+    return FillTiming(is_filled, seconds, nodes)
+
+
+def find_peak_memory() -> int | None:
+    """ Peak resident memory of this process in KiB, or None if unknown. """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024  # macOS reports bytes.
+    return peak
+
+
+def summarize(results: typing.Iterable[dict]) -> dict[str, dict]:
+    """ Total up the results for each packer and branching strategy. """
+    groups = defaultdict(list)
+    for result in results:
+        packer_name = result['packer']
+        branching = result.get('branching', BranchingStrategy.name)
+        if branching != BranchingStrategy.name:
+            packer_name += f':{branching}'
+        groups[packer_name].append(result)
+    summary = {}
+    for packer_name, packer_results in groups.items():
+        memories = [result['peak_memory_kb']
+                    for result in packer_results
+                    if result['peak_memory_kb'] is not None]
+        summary[packer_name] = dict(
+            runs=len(packer_results),
+            success_rate=(sum(result['is_filled'] for result in packer_results) /
+                          len(packer_results)),
+            seconds=sum(result['seconds'] for result in packer_results),
+            nodes=sum(result['nodes'] for result in packer_results),
+            peak_memory_kb=max(memories, default=None))
+    return summary
+
+
+def compare_results(baseline: dict,
+                    report: dict,
+                    tolerance: float = 0.2) -> typing.List[str]:
+    """ Describe every way the new results are worse than the baseline.
+
+    :param baseline: an earlier report from the same cases
+    :param report: the new report
+    :param tolerance: fraction worse that is still acceptable, because wall
+        time and memory are noisy.
+    :return: a message for each regression, empty if there are none.
+    """
+    old_results = {result['key']: result for result in baseline['results']}
+    regressions = []
+    limit = 1 + tolerance
+    for result in report['results']:
+        key = result['key']
+        old_result = old_results.get(key)
+        if old_result is None:
+            continue
+        if old_result['is_filled'] and not result['is_filled']:
+            regressions.append(f'{key}: no longer filled.')
+        for field, units in (('seconds', 's'),
+                             ('nodes', ' nodes'),
+                             ('peak_memory_kb', ' KiB')):
+            old_value = old_result[field]
+            new_value = result[field]
+            if old_value is None or new_value is None:
+                continue
+            if new_value > old_value * limit:
+                regressions.append(f'{key}: {field} went from '
+                                   f'{old_value:g}{units} to '
+                                   f'{new_value:g}{units}.')
+    old_summary = baseline['summary']
+    for packer_name, summary in report['summary'].items():
+        old_packer_summary = old_summary.get(packer_name)
+        if old_packer_summary is None:
+            continue
+        old_rate = old_packer_summary['success_rate']
+        new_rate = summary['success_rate']
+        if new_rate < old_rate:
+            regressions.append(f'{packer_name}: success rate went from '
+                               f'{old_rate:.0%} to {new_rate:.0%}.')
+    return regressions
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+""" Compare time to pack a puzzle set with and without restarts.
+
+Packs the blocks of the same puzzles many times with different seeds, the
+same way as exporting a set file, once with a single search, and once with
+each restart schedule. Reports the median and 90th percentile seconds to
+pack all the blocks. A run that doesn't pack them all counts as infinitely
+slow, so the tail shows how often a single search gets stuck.
+
+    python -m tools.restart_benchmark
+"""
+import argparse
+import math
+import statistics
+import typing
+from pathlib import Path
+
+import numpy as np
+
+from four_letter_blocks.block_packer import BlockPacker, create_rng
+from four_letter_blocks.puzzle import Puzzle
+from four_letter_blocks.puzzle_set import PuzzleSet
+from four_letter_blocks.restarts import SCHEDULES
+from four_letter_blocks.transposition_table import TranspositionTable
+from tools.packing_benchmark import FillTiming, time_fill
+
+TESTS_PATH = Path(__file__).parent.parent / 'tests'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('puzzle_paths',
+                        type=Path,
+                        nargs='*',
+                        default=[TESTS_PATH / 'test-front11x11.txt',
+                                 TESTS_PATH / 'test-back11x11.txt'],
+                        help='puzzle files to pack as a set')
+    parser.add_argument('--seeds', type=int, default=20)
+    parser.add_argument('--tries',
+                        type=int,
+                        default=1_000_000,
+                        help='maximum nodes for each run')
+    parser.add_argument('--min-tries', type=int, default=1_000)
+    parser.add_argument('--restart-unit',
+                        type=int,
+                        default=1_000,
+                        help='tries for the first search of each schedule')
+    parser.add_argument('--schedules',
+                        nargs='+',
+                        choices=SCHEDULES,
+                        default=list(SCHEDULES))
+    return parser.parse_args()
+
+
+def run_set(puzzles: typing.Sequence[Puzzle],
+            seed: int,
+            tries: int,
+            min_tries: int,
+            schedule: str | None,
+            restart_unit: int) -> FillTiming:
+    """ Pack a puzzle set once.
+
+    :param schedule: restart schedule, or None for a single search
+    """
+    packer = BlockPacker(15, 19, tries=tries, min_tries=min_tries)
+    packer.transposition_table = TranspositionTable()
+    packer.rng = create_rng(seed)
+    packer.are_slots_shuffled = True
+    if schedule is not None:
+        packer.restart_schedule = schedule
+        packer.restart_unit = restart_unit
+
+    def pack_set() -> bool:
+        try:
+            puzzle_set = PuzzleSet(*puzzles, block_packer=packer)
+        except RuntimeError:
+            return False
+        state = packer.state
+        assert state is not None
+        block_count = np.unique(state[state > packer.GAP]).size
+        return block_count >= sum(puzzle_set.shape_counts.values())
+
+    return time_fill(packer, pack_set)
+
+
+def summarize(times: typing.List[float]) -> str:
+    median = statistics.median(times)
+    tail = statistics.quantiles(times, n=10, method='inclusive')[-1]
+    return '\t'.join('never' if math.isinf(value) else f'{value:.2f}'
+                     for value in (median, tail))
+
+
+def main():
+    args = parse_args()
+    puzzles = []
+    for path in args.puzzle_paths:
+        with path.open() as puzzle_file:
+            puzzles.append(Puzzle.parse(puzzle_file))
+    print('Mode\tPacked\tMedian s\t90% s\tMean nodes')
+    for schedule in [None] + args.schedules:
+        times = []
+        node_counts = []
+        for seed in range(args.seeds):
+            timing = run_set(puzzles,
+                             seed,
+                             args.tries,
+                             args.min_tries,
+                             schedule,
+                             args.restart_unit)
+            times.append(timing.seconds if timing.is_filled else math.inf)
+            node_counts.append(timing.nodes)
+        packed_count = sum(not math.isinf(seconds) for seconds in times)
+        print(f'{schedule or "single"}\t{packed_count}/{args.seeds}\t'
+              f'{summarize(times)}\t{statistics.mean(node_counts):.0f}')
+
+
+if __name__ == '__main__':
+    main()
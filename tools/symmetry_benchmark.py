@@ -0,0 +1,104 @@
+""" Compare search nodes with and without symmetry pruning.
+
+Each case is a symmetric grid, and the search runs twice: once as usual, and
+once with are_symmetries_pruned set. Nodes are the tries that each search
+uses. Most of the cases have no solution, because that's when the whole
+tree gets searched.
+
+    python -m tools.symmetry_benchmark
+"""
+import argparse
+from collections import Counter
+from textwrap import dedent
+
+from four_letter_blocks.block_packer import BlockPacker
+from four_letter_blocks.double_block_packer import DoubleBlockPacker
+from tools.packing_benchmark import FillTiming, time_fill
+
+OPEN_6X4 = dedent("""\
+    ......
+    ......
+    ......
+    ......""")
+
+STAGGERED_FRONT = dedent("""\
+    ..#.#.
+    ......
+    ......
+    .#.#..""")
+
+STAGGERED_BACK = dedent("""\
+    .#.#..
+    ......
+    ......
+    ..#.#.""")
+
+TWISTED_FRONT = dedent("""\
+    ......
+    #.#...
+    ...#.#
+    ......""")
+
+TWISTED_BACK = dedent("""\
+    ......
+    ...#.#
+    #.#...
+    ......""")
+
+SINGLE_CASES = [('6x4 T6', OPEN_6X4, dict(T=6)),
+                ('6x4 S3 Z3', OPEN_6X4, dict(S=3, Z=3)),
+                ('6x4 O1 T5', OPEN_6X4, dict(O=1, T=5)),
+                ('6x4 L3 T3', OPEN_6X4, dict(L=3, T=3))]
+
+DOUBLE_CASES = [('6x4 staggered', STAGGERED_FRONT, STAGGERED_BACK),
+                ('6x4 twisted', TWISTED_FRONT, TWISTED_BACK)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tries',
+                        type=int,
+                        default=100_000,
+                        help='maximum nodes for each search')
+    return parser.parse_args()
+
+
+def run_single(start_text: str,
+               shape_counts: dict[str, int],
+               tries: int,
+               are_symmetries_pruned: bool) -> FillTiming:
+    packer = BlockPacker(start_text=start_text, tries=tries)
+    packer.force_fours = True
+    packer.are_symmetries_pruned = are_symmetries_pruned
+    return time_fill(packer, lambda: packer.fill(Counter(shape_counts)))
+
+
+def run_double(front_text: str,
+               back_text: str,
+               tries: int,
+               are_symmetries_pruned: bool) -> FillTiming:
+    packer = DoubleBlockPacker(front_text, back_text, tries=tries)
+    packer.are_symmetries_pruned = are_symmetries_pruned
+    return time_fill(packer, packer.fill)
+
+
+def main():
+    args = parse_args()
+    runs = [(name, run_single, (start_text, shape_counts, args.tries))
+            for name, start_text, shape_counts in SINGLE_CASES]
+    runs.extend((name, run_double, (front_text, back_text, args.tries))
+                for name, front_text, back_text in DOUBLE_CASES)
+    print('Case\tFilled\tNodes\tPruned nodes\tSeconds\tPruned seconds')
+    for name, run, run_args in runs:
+        timing = run(*run_args, are_symmetries_pruned=False)
+        pruned_timing = run(*run_args, are_symmetries_pruned=True)
+        filled_display = str(timing.is_filled)
+        if pruned_timing.is_filled != timing.is_filled:
+            filled_display += f' (pruned {pruned_timing.is_filled})'
+        print(f'{name}\t{filled_display}\t{timing.nodes}\t'
+              f'{pruned_timing.nodes}\t{timing.seconds:.2f}\t'
+              f'{pruned_timing.seconds:.2f}')
+
+
+if __name__ == '__main__':
+    main()